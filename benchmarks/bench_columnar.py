@@ -0,0 +1,74 @@
+"""
+Batch scoring cost per request: JSON rows through score_rows vs the columnar
+Arrow IPC and msgpack paths, end to end (decode, validate, model call, encode).
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mlapi.settings")
+os.environ.setdefault("INFERENCE_AUDIT_ENABLED", "False")
+
+import django  # noqa: E402
+
+django.setup()
+
+from inference import columnar, lean, services  # noqa: E402
+from inference.views import score_rows  # noqa: E402
+
+SIZES = (100, 1000, 10000)
+TEMPLATE = ROOT / "_debug" / "predict_template.json"
+
+
+def _best(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    import msgpack
+    import pyarrow as pa
+
+    handle = services.default_model()
+    row = dict(zip(handle.schema.columns, json.loads(TEMPLATE.read_text(encoding="utf-8"))["features"]))
+
+    report = []
+    for n in SIZES:
+        rows = [row] * n
+        body_json = lean.dumps({"rows": rows})
+        table = pa.table({c: [row[c]] * n for c in handle.schema.columns})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body_arrow = sink.getvalue().to_pybytes()
+        body_msgpack = msgpack.packb({"columns": {c: [row[c]] * n for c in handle.schema.columns}})
+
+        repeat = 10 if n <= 1000 else 3
+        t_json = _best(lambda: lean.dumps({"results": score_rows(handle, lean.loads(body_json)["rows"])}), repeat)
+        t_arrow = _best(lambda: columnar.score(handle, columnar.ARROW, body_arrow), repeat)
+        t_msgpack = _best(lambda: columnar.score(handle, columnar.MSGPACK, body_msgpack), repeat)
+        report.append({
+            "rows": n,
+            "json_ms": round(t_json * 1e3, 3),
+            "arrow_ms": round(t_arrow * 1e3, 3),
+            "msgpack_ms": round(t_msgpack * 1e3, 3),
+        })
+        print(f"{n:>6} rows  json {t_json * 1e3:9.3f} ms  arrow {t_arrow * 1e3:9.3f} ms  msgpack {t_msgpack * 1e3:9.3f} ms")
+
+    out = os.getenv("BENCH_OUT")
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import joblib
+import numpy as np
+
+from inference import fastpath, preprocess, services
+
+SIZES = (1, 10, 100, 1000, 10000)
+TEMPLATE = ROOT / "_debug" / "predict_template.json"
+
+
+def _timeit(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    raw = joblib.load(services.MODEL_PATH)
+    pipeline = raw["pipeline"]
+    schema = preprocess.compile_schema(raw)
+    compiled = fastpath.compile_pipeline(pipeline, schema)
+    row = schema.row(json.loads(TEMPLATE.read_text(encoding="utf-8"))["features"])
+
+    report = []
+    for n in SIZES:
+        rows = [row] * n
+        repeat = 50 if n <= 100 else 5
+        full = _timeit(lambda: pipeline.predict_proba(schema.frame(rows)), repeat)
+        fast = _timeit(lambda: compiled.predict_proba(rows), repeat)
+        assert np.allclose(pipeline.predict_proba(schema.frame(rows)), compiled.predict_proba(rows), atol=1e-7)
+        report.append({
+            "rows": n,
+            "pipeline_ms": round(full * 1e3, 3),
+            "compiled_ms": round(fast * 1e3, 3),
+            "speedup": round(full / fast, 2),
+        })
+        print(f"{n:>6} rows  pipeline {full * 1e3:9.3f} ms  compiled {fast * 1e3:9.3f} ms  x{full / fast:5.2f}")
+
+    out = os.getenv("BENCH_OUT")
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-request framework overhead of the full Django/DRF stack vs the lean mount.
+
+Both apps are called in-process through WSGI with the same /api/v1/predict/ body.
+The prediction cache is on and primed, so the model call is a cache hit and what is
+left is parsing, middleware, routing, validation and rendering.
+"""
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mlapi.settings")
+os.environ.setdefault("INFERENCE_AUDIT_ENABLED", "False")
+os.environ.setdefault("INFERENCE_CACHE_BACKEND", "local")
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+from benchmarks.stats import summarize_ms  # noqa: E402
+
+TEMPLATE = ROOT / "_debug" / "predict_template.json"
+
+
+def _environ(body: bytes) -> dict:
+    return {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/api/v1/predict/",
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "8000",
+        "HTTP_HOST": "127.0.0.1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": sys.stderr,
+    }
+
+
+def _call(app, body: bytes) -> bytes:
+    status = []
+    out = b"".join(app(_environ(body), lambda s, h, exc_info=None: status.append(s)))
+    if not status[0].startswith("200"):
+        raise RuntimeError(f"{status[0]}: {out[:200]!r}")
+    return out
+
+
+def _bench(app, body: bytes, n: int):
+    for _ in range(50):
+        _call(app, body)
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        _call(app, body)
+        samples.append(time.perf_counter() - t)
+    return summarize_ms(samples)
+
+
+def main():
+    from inference.lean import LeanHandler
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    body = TEMPLATE.read_bytes()
+    full = get_wsgi_application()
+    lean = LeanHandler(fallback=full)
+
+    a, b = json.loads(_call(full, body)), json.loads(_call(lean, body))
+    assert a == b, (a, b)
+
+    report = {"requests": n, "full": _bench(full, body, n), "lean": _bench(lean, body, n)}
+    report["saved_p50_ms"] = round(report["full"]["p50_ms"] - report["lean"]["p50_ms"], 4)
+    for name in ("full", "lean"):
+        r = report[name]
+        print(f"{name:>5}  p50 {r['p50_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms  mean {r['mean_ms']:8.3f} ms")
+    print(f"saved per request (p50): {report['saved_p50_ms']:.3f} ms")
+    out = os.getenv("BENCH_OUT")
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _memory_kb() -> dict:
+    # Linux only: Pss splits shared pages between the processes mapping them
+    out = {}
+    with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty"):
+                out[key.lower()] = int(rest.split()[0])
+    return out
+
+
+def _worker(model_path: str, start, results) -> None:
+    os.environ["MODEL_PATH"] = model_path
+    import pandas, sklearn.pipeline, xgboost  # noqa: F401  (import cost is not what we measure)
+    before = _memory_kb()
+    from inference import services
+
+    services.load_model_and_meta()
+    after = _memory_kb()
+    start.wait()
+    results.put({k: after[k] - before.get(k, 0) for k in after} | {"total_rss": after["rss"], "total_pss": after["pss"]})
+    time.sleep(1.0)
+
+
+def measure(model_path: str, workers: int) -> dict:
+    ctx = mp.get_context("spawn")
+    start = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(model_path, start, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    start.wait()
+    rows = [results.get(timeout=120) for _ in procs]
+    for p in procs:
+        p.join()
+    keys = rows[0].keys()
+    return {k: round(sum(r[k] for r in rows) / len(rows)) for k in keys}
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("usage: bench_rss.py <joblib file> <mmap layout dir> [workers]")
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    report = {"workers": workers}
+    for label, path in (("joblib", sys.argv[1]), ("mmap_layout", sys.argv[2])):
+        report[label] = measure(path, workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Per-row request validation cost: the old DRF path (PredictSerializer + preprocess.run)
+vs the RowValidator compiled from the model's fitted schema.
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mlapi.settings")
+os.environ.setdefault("INFERENCE_AUDIT_ENABLED", "False")
+
+import django  # noqa: E402
+
+django.setup()
+
+from inference import preprocess, services  # noqa: E402
+from inference.serializers import PredictSerializer  # noqa: E402
+
+TEMPLATE = ROOT / "_debug" / "predict_template.json"
+
+
+def _per_row_us(fn, rows, repeat: int = 5) -> float:
+    fn(rows)
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - t)
+    return best / len(rows) * 1e6
+
+
+def main():
+    handle = services.default_model()
+    schema, validator = handle.schema, handle.validator
+    names = handle.meta.get("feature_names")
+    values = json.loads(TEMPLATE.read_text(encoding="utf-8"))["features"]
+    as_dict = dict(zip(schema.columns, values))
+
+    def drf(rows):
+        for r in rows:
+            s = PredictSerializer(data={"features": r}, context={"expected_columns": names})
+            s.is_valid(raise_exception=True)
+            preprocess.run(s.validated_data["features"], expected_columns=names, schema=schema)
+
+    def compiled(rows):
+        for r in rows:
+            validator.validate(r)
+
+    def compiled_batch(rows):
+        validator.validate_many(rows)
+
+    report = {}
+    for kind, row in (("list", values), ("dict", as_dict)):
+        rows = [row] * 2000
+        report[kind] = {
+            "drf_us_per_row": round(_per_row_us(drf, rows), 2),
+            "validator_us_per_row": round(_per_row_us(compiled, rows), 2),
+            "validator_batch_us_per_row": round(_per_row_us(compiled_batch, rows), 2),
+        }
+        r = report[kind]
+        print(f"{kind:>4}  drf {r['drf_us_per_row']:8.2f} us/row  validator {r['validator_us_per_row']:6.2f} us/row"
+              f"  batch {r['validator_batch_us_per_row']:6.2f} us/row  x{r['drf_us_per_row'] / r['validator_us_per_row']:.1f}")
+
+    out = os.getenv("BENCH_OUT")
+    if out:
+        Path(out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def flatten(obj: Any, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.update(flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix] = float(obj)
+    return out
+
+
+def direction(metric: str) -> int:
+    """+1 when higher is better, -1 when lower is better, 0 for values that are not compared."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith("_ms"):
+        return -1
+    if leaf.endswith(("per_s", "rps")):
+        return 1
+    if leaf == "errors":
+        return -1
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Tuple[str, float, float, float, bool]]:
+    base = flatten(baseline.get("results", baseline))
+    cur = flatten(current.get("results", current))
+    rows = []
+    for metric in sorted(base.keys() & cur.keys()):
+        sign = direction(metric)
+        if sign == 0:
+            continue
+        b, c = base[metric], cur[metric]
+        change = (c - b) / b if b else 0.0
+        regressed = (sign * change) < -threshold
+        rows.append((metric, b, c, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a benchmark run against a stored baseline.")
+    parser.add_argument("baseline", help="Baseline JSON from micro.py or loadgen.py.")
+    parser.add_argument("current", help="Current JSON from the same script.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown (default: 0.10).")
+    parser.add_argument("--only", default="", help="Only compare metrics containing this substring (e.g. p99_ms).")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    if baseline.get("kind") != current.get("kind"):
+        sys.exit(f"Cannot compare a {baseline.get('kind')!r} run with a {current.get('kind')!r} run.")
+
+    rows = [r for r in compare(baseline, current, args.threshold) if args.only in r[0]]
+    regressions = [r for r in rows if r[4]]
+    width = max((len(r[0]) for r in rows), default=10)
+    for metric, b, c, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:<{width}}  {b:>12.4f}  {c:>12.4f}  {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} ({len(rows)} metrics).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.stats import environment, summarize_ms
+
+DEFAULT_PAYLOAD = ROOT / "_debug" / "predict_template.json"
+SERVERS = {
+    "waitress": lambda host, port, threads: [
+        sys.executable, "-m", "waitress", f"--listen={host}:{port}", f"--threads={threads}", "mlapi.wsgi:application",
+    ],
+    "asgi": lambda host, port, threads: [
+        sys.executable, "-m", "uvicorn", "--host", host, "--port", str(port), "--no-access-log", "mlapi.asgi:application",
+    ],
+    "runserver": lambda host, port, threads: [
+        sys.executable, "manage.py", "runserver", "--noreload", f"{host}:{port}",
+    ],
+}
+
+
+def wait_for_health(base: str, timeout: float = 60.0, interval: float = 0.5) -> None:
+    u = urlparse(base)
+    start = time.time()
+    last_err = None
+    while time.time() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection(u.hostname, u.port, timeout=3)
+            conn.request("GET", "/api/v1/health/")
+            if conn.getresponse().status == 200:
+                return
+        except Exception as e:
+            last_err = e
+        time.sleep(interval)
+    raise TimeoutError(f"Health check timed out after {timeout}s. Last error: {last_err}")
+
+
+class _Client(threading.local):
+    conn: Optional[http.client.HTTPConnection] = None
+
+
+class LoadGenerator:
+
+    def __init__(self, url: str, body: bytes, timeout: float = 30.0):
+        self.url = urlparse(url)
+        self.body = body
+        self.timeout = timeout
+        self._local = _Client()
+
+    def _request(self) -> int:
+        conn = self._local.conn
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.url.hostname, self.url.port, timeout=self.timeout)
+        try:
+            conn.request("POST", self.url.path, body=self.body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            return resp.status
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            return 0
+
+    def closed_loop(self, concurrency: int, duration: float) -> Tuple[List[float], List[int]]:
+        """Each of `concurrency` clients sends its next request as soon as the previous one returns."""
+        latencies: List[float] = []
+        statuses: List[int] = []
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + duration
+
+        def client():
+            lat, st = [], []
+            while time.perf_counter() < stop_at:
+                t = time.perf_counter()
+                st.append(self._request())
+                lat.append(time.perf_counter() - t)
+            with lock:
+                latencies.extend(lat)
+                statuses.extend(st)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies, statuses
+
+    def open_loop(self, rate: float, duration: float, concurrency: int, seed: int = 0) -> Tuple[List[float], List[int]]:
+        """
+        Poisson arrivals at `rate` req/s regardless of how fast the server answers. Latency is
+        measured from the scheduled send time, so queueing in the client is not hidden.
+        """
+        rng = random.Random(seed)
+        latencies: List[float] = []
+        statuses: List[int] = []
+        lock = threading.Lock()
+
+        def fire(scheduled: float):
+            status = self._request()
+            with lock:
+                latencies.append(time.perf_counter() - scheduled)
+                statuses.append(status)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            start = time.perf_counter()
+            t = start
+            while t - start < duration:
+                t += rng.expovariate(rate)
+                delay = t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(fire, t)
+        return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load generator for the predict endpoints.")
+    parser.add_argument("--url", default="", help="Target URL (default: /api/v1/predict/ on the started server).")
+    parser.add_argument("--server", default="none", choices=("none",) + tuple(SERVERS), help="Start this server first.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--server-threads", type=int, default=8, help="waitress --threads.")
+    parser.add_argument("--payload", default=str(DEFAULT_PAYLOAD), help="JSON request body file.")
+    parser.add_argument("--mode", default="closed", choices=("closed", "open"))
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients (closed) or max in-flight requests (open).")
+    parser.add_argument("--rate", type=float, default=50.0, help="Open-loop arrival rate, req/s.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measured load.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load first.")
+    parser.add_argument("--out", default="", help="Write results JSON here (default: stdout).")
+    args = parser.parse_args()
+
+    base = f"http://{args.host}:{args.port}"
+    url = args.url or f"{base}/api/v1/predict/"
+    body = Path(args.payload).read_bytes()
+
+    server = None
+    if args.server != "none":
+        env = dict(os.environ)
+        env.setdefault("DJANGO_ALLOWED_HOSTS", f"{args.host},localhost")
+        env.setdefault("INFERENCE_AUDIT_ENABLED", "False")  # measure serving, not the prediction log
+        server = subprocess.Popen(
+            SERVERS[args.server](args.host, args.port, args.server_threads),
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    try:
+        if server is not None:
+            wait_for_health(base)
+        gen = LoadGenerator(url, body)
+        if args.warmup > 0:
+            gen.closed_loop(args.concurrency, args.warmup)
+        if args.mode == "closed":
+            latencies, statuses = gen.closed_loop(args.concurrency, args.duration)
+        else:
+            latencies, statuses = gen.open_loop(args.rate, args.duration, args.concurrency)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    ok = sum(1 for s in statuses if 200 <= s < 300)
+    report = {
+        "kind": "load",
+        "env": environment(),
+        "config": {k: getattr(args, k) for k in ("server", "mode", "concurrency", "rate", "duration")} | {"url": url},
+        "results": {
+            "requests": len(statuses),
+            "errors": len(statuses) - ok,
+            "throughput_rps": round(ok / args.duration, 2),
+            "latency": summarize_ms(latencies),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
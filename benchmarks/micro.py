@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.stats import environment, summarize_ms
+from inference import postprocess, preprocess, services
+
+SIZES = (1, 10, 100, 1000, 10000)
+TEMPLATE = ROOT / "_debug" / "predict_template.json"
+
+
+def _sample(fn, min_time: float, max_iters: int):
+    fn()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_iters and (len(samples) < 3 or time.perf_counter() < deadline):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return samples
+
+
+def run(sizes, min_time: float, max_iters: int):
+    handle = services.default_model()
+    schema = handle.schema
+    template = json.loads(TEMPLATE.read_text(encoding="utf-8"))["features"]
+    names = handle.meta.get("feature_names") or []
+    base = dict(zip(names, template)) if names else template
+
+    results = {}
+    for n in sizes:
+        raw_rows = [base] * n
+        rows = [preprocess.run(r, expected_columns=names or None, schema=schema) for r in raw_rows]
+        model, Xm = handle._model_and_input(rows)
+        outs = handle.predict_many(rows)
+
+        stages = {
+            "preprocess.run": lambda: [preprocess.run(r, expected_columns=names or None, schema=schema) for r in raw_rows],
+            "services._to_model_input": (lambda: handle._to_model_input(rows[0])) if n == 1 else (lambda: handle._to_batch_input(rows)),
+            "model_call": lambda: services._score(model, Xm),
+            "services.predict": (lambda: handle.predict(rows[0])) if n == 1 else (lambda: handle.predict_many(rows)),
+            "postprocess.run": lambda: [postprocess.run(dict(o)) for o in outs],
+        }
+        for stage, fn in stages.items():
+            samples = _sample(fn, min_time, max_iters)
+            summary = summarize_ms(samples)
+            summary["rows_per_s"] = round(n / (summary["p50_ms"] / 1000.0), 1) if summary["p50_ms"] else None
+            results.setdefault(stage, {})[str(n)] = summary
+            print(f"{stage:<26} n={n:<6} p50 {summary['p50_ms']:10.4f} ms  p99 {summary['p99_ms']:10.4f} ms", file=sys.stderr)
+    return {
+        "kind": "micro",
+        "env": environment(),
+        "model": {"fingerprint": handle.fingerprint, "compiled_pipeline": handle.fastpath is not None},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage microbenchmarks of the inference path.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated batch sizes.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to sample each stage/size for.")
+    parser.add_argument("--max-iters", type=int, default=2000)
+    parser.add_argument("--out", default="", help="Write results JSON here (default: stdout).")
+    args = parser.parse_args()
+
+    report = run([int(s) for s in args.sizes.split(",") if s], args.min_time, args.max_iters)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Replays captured traffic (inference.capture) against a server.
+
+Requests are sent at their recorded offsets divided by --speed (0: back to back) from
+up to --concurrency connections, with the recorded body, content type and X-Request-ID
+(so A/B routing picks the same arm). Latency is measured from the scheduled send time,
+like loadgen.py's open loop, so a slow server is not hidden by client-side queueing.
+Each response is compared with the recorded one: status, then the body with numbers
+equal within --tolerance.
+
+The report has the same "results" layout as loadgen.py, so two replays of the same
+capture can be checked with compare.py.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.loadgen import SERVERS, wait_for_health
+from benchmarks.stats import environment, summarize_ms
+from inference.capture import read_capture, request_body
+
+
+def diff(expected: Any, got: Any, tolerance: float, path: str = "$") -> Optional[str]:
+    """First difference between two decoded JSON bodies, or None."""
+    if isinstance(expected, bool) or isinstance(got, bool):
+        return None if expected == got else path
+    if isinstance(expected, (int, float)) and isinstance(got, (int, float)):
+        if math.isnan(expected) and math.isnan(got):
+            return None
+        return None if abs(expected - got) <= tolerance else path
+    if isinstance(expected, dict) and isinstance(got, dict):
+        for k in sorted(expected.keys() | got.keys(), key=str):
+            if k not in expected or k not in got:
+                return f"{path}.{k}"
+            d = diff(expected[k], got[k], tolerance, f"{path}.{k}")
+            if d is not None:
+                return d
+        return None
+    if isinstance(expected, list) and isinstance(got, list):
+        if len(expected) != len(got):
+            return f"{path}[len]"
+        for i, (e, g) in enumerate(zip(expected, got)):
+            d = diff(e, g, tolerance, f"{path}[{i}]")
+            if d is not None:
+                return d
+        return None
+    return None if expected == got else path
+
+
+def _at(obj: Any, path: str) -> Any:
+    # value at a diff() path, for the report examples
+    for part in path[1:].replace("[", ".[").split("."):
+        if not part:
+            continue
+        try:
+            obj = obj[int(part[1:-1])] if part.startswith("[") else obj[part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+    return obj
+
+
+class _Client(threading.local):
+    conn: Optional[http.client.HTTPConnection] = None
+
+
+class Replayer:
+
+    def __init__(self, target: str, timeout: float = 30.0):
+        self.target = urlparse(target)
+        self.timeout = timeout
+        self._local = _Client()
+
+    def send(self, rec: Dict[str, Any]) -> Tuple[int, bytes]:
+        conn = self._local.conn
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.target.hostname, self.target.port, timeout=self.timeout)
+        headers = {"Content-Type": rec.get("content_type") or "application/json"}
+        if rec.get("request_id"):
+            headers["X-Request-ID"] = rec["request_id"]
+        path = rec["path"] + (f"?{rec['query']}" if rec.get("query") else "")
+        try:
+            conn.request(rec.get("method", "POST"), path, body=request_body(rec), headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            return 0, b""
+
+    def run(self, records: List[Dict[str, Any]], speed: float, concurrency: int) -> List[Tuple[float, float, int, bytes]]:
+        """(latency from scheduled time, send lag, status, body) per record, in record order."""
+        results: List[Any] = [None] * len(records)
+        t0 = records[0]["ts"] if records else 0.0
+
+        def fire(i: int, scheduled: float):
+            sent = time.perf_counter()
+            status, body = self.send(records[i])
+            results[i] = (time.perf_counter() - scheduled, sent - scheduled, status, body)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            start = time.perf_counter()
+            for i, rec in enumerate(records):
+                if speed > 0:
+                    scheduled = start + (rec["ts"] - t0) / speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    scheduled = time.perf_counter()
+                pool.submit(fire, i, scheduled)
+        return results
+
+
+def report_results(records: List[Dict[str, Any]], results: List[Tuple[float, float, int, bytes]],
+                   tolerance: float, max_examples: int, elapsed: float) -> Dict[str, Any]:
+    by_path: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    status_mismatch = body_mismatch = compared = 0
+    examples: List[Dict[str, Any]] = []
+    for i, (rec, (latency, _lag, status, body)) in enumerate(zip(records, results)):
+        by_path[rec["path"]].append(latency)
+        statuses[str(status)] += 1
+        where: Optional[str] = None
+        expected = got = None
+        if status != rec.get("status"):
+            status_mismatch += 1
+            where, expected, got = "status", rec.get("status"), status
+        elif "response" in rec:
+            compared += 1
+            try:
+                decoded = json.loads(body) if body else None
+            except ValueError:
+                decoded = body.decode("utf-8", "replace")
+            where = diff(rec["response"], decoded, tolerance)
+            if where is not None:
+                body_mismatch += 1
+                expected, got = _at(rec["response"], where), _at(decoded, where)
+        if where is not None and len(examples) < max_examples:
+            examples.append({"index": i, "path": rec["path"], "request_id": rec.get("request_id", ""),
+                             "at": where, "expected": expected, "got": got})
+
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {
+        "requests": len(results),
+        "errors": len(results) - ok,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+        "latency": summarize_ms([r[0] for r in results]),
+        "send_lag": summarize_ms([r[1] for r in results]),
+        "recorded_latency": summarize_ms([rec["latency_ms"] / 1000.0 for rec in records if rec.get("latency_ms") is not None]),
+        "by_path": {p: {"requests": len(v), "latency": summarize_ms(v)} for p, v in sorted(by_path.items())},
+        "statuses": dict(statuses),
+        "differences": {
+            "status_mismatches": status_mismatch,
+            "bodies_compared": compared,
+            "body_mismatches": body_mismatch,
+            "examples": examples,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured /predict/ traffic and diff the responses.")
+    parser.add_argument("captures", nargs="+", help="Capture files (.jsonl.gz / .jsonl) or directories of them.")
+    parser.add_argument("--target", default="", help="Base URL of the server (default: the started --server).")
+    parser.add_argument("--server", default="none", choices=("none",) + tuple(SERVERS), help="Start this server first.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--server-threads", type=int, default=8, help="waitress --threads.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Multiple of the recorded rate (0: as fast as possible).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Connections / max in-flight requests.")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests.")
+    parser.add_argument("--path", default="", help="Only replay requests whose path starts with this.")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Allowed absolute difference of numbers in bodies.")
+    parser.add_argument("--max-examples", type=int, default=20, help="Differences listed in the report.")
+    parser.add_argument("--out", default="", help="Write results JSON here (default: stdout).")
+    args = parser.parse_args()
+
+    records = [r for r in read_capture(args.captures) if r.get("path", "").startswith(args.path)]
+    records.sort(key=lambda r: r["ts"])
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        sys.exit("No captured requests to replay.")
+
+    base = args.target or f"http://{args.host}:{args.port}"
+    server = None
+    if args.server != "none":
+        env = dict(os.environ)
+        env.setdefault("DJANGO_ALLOWED_HOSTS", f"{args.host},localhost")
+        env.setdefault("INFERENCE_AUDIT_ENABLED", "False")  # measure serving, not the prediction log
+        server = subprocess.Popen(
+            SERVERS[args.server](args.host, args.port, args.server_threads),
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    try:
+        if server is not None:
+            wait_for_health(base)
+        started = time.perf_counter()
+        results = Replayer(base).run(records, args.speed, max(args.concurrency, 1))
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report = {
+        "kind": "replay",
+        "env": environment(),
+        "config": {
+            "captures": args.captures, "target": base, "speed": args.speed, "concurrency": args.concurrency,
+            "recorded_seconds": round(records[-1]["ts"] - records[0]["ts"], 3),
+        },
+        "results": report_results(records, results, args.tolerance, args.max_examples, elapsed),
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
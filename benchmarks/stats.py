@@ -0,0 +1,41 @@
+import math
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    if not sorted_values:
+        return math.nan
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return sorted_values[int(k)]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize_ms(samples_s: List[float]) -> Dict[str, float]:
+    values = sorted(s * 1000.0 for s in samples_s)
+    out = {f"p{p:g}_ms": round(percentile(values, p), 4) for p in PERCENTILES}
+    out["mean_ms"] = round(sum(values) / len(values), 4) if values else math.nan
+    out["max_ms"] = round(values[-1], 4) if values else math.nan
+    return out
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
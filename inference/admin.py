@@ -1,3 +1,11 @@
 from django.contrib import admin
 
+from .models import PredictionLog
 
+
+@admin.register(PredictionLog)
+class PredictionLogAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "endpoint", "model_name", "model_version", "label", "confidence", "error", "latency_ms")
+    list_filter = ("endpoint", "model_name", "error")
+    search_fields = ("request_id",)
+    date_hierarchy = "created_at"
@@ -2,3 +2,28 @@ from django.apps import AppConfig
 class InferenceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inference"
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, "INFERENCE_METRICS_DIR", ""):
+            from . import metrics
+            metrics.start_flusher(settings.INFERENCE_METRICS_DIR, getattr(settings, "INFERENCE_METRICS_FLUSH_SECONDS", 5.0))
+
+        if getattr(settings, "INFERENCE_SHADOW_MODELS", []):
+            from . import shadow
+            shadow.get_scorer()
+
+        if getattr(settings, "INFERENCE_JOBS_ENABLED", False):
+            from . import jobs
+            if jobs.pending(settings.INFERENCE_JOBS_DIR):
+                # resume what a previous server left queued or running; otherwise started by the first upload
+                jobs.get_queue().start()
+
+        if getattr(settings, "INFERENCE_PRELOAD", False):
+            from . import warmup
+            warmup.start(
+                blocking=getattr(settings, "INFERENCE_PRELOAD_BLOCKING", False),
+                rows=getattr(settings, "INFERENCE_WARMUP_ROWS", 8),
+                rounds=getattr(settings, "INFERENCE_WARMUP_ROUNDS", 3),
+            )
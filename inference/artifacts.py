@@ -0,0 +1,147 @@
+import copy
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+
+LAYOUT_FORMAT = "mmap-v1"
+MANIFEST = "manifest.json"
+BUNDLE_FILE = "bundle.joblib"
+BOOSTER_FILE = "booster.ubj"
+
+
+def is_mmap_layout(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST))
+
+
+def _final_estimator(model: Any) -> Tuple[Any, Optional[int]]:
+    steps = getattr(model, "steps", None)
+    if steps:
+        return steps[-1][1], len(steps) - 1
+    return model, None
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def export_mmap(raw: Any, out_dir: str) -> Dict[str, Any]:
+    """
+    Writes a joblib bundle as a directory that loads with joblib.load(mmap_mode="r"):
+    - bundle.joblib: the bundle, uncompressed, so its NumPy arrays are mapped read-only
+      and their pages are shared by every process that maps the same file
+    - booster.ubj: an XGBoost final estimator in its native binary format, instead of
+      the raw-bytes blob pickling would embed in the bundle
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    model_key = None
+    model = raw
+    if isinstance(raw, dict):
+        model_key = next((k for k in ("pipeline", "model", "estimator") if k in raw), None)
+        if model_key is None:
+            raise ValueError(f"Model dict found but no supported key. Available keys: {list(raw.keys())}")
+        model = raw[model_key]
+
+    estimator, step = _final_estimator(model)
+    booster: Optional[Dict[str, Any]] = None
+    if hasattr(estimator, "get_booster") and hasattr(estimator, "save_model"):
+        estimator.save_model(os.path.join(out_dir, BOOSTER_FILE))
+        booster = {
+            "file": BOOSTER_FILE,
+            "class": f"{type(estimator).__module__}.{type(estimator).__qualname__}",
+        }
+        # ship an unfitted placeholder; load_mmap puts the native booster back
+        placeholder = type(estimator)(**estimator.get_params())
+        model = copy.copy(model)
+        if step is None:
+            model = placeholder
+        else:
+            model.steps = list(model.steps)
+            model.steps[step] = (model.steps[step][0], placeholder)
+
+    bundle = dict(raw, **{model_key: model}) if model_key is not None else model
+    bundle_path = os.path.join(out_dir, BUNDLE_FILE)
+    joblib.dump(bundle, bundle_path, compress=0)
+
+    manifest = {
+        "format": LAYOUT_FORMAT,
+        "bundle": BUNDLE_FILE,
+        "model_key": model_key,
+        "booster": booster,
+        "sha256": {BUNDLE_FILE: _sha256(bundle_path)},
+    }
+    if booster is not None:
+        manifest["sha256"][BOOSTER_FILE] = _sha256(os.path.join(out_dir, BOOSTER_FILE))
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != LAYOUT_FORMAT:
+        raise ValueError(f"Unsupported model layout: {manifest.get('format')!r}")
+    return manifest
+
+
+# path -> ((name, size, mtime_ns) per file, hashes), so load + fingerprint read each file once
+_verified: Dict[str, Tuple[Tuple, Dict[str, str]]] = {}
+
+
+def verify_layout(path: str, manifest: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Checks every file of the layout against the sha256 pinned in its manifest and
+    returns the hashes. Raises ValueError for a missing, extra-path or changed file.
+    """
+    manifest = manifest or _read_manifest(path)
+    pinned: Dict[str, str] = manifest.get("sha256") or {}
+    needed = {manifest["bundle"]} | ({manifest["booster"]["file"]} if manifest.get("booster") else set())
+    if not needed <= pinned.keys():
+        raise ValueError(f"Manifest in {path} has no sha256 for: {', '.join(sorted(needed - pinned.keys()))}")
+    stats = []
+    for name in sorted(pinned):
+        if os.path.basename(name) != name:
+            raise ValueError(f"Manifest in {path} names a file outside the layout: {name!r}")
+        try:
+            st = os.stat(os.path.join(path, name))
+        except FileNotFoundError:
+            raise ValueError(f"Model layout {path} is missing {name}") from None
+        stats.append((name, st.st_size, st.st_mtime_ns))
+    key = tuple(stats)
+    cached = _verified.get(path)
+    if cached is not None and cached[0] == key and cached[1] == pinned:
+        return dict(pinned)
+
+    for name, expected in pinned.items():
+        actual = _sha256(os.path.join(path, name))
+        if actual != expected:
+            raise ValueError(f"Checksum mismatch for {name} in {path}: manifest has {expected[:12]}, file is {actual[:12]}")
+    _verified[path] = (key, dict(pinned))
+    return dict(pinned)
+
+
+def load_mmap(path: str) -> Any:
+    manifest = _read_manifest(path)
+    verify_layout(path, manifest)  # before unpickling anything
+
+    raw = joblib.load(os.path.join(path, manifest["bundle"]), mmap_mode="r")
+    booster = manifest.get("booster")
+    if booster:
+        model_key = manifest.get("model_key")
+        model = raw[model_key] if model_key is not None else raw
+        estimator, _ = _final_estimator(model)
+        estimator.load_model(os.path.join(path, booster["file"]))
+    return raw
+
+
+def layout_fingerprint(path: str) -> str:
+    """sha256 over the verified hashes of the layout's files, so it changes with any of them."""
+    hashes = verify_layout(path)
+    return hashlib.sha256("\n".join(f"{name}:{h}" for name, h in sorted(hashes.items())).encode()).hexdigest()
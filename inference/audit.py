@@ -0,0 +1,333 @@
+"""
+Write-behind prediction audit log.
+
+Views hand each scored request to ``record()``, which only puts it on a bounded
+in-memory queue. A background flusher turns queued requests into PredictionLog rows
+and writes them with bulk_create once INFERENCE_AUDIT_BATCH_ROWS rows are pending or
+INFERENCE_AUDIT_FLUSH_MS has passed. When the queue is full, or the database fails or
+answers slower than INFERENCE_AUDIT_SLOW_MS, records are appended to a per-process
+JSONL spill file instead. Spill files, including those left behind by dead processes,
+are replayed after the next insert that succeeds in time. The queue is drained on
+interpreter exit, and on SIGTERM in server processes (mlapi/wsgi.py and mlapi/asgi.py
+call install_sigterm_drain()); management commands and scripts never get the handler.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+records_total = metrics.counter("audit_records_total", "Prediction log records by outcome (written, spilled, replayed, lost).")
+flush_hist = metrics.histogram("audit_flush_ms", "Time per bulk insert of prediction log records (ms).")
+
+SPILL_PREFIX = "audit-"
+_WAKE = ()  # queued by drain() so a flusher blocked in get() sees the stop flag
+
+
+def request_id(request) -> str:
+    return (request.META.get("HTTP_X_REQUEST_ID") or "")[:64] or uuid.uuid4().hex
+
+
+def _plain(v: Any) -> Any:
+    # numpy scalars from columnar payloads; NaN is not valid JSON for the JSON column
+    if hasattr(v, "item") and not isinstance(v, (list, dict, str)):
+        v = v.item()
+    if isinstance(v, float) and v != v:
+        return None
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "replace")
+    return v
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class AuditWriter:
+
+    def __init__(self, queue_size: int = 10000, batch_rows: int = 500, flush_ms: float = 1000.0,
+                 slow_ms: float = 500.0, backoff_seconds: float = 30.0, spill_dir: str = "audit_spill"):
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max(int(queue_size), 1))
+        self.batch_rows = max(int(batch_rows), 1)
+        self.flush_seconds = max(float(flush_ms), 1.0) / 1000.0
+        self.slow_ms = float(slow_ms)
+        self.backoff_seconds = float(backoff_seconds)
+        self.spill_dir = spill_dir
+        self._db_retry_at = 0.0
+        self._spill_lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- request side ----
+
+    def record(self, endpoint: str, handle: Any, rows: Sequence[Any], results: Sequence[Dict[str, Any]],
+               latency_ms: Optional[float] = None, request_id: str = "") -> None:
+        """Queues one request's rows and results; never touches the database."""
+        labels = getattr(handle, "metric_labels", None) or {"model": "default", "version": ""}
+        item = (time.time(), endpoint, labels["model"], labels["version"], request_id, rows, results, latency_ms)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._spill(self._records([item]), reason="queue_full")
+
+    # ---- flusher ----
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        from django.db import close_old_connections
+
+        pending: List[tuple] = []
+        n_rows = 0
+        deadline = time.monotonic() + self.flush_seconds
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                if item is not _WAKE:
+                    pending.append(item)
+                    n_rows += len(item[5])
+            except queue.Empty:
+                pass
+            if pending and (n_rows >= self.batch_rows or time.monotonic() >= deadline):
+                close_old_connections()
+                self._flush(pending)
+                pending, n_rows = [], 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+        # stop requested: whatever was taken off the queue goes with the final drain
+        self._flush(pending + self._take_all())
+        close_old_connections()
+
+    def _take_all(self) -> List[tuple]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not _WAKE:
+                items.append(item)
+
+    def flush(self) -> None:
+        """Writes everything queued so far from the calling thread."""
+        self._flush(self._take_all())
+
+    def drain(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put_nowait(_WAKE)
+            except queue.Full:
+                pass  # the flusher is not idle, it will see the flag after this batch
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # the database is hanging: keep what is still queued on disk
+                self._spill(self._records(self._take_all()), reason="shutdown")
+                return
+        self.flush()
+
+    def _records(self, items: List[tuple]) -> Iterator[Dict[str, Any]]:
+        for ts, endpoint, model, version, rid, rows, results, latency_ms in items:
+            for i, (features, out) in enumerate(zip(rows, results)):
+                label = out.get("label")
+                confidence = out.get("confidence")
+                yield {
+                    "created_at": ts,
+                    "request_id": rid,
+                    "endpoint": endpoint,
+                    "row_index": out.get("index", i),
+                    "model_name": model,
+                    "model_version": version,
+                    "features": {str(k): _plain(v) for k, v in features.items()} if isinstance(features, dict)
+                    else [_plain(v) for v in features] if isinstance(features, (list, tuple)) else None,
+                    "label": None if label is None else str(label),
+                    "confidence": _plain(confidence),
+                    "error": out.get("error") or "",
+                    "latency_ms": None if latency_ms is None else round(float(latency_ms), 3),
+                }
+
+    def _flush(self, items: List[tuple]) -> None:
+        if not items:
+            return
+        records = list(self._records(items))
+        if time.monotonic() < self._db_retry_at:
+            self._spill(records, reason="backoff")
+            return
+        with self._flush_lock:
+            if self._write(records, outcome="written"):
+                self._maybe_replay()
+
+    def _write(self, records: List[Dict[str, Any]], outcome: str) -> bool:
+        from django.db import connection
+
+        from .models import PredictionLog
+
+        t = time.perf_counter()
+        try:
+            PredictionLog.objects.bulk_create(
+                [PredictionLog(**{**r, "created_at": datetime.fromtimestamp(r["created_at"], tz=timezone.utc)})
+                 for r in records],
+                batch_size=self.batch_rows,
+            )
+        except Exception as e:
+            logger.warning("Prediction log insert failed, spilling %d records: %s", len(records), e)
+            self._db_retry_at = time.monotonic() + self.backoff_seconds
+            self._spill(records, reason="db_error")
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return False
+        elapsed_ms = (time.perf_counter() - t) * 1000.0
+        flush_hist.observe(elapsed_ms)
+        records_total.inc(len(records), outcome=outcome)
+        if self.slow_ms > 0 and elapsed_ms > self.slow_ms:
+            # written, but the database is struggling: send the next batches to disk for a while
+            logger.warning("Prediction log insert took %.0f ms; spilling for %.0f s", elapsed_ms, self.backoff_seconds)
+            self._db_retry_at = time.monotonic() + self.backoff_seconds
+            return False
+        return True
+
+    # ---- spill files ----
+
+    def _spill_path(self) -> str:
+        return os.path.join(self.spill_dir, f"{SPILL_PREFIX}{os.getpid()}.jsonl")
+
+    def _spill(self, records: Any, reason: str) -> None:
+        n = 0
+        with self._spill_lock:
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                with open(self._spill_path(), "a", encoding="utf-8") as f:
+                    for r in records:
+                        f.write(json.dumps(r, separators=(",", ":"), default=str) + "\n")
+                        n += 1
+            except OSError:
+                logger.exception("Could not spill prediction log records to %s", self.spill_dir)
+                records_total.inc(n or 1, outcome="lost")
+                return
+        if n:
+            records_total.inc(n, outcome="spilled", reason=reason)
+
+    def _claim_spills(self) -> List[str]:
+        """Renames this process's spill file and those of dead processes so nobody appends to them while replaying."""
+        claimed = []
+        try:
+            entries = [e.name for e in os.scandir(self.spill_dir)]
+        except OSError:
+            return claimed
+        me = os.getpid()
+        for name in entries:
+            if not (name.startswith(SPILL_PREFIX) and name.endswith(".jsonl")):
+                continue
+            try:
+                pid = int(name[len(SPILL_PREFIX):-len(".jsonl")])
+            except ValueError:
+                continue
+            if pid != me and _pid_alive(pid):
+                continue
+            src = os.path.join(self.spill_dir, name)
+            dst = os.path.join(self.spill_dir, f"{name[:-len('.jsonl')]}-{me}-{time.time_ns()}.replay")
+            try:
+                with self._spill_lock:
+                    os.rename(src, dst)
+            except OSError:
+                continue  # another process claimed it first
+            claimed.append(dst)
+        return claimed
+
+    def _maybe_replay(self) -> None:
+        if time.monotonic() < self._db_retry_at or not os.path.isdir(self.spill_dir):
+            return
+        with self._flush_lock:
+            for path in self._claim_spills():
+                with open(path, encoding="utf-8") as f:
+                    records = list(_read_spill(f))
+                for k in range(0, len(records), self.batch_rows):
+                    if not self._write(records[k:k + self.batch_rows], outcome="replayed"):
+                        # _write spilled the failed batch; put back the rest that was not tried yet
+                        self._spill(records[k + self.batch_rows:], reason="replay_failed")
+                        os.remove(path)
+                        return
+                os.remove(path)
+
+
+def _read_spill(lines) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue  # torn last line of a crashed writer
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> Optional[AuditWriter]:
+    global _writer
+    if not getattr(settings, "INFERENCE_AUDIT_ENABLED", False):
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                w = AuditWriter(
+                    queue_size=getattr(settings, "INFERENCE_AUDIT_QUEUE_SIZE", 10000),
+                    batch_rows=getattr(settings, "INFERENCE_AUDIT_BATCH_ROWS", 500),
+                    flush_ms=getattr(settings, "INFERENCE_AUDIT_FLUSH_MS", 1000.0),
+                    slow_ms=getattr(settings, "INFERENCE_AUDIT_SLOW_MS", 500.0),
+                    backoff_seconds=getattr(settings, "INFERENCE_AUDIT_BACKOFF_SECONDS", 30.0),
+                    spill_dir=str(getattr(settings, "INFERENCE_AUDIT_SPILL_DIR", "audit_spill")),
+                )
+                w.start()
+                atexit.register(w.drain)
+                _writer = w
+    return _writer
+
+
+def install_sigterm_drain() -> None:
+    """Drains the queue before exiting on SIGTERM; called where the server imports the app, in its main thread."""
+    # waitress leaves SIGTERM at the default, which skips atexit
+    if not getattr(settings, "INFERENCE_AUDIT_ENABLED", False):
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        return
+
+    def _drain_and_exit(signum, frame):
+        if _writer is not None:
+            _writer.drain()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _drain_and_exit)
+
+
+def record(endpoint: str, handle: Any, rows: Sequence[Any], results: Sequence[Dict[str, Any]],
+           latency_ms: Optional[float] = None, request_id: str = "") -> None:
+    w = get_writer()
+    if w is not None:
+        w.record(endpoint, handle, rows, results, latency_ms, request_id)
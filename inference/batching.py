@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics, services
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+batch_size_hist = metrics.histogram(
+    "microbatch_batch_size", "Rows per flushed micro-batch.", BATCH_SIZE_BUCKETS
+)
+queue_wait_hist = metrics.histogram(
+    "microbatch_queue_wait_ms", "Time a row waited in the micro-batch queue before its flush (ms)."
+)
+flush_counter = metrics.counter(
+    "microbatch_flushes_total", "Micro-batch flushes by trigger (size, timeout, close)."
+)
+
+
+class MicroBatcher:
+    """
+    Queues single items from concurrent callers and flushes them as one call to
+    ``fn(items) -> results`` once ``max_batch_size`` items are waiting or the
+    oldest item has waited ``max_wait_ms``. Each caller gets its own result.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32,
+                 max_wait_ms: float = 2.0, name: str = "predict"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.fn = fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.name = name
+        self._pending: Deque[Tuple[Any, Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name=f"microbatch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed.")
+            self._pending.append((item, fut, time.perf_counter()))
+            # wake the flusher only when it has something new to decide on
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+        return fut
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _take_batch(self) -> Tuple[List[Tuple[Any, Future, float]], str]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return [], "close"
+
+            deadline = self._pending[0][2] + self.max_wait
+            reason = "size"
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    reason = "timeout"
+                    break
+                self._cond.wait(remaining)
+            if self._closed and len(self._pending) < self.max_batch_size:
+                reason = "close"
+
+            n = min(len(self._pending), self.max_batch_size)
+            return [self._pending.popleft() for _ in range(n)], reason
+
+    def _loop(self) -> None:
+        while True:
+            batch, reason = self._take_batch()
+            if not batch:
+                return
+
+            now = time.perf_counter()
+            for _, _, enqueued in batch:
+                queue_wait_hist.observe((now - enqueued) * 1000.0, batcher=self.name)
+            batch_size_hist.observe(len(batch), batcher=self.name)
+            flush_counter.inc(batcher=self.name, reason=reason)
+
+            live = [(item, fut) for item, fut, _ in batch if fut.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            try:
+                results = self.fn([item for item, _ in live])
+                if len(results) != len(live):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(live)} items.")
+            except BaseException as e:
+                for _, fut in live:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(live, results):
+                fut.set_result(res)
+
+
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    services.predict_many,
+                    max_batch_size=getattr(settings, "INFERENCE_MICROBATCH_MAX_SIZE", 32),
+                    max_wait_ms=getattr(settings, "INFERENCE_MICROBATCH_MAX_WAIT_MS", 2.0),
+                )
+    return _batcher
+
+
+def predict(features: List[float]) -> Dict[str, Any]:
+    """Drop-in for services.predict that goes through the micro-batcher when it is enabled."""
+    if not getattr(settings, "INFERENCE_MICROBATCH_ENABLED", False):
+        return services.predict(features)
+    # reject bad rows up front so they can't fail the rest of the batch
+    services.check_features(features)
+    return get_batcher()(features)
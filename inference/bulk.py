@@ -0,0 +1,157 @@
+"""
+Chunked file scoring shared by ``manage.py score_file`` and the job queue (jobs.py):
+readers for CSV/JSONL/Parquet, per-chunk scoring and an output writer whose byte
+offset is the checkpoint a run resumes from.
+"""
+import csv
+import io
+import json
+import math
+import os
+from typing import Any, Dict, Iterator, List
+
+from . import drift, services, threads
+
+FORMATS = ("csv", "jsonl", "parquet")
+OUTPUT_FORMATS = ("jsonl", "csv")
+ALIASES = {"ndjson": "jsonl", "pq": "parquet"}
+
+
+def detect_format(path: str, explicit: str = "") -> str:
+    if explicit:
+        fmt = ALIASES.get(explicit.lower(), explicit.lower())
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported input format: {explicit!r} ({', '.join(FORMATS)}).")
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    ext = ALIASES.get(ext, ext)
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot infer format from {path!r}; pass the format ({', '.join(FORMATS)}).")
+    return ext
+
+
+def _clean(row: Dict[str, Any]) -> Dict[str, Any]:
+    # pandas/arrow give NaN/None for empty cells; the schema treats both as missing
+    return {str(k): (None if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+
+
+def read_chunks(path: str, fmt: str, chunk_rows: int) -> Iterator[List[Any]]:
+    if fmt == "csv":
+        import pandas as pd
+
+        # keep_default_na=False so country codes like "NA" (Namibia) are not read as missing
+        for frame in pd.read_csv(path, chunksize=chunk_rows, keep_default_na=False, na_values=[""]):
+            yield [_clean(r) for r in frame.to_dict(orient="records")]
+    elif fmt == "jsonl":
+        chunk: List[Any] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    chunk.append(json.loads(line))
+                except ValueError as e:
+                    chunk.append({"__invalid__": f"Invalid JSON: {e}"})
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("pyarrow is required to read Parquet files. Install requirements-optional.txt.") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield [_clean(r) for r in batch.to_pylist()]
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def count_rows(path: str, fmt: str) -> int:
+    """Data rows in the file, for progress reporting (a quick pass over the lines, or Parquet metadata)."""
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("pyarrow is required to read Parquet files. Install requirements-optional.txt.") from e
+        return pq.ParquetFile(path).metadata.num_rows
+    n = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                n += 1
+    return max(n - 1, 0) if fmt == "csv" else n
+
+
+def init_worker(workers: int = 1) -> None:
+    # each process gets its share of the CPUs for model threads, then loads once and reuses it for every chunk
+    threads.set_budget(threads.for_processes(workers))
+    # offline backfills must not feed the live drift report through INFERENCE_DRIFT_DIR
+    drift.disable()
+    services.load_model_and_meta()
+
+
+def score_chunk(rows: List[Any]) -> List[Dict[str, Any]]:
+    results: List[Any] = [None] * len(rows)
+    valid_idx: List[int] = []
+    valid: List[Any] = []
+    for i, r in enumerate(rows):
+        if isinstance(r, dict) and "__invalid__" in r:
+            results[i] = {"error": "bad_input", "detail": r["__invalid__"]}
+        else:
+            valid_idx.append(i)
+            valid.append(r)
+    for i, out in zip(valid_idx, services.predict_batch(valid) if valid else []):
+        results[i] = out
+    return results
+
+
+class ResultWriter:
+    FIELDS = ("index", "label", "confidence", "error", "detail")
+
+    def __init__(self, path: str, fmt: str, offset: int):
+        exists = os.path.exists(path) and offset > 0
+        self.f = open(path, "r+b" if exists else "wb")
+        self.f.seek(offset)
+        self.f.truncate()
+        self.fmt = fmt
+        if fmt == "csv" and not exists:
+            self._write_line(",".join(self.FIELDS))
+
+    def _write_line(self, line: str) -> None:
+        self.f.write(line.encode("utf-8") + b"\n")
+
+    def write(self, start: int, results: List[Dict[str, Any]]) -> None:
+        buf = io.StringIO()
+        if self.fmt == "csv":
+            w = csv.writer(buf, lineterminator="\n")
+            for k, out in enumerate(results):
+                rec = {"index": start + k, **out}
+                w.writerow([_csv_value(rec.get(f)) for f in self.FIELDS])
+        else:
+            for k, out in enumerate(results):
+                buf.write(json.dumps({"index": start + k, **out}, separators=(",", ":"), default=str) + "\n")
+        self.f.write(buf.getvalue().encode("utf-8"))
+
+    def commit(self) -> int:
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def _csv_value(v: Any) -> Any:
+    if v is None:
+        return ""
+    return json.dumps(v) if isinstance(v, (dict, list)) else v
+
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics, services
+
+lookups = metrics.counter("prediction_cache_lookups_total", "Prediction cache lookups by result (hit, miss, coalesced).")
+evictions = metrics.counter("prediction_cache_evictions_total", "Entries dropped from the in-process prediction cache (lru, ttl).")
+
+
+class LocalBackend:
+    """Bounded in-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                evictions.inc(reason="ttl")
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evictions.inc(reason="lru")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Shared backend on top of the Django cache framework (CACHES[alias])."""
+
+    def __init__(self, alias: str = "default", ttl: float = 300.0):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+        self.ttl = float(ttl)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.cache.set(key, value, timeout=self.ttl)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class PredictionCache:
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def get_or_compute(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        value = self.backend.get(key)
+        if value is not None:
+            lookups.inc(result="hit")
+            return dict(value)
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+
+        if not leader:
+            lookups.inc(result="coalesced")
+            return dict(fut.result())
+
+        lookups.inc(result="miss")
+        try:
+            value = fn()
+            self.backend.set(key, value)
+            fut.set_result(value)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return dict(value)
+
+
+def feature_key(features: List[Any], fingerprint: Optional[str] = None) -> str:
+    """Canonical key for an ordered, already-preprocessed row, scoped to the loaded model file."""
+    canonical = json.dumps([_canonical(v) for v in features], separators=(",", ":"), allow_nan=True)
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+    return f"pred:{(fingerprint or services.model_fingerprint())[:16]}:{digest}"
+
+
+def _canonical(v: Any) -> Any:
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if hasattr(v, "item"):
+        return v.item()
+    return v
+
+
+_cache: Optional[PredictionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[PredictionCache]:
+    global _cache
+    backend_name = getattr(settings, "INFERENCE_CACHE_BACKEND", "none")
+    if backend_name in ("", "none", "off"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = getattr(settings, "INFERENCE_CACHE_TTL_SECONDS", 300)
+                if backend_name == "local":
+                    backend = LocalBackend(getattr(settings, "INFERENCE_CACHE_MAX_ENTRIES", 10000), ttl)
+                elif backend_name == "django":
+                    backend = DjangoCacheBackend(getattr(settings, "INFERENCE_CACHE_ALIAS", "default"), ttl)
+                else:
+                    raise ValueError(f"Unknown INFERENCE_CACHE_BACKEND: {backend_name!r}")
+                _cache = PredictionCache(backend)
+    return _cache
+
+
+def predict(features: List[Any], fn: Callable[[List[Any]], Dict[str, Any]],
+            fingerprint: Optional[str] = None) -> Dict[str, Any]:
+    cache = get_cache()
+    if cache is None:
+        return fn(features)
+    return cache.get_or_compute(feature_key(features, fingerprint), lambda: fn(features))
@@ -0,0 +1,301 @@
+"""
+Sampled traffic capture for replay (benchmarks/replay.py).
+
+CaptureMiddleware keeps a random INFERENCE_CAPTURE_RATE fraction of POSTs under
+INFERENCE_CAPTURE_PATHS: request body, content type, X-Request-ID, wall-clock
+timestamp, status, response body and latency. The request thread only takes the
+raw bytes and puts them on a bounded queue (dropped when full). A writer thread
+decodes JSON and NDJSON (one row per line) bodies, blanks the
+INFERENCE_CAPTURE_REDACT fields and appends one JSON line per request to gzip
+files in INFERENCE_CAPTURE_DIR (``capture-<pid>-<start>.jsonl.gz``, rotated every
+INFERENCE_CAPTURE_ROTATE_MB of JSON). Other bodies (columnar batches, unparseable
+JSON) are stored base64-encoded; while redaction is configured their fields
+cannot be blanked, so those requests are not captured at all.
+
+Redacted fields are set to null, so replaying them exercises the missing-value
+path and their responses are expected to differ.
+"""
+import atexit
+import base64
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+captured = metrics.counter(
+    "capture_requests_total", "Sampled requests by outcome (written, dropped, too_large, unredactable, failed)."
+)
+
+PREFIX = "capture-"
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _decode(content_type: str, data: Optional[bytes], key: str) -> Dict[str, Any]:
+    if data is None:
+        return {}
+    media = (content_type or "").split(";")[0].strip().lower()
+    try:
+        if media == "application/json":
+            return {key: json.loads(data)} if data else {key: None}
+        if media in NDJSON_TYPES:
+            # blank lines are skipped by the stream endpoint too
+            return {f"{key}_lines": [json.loads(line) for line in data.splitlines() if line.strip()]}
+    except ValueError:
+        pass
+    return {f"{key}_b64": base64.b64encode(data).decode("ascii")}
+
+
+class Redactor:
+    """Sets the named features to None in /predict/ bodies: dict rows by key, list rows by schema position."""
+
+    def __init__(self, fields: Sequence[str], columns: Optional[Sequence[str]] = None):
+        self.fields = set(fields)
+        self.columns = list(columns or [])
+        self.positions = [i for i, c in enumerate(self.columns) if c in self.fields]
+
+    def row(self, row: Any) -> Any:
+        if isinstance(row, dict):
+            return {k: (None if k in self.fields else v) for k, v in row.items()}
+        if isinstance(row, list) and self.positions and len(row) == len(self.columns):
+            row = list(row)
+            for i in self.positions:
+                row[i] = None
+        return row
+
+    def body(self, body: Any) -> Any:
+        if not self.fields or not isinstance(body, dict):
+            return body
+        out = dict(body)
+        if "features" in out:
+            out["features"] = self.row(out["features"])
+        if isinstance(out.get("rows"), list):
+            out["rows"] = [self.row(r) for r in out["rows"]]
+        return out
+
+
+class CaptureWriter:
+
+    def __init__(self, directory: str, redact: Sequence[str] = (), rotate_bytes: int = 64 * 1024 * 1024,
+                 queue_size: int = 1000):
+        self.directory = directory
+        self.redact_fields = list(redact)
+        self.rotate_bytes = max(int(rotate_bytes), 1)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(int(queue_size), 1))
+        self._redactor: Optional[Redactor] = None
+        self._file: Any = None
+        self._written = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            captured.inc(outcome="dropped")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._close_file()
+
+    def redactor(self) -> Redactor:
+        if self._redactor is None:
+            columns: List[str] = []
+            if self.redact_fields:
+                try:
+                    from . import services
+
+                    schema = services.default_model().schema
+                    columns = schema.columns if schema is not None else []
+                except Exception:
+                    columns = []
+            self._redactor = Redactor(self.redact_fields, columns)
+        return self._redactor
+
+    def record(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The capture line of a request, or None when its body cannot be redacted."""
+        rec = {k: item[k] for k in ("ts", "method", "path", "query", "content_type", "request_id")}
+        rec.update(_decode(item["content_type"], item["body"], "body"))
+        if self.redact_fields and "body_b64" in rec:
+            return None
+        if "body" in rec:
+            rec["body"] = self.redactor().body(rec["body"])
+        if "body_lines" in rec and self.redact_fields:
+            rec["body_lines"] = [self.redactor().row(r) for r in rec["body_lines"]]
+        rec.update(status=item["status"], latency_ms=item["latency_ms"])
+        rec.update(_decode(item["response_type"], item["response"], "response"))
+        return rec
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                if self._file is not None:
+                    self._file.flush()  # sync flush: what was written so far is readable
+                continue
+            if item is None:
+                return
+            try:
+                rec = self.record(item)
+                if rec is None:
+                    captured.inc(outcome="unredactable")
+                    continue
+                self._write(json.dumps(rec, separators=(",", ":"), default=str) + "\n")
+            except Exception:
+                logger.exception("Could not write a captured request")
+                captured.inc(outcome="failed")
+                continue
+            captured.inc(outcome="written")
+
+    def _write(self, line: str) -> None:
+        if self._file is None or self._written >= self.rotate_bytes:
+            self._close_file()
+            name = f"{PREFIX}{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**6:06d}.jsonl.gz"
+            self._file = gzip.open(os.path.join(self.directory, name), "wt", encoding="utf-8")
+            self._written = 0
+        self._file.write(line)
+        self._written += len(line)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+_writer: Optional[CaptureWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> CaptureWriter:
+    # one writer for both middleware chains (DRF and the lean mount)
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                w = CaptureWriter(
+                    str(getattr(settings, "INFERENCE_CAPTURE_DIR", "captures")),
+                    redact=getattr(settings, "INFERENCE_CAPTURE_REDACT", []),
+                    rotate_bytes=int(float(getattr(settings, "INFERENCE_CAPTURE_ROTATE_MB", 64)) * 1024 * 1024),
+                    queue_size=getattr(settings, "INFERENCE_CAPTURE_QUEUE_SIZE", 1000),
+                )
+                w.start()
+                atexit.register(w.close)
+                _writer = w
+    return _writer
+
+
+class CaptureMiddleware:
+    """Samples INFERENCE_CAPTURE_PATHS traffic into the capture files; removed from the chain when the rate is 0."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = float(getattr(settings, "INFERENCE_CAPTURE_RATE", 0.0))
+        if self.rate <= 0:
+            raise MiddlewareNotUsed()
+        self.prefixes = tuple(getattr(settings, "INFERENCE_CAPTURE_PATHS", ("/api/v1/predict/",)))
+        self.max_bytes = int(getattr(settings, "INFERENCE_CAPTURE_MAX_BYTES", 1024 * 1024))
+        self.writer = get_writer()
+
+    def __call__(self, request):
+        if request.method != "POST" or not request.path.startswith(self.prefixes) or random.random() >= self.rate:
+            return self.get_response(request)
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > self.max_bytes:
+            # reading it here would buffer a streaming upload in memory
+            captured.inc(outcome="too_large")
+            return self.get_response(request)
+
+        body = request.body
+        ts = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        latency_ms = (time.perf_counter() - started) * 1000.0
+
+        content = None
+        if not getattr(response, "streaming", False) and len(response.content) <= self.max_bytes:
+            content = response.content
+        self.writer.put({
+            "ts": ts,
+            "method": request.method,
+            "path": request.path,
+            "query": request.META.get("QUERY_STRING", ""),
+            "content_type": request.content_type,
+            "request_id": request.META.get("HTTP_X_REQUEST_ID", ""),
+            "body": body,
+            "status": response.status_code,
+            "latency_ms": round(latency_ms, 3),
+            "response_type": response.get("Content-Type", ""),
+            "response": content,
+        })
+        return response
+
+
+# ---- reading ----
+
+def _lines(path: str) -> Iterator[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line
+    except (EOFError, gzip.BadGzipFile):
+        # file of a live or crashed writer: everything up to the last sync flush is there
+        return
+
+
+def read_capture(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Captured requests from capture files or directories of them, in file order."""
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, n) for n in os.listdir(path)
+                if n.startswith(PREFIX) and (n.endswith(".jsonl.gz") or n.endswith(".jsonl"))
+            )
+        else:
+            files = [path]
+        for file in files:
+            for line in _lines(file):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+
+
+def request_body(rec: Dict[str, Any]) -> bytes:
+    if "body_b64" in rec:
+        return base64.b64decode(rec["body_b64"])
+    if "body_lines" in rec:
+        return "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in rec["body_lines"]).encode("utf-8")
+    if rec.get("body") is None:
+        return b""
+    return json.dumps(rec["body"], separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,248 @@
+"""
+Columnar binary payloads for batch scoring, selected by Content-Type:
+
+- Arrow IPC stream   application/vnd.apache.arrow.stream  (one column per feature)
+- NumPy .npy         application/x-npy                    (2-D numeric array, numeric-only models)
+- msgpack            application/msgpack                  ({"columns": {name: [values]}} or {name: [values]})
+
+Columns are handed to the validator and the model as arrays, without building
+per-row dicts. The response uses the request's format: label / confidence / error /
+detail columns in input order (detail is the JSON-encoded per-field error list).
+"""
+import io
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ARROW = "application/vnd.apache.arrow.stream"
+NPY = "application/x-npy"
+MSGPACK = "application/msgpack"
+
+CONTENT_TYPES = {
+    ARROW: ARROW,
+    "application/vnd.apache.arrow.file": ARROW,
+    NPY: NPY,
+    "application/x-numpy": NPY,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+}
+
+
+class UnsupportedFormat(Exception):
+    """The payload format cannot be used here (unknown type, missing library, wrong model)."""
+
+
+class Payload:
+    """Undecoded columnar request body, as returned by the DRF parsers in parsers.py."""
+
+    def __init__(self, content_type: str, body: bytes):
+        self.content_type = content_type
+        self.body = body
+
+
+def media_type(content_type: str) -> Optional[str]:
+    return CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+# ---- decoding ----
+
+def decode(fmt: str, body: bytes, columns: List[str], numeric_only: bool) -> Tuple[Dict[str, Any], int]:
+    if fmt == ARROW:
+        return _decode_arrow(body)
+    if fmt == NPY:
+        if not numeric_only:
+            raise UnsupportedFormat(".npy payloads need a model with numeric features only; use Arrow or msgpack.")
+        return _decode_npy(body, columns)
+    if fmt == MSGPACK:
+        return _decode_msgpack(body)
+    raise UnsupportedFormat(f"Unsupported content type: {fmt}")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise UnsupportedFormat("pyarrow is required for Arrow payloads. Install requirements-optional.txt.") from e
+    return pa
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise UnsupportedFormat("msgpack is required for msgpack payloads. Install requirements-optional.txt.") from e
+    return msgpack
+
+
+def _decode_arrow(body: bytes) -> Tuple[Dict[str, Any], int]:
+    pa = _pyarrow()
+    buf = pa.py_buffer(body)
+    try:
+        table = pa.ipc.open_stream(buf).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_file(buf).read_all()
+    out: Dict[str, Any] = {}
+    for name in table.column_names:
+        col = table.column(name)
+        col = col.chunk(0) if col.num_chunks == 1 else col.combine_chunks()
+        if pa.types.is_dictionary(col.type):
+            col = col.dictionary_decode()
+        if pa.types.is_integer(col.type) and col.null_count:
+            col = col.cast(pa.float64())  # nulls -> NaN for the imputer
+        # numeric columns without nulls are zero-copy views of the IPC buffer
+        out[name] = col.to_numpy(zero_copy_only=False)
+    return out, table.num_rows
+
+
+def _decode_npy(body: bytes, columns: List[str]) -> Tuple[Dict[str, Any], int]:
+    f = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            raise ValueError(f"unsupported format version {version}")
+    except ValueError as e:
+        raise ValueError(f"Invalid .npy payload: {e}") from None
+    if dtype.hasobject or dtype.kind not in "fiub":
+        raise ValueError(f".npy payload must be a numeric array, got dtype {dtype}.")
+    if len(shape) != 2 or shape[1] != len(columns):
+        raise ValueError(f".npy payload must have shape (n, {len(columns)}), got {shape}.")
+    # view over the request body: no copy, one strided column per feature
+    arr = np.frombuffer(body, dtype=dtype, count=shape[0] * shape[1], offset=f.tell())
+    arr = arr.reshape(shape, order="F" if fortran else "C")
+    return {name: arr[:, j] for j, name in enumerate(columns)}, shape[0]
+
+
+def _decode_msgpack(body: bytes) -> Tuple[Dict[str, Any], int]:
+    msgpack = _msgpack()
+    try:
+        data = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid msgpack payload: {e}") from None
+    if isinstance(data, dict) and isinstance(data.get("columns"), dict):
+        data = data["columns"]
+    if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+        raise ValueError('msgpack payload must be {"columns": {name: [values, ...]}}.')
+    out: Dict[str, Any] = {}
+    for name, values in data.items():
+        try:
+            out[str(name)] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            out[str(name)] = np.array(values, dtype=object)
+    n = len(next(iter(out.values()))) if out else 0
+    return out, n
+
+
+# ---- encoding ----
+
+def encode(fmt: str, labels: List[Any], confidences: List[Optional[float]],
+           errors: List[Optional[str]], details: List[Optional[Any]]) -> bytes:
+    if fmt == ARROW:
+        pa = _pyarrow()
+        table = pa.table({
+            "label": pa.array([None if v is None else str(v) for v in labels], type=pa.string()),
+            "confidence": pa.array(confidences, type=pa.float64()),
+            "error": pa.array(errors, type=pa.string()),
+            "detail": pa.array([None if d is None else json.dumps(d) for d in details], type=pa.string()),
+        })
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if fmt == NPY:
+        width = max([len(str(v)) for v in labels if v is not None] + [1])
+        ewidth = max([len(e) for e in errors if e] + [1])
+        out = np.zeros(len(labels), dtype=[("label", f"U{width}"), ("confidence", "f8"), ("error", f"U{ewidth}")])
+        out["label"] = ["" if v is None else str(v) for v in labels]
+        out["confidence"] = [np.nan if c is None else c for c in confidences]
+        out["error"] = [e or "" for e in errors]
+        buf = io.BytesIO()
+        np.lib.format.write_array(buf, out, allow_pickle=False)
+        return buf.getvalue()
+    if fmt == MSGPACK:
+        return _msgpack().packb(
+            {"label": labels, "confidence": confidences, "error": errors, "detail": details}, use_bin_type=True
+        )
+    raise UnsupportedFormat(f"Unsupported content type: {fmt}")
+
+
+# ---- row views (audit log) ----
+
+class ColumnRows(Sequence):
+    """Row i of the decoded columns as a {name: value} dict, built only when read."""
+
+    def __init__(self, columns: Dict[str, Any], n: int):
+        self.columns = columns
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {name: col[i] for name, col in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(self.n))
+
+
+class ColumnResults(Sequence):
+
+    def __init__(self, labels: List[Any], confidences: List[Optional[float]], errors: List[Optional[str]]):
+        self.labels, self.confidences, self.errors = labels, confidences, errors
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if self.errors[i]:
+            return {"error": self.errors[i]}
+        return {"label": self.labels[i], "confidence": self.confidences[i]}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(len(self)))
+
+
+# ---- scoring ----
+
+def score(handle: Any, content_type: str, body: bytes, max_rows: Optional[int] = None,
+          record: Optional[Callable[[Sequence, Sequence], None]] = None) -> Tuple[bytes, str]:
+    """
+    Decodes a columnar batch, validates it column-wise and scores it with one model call.
+    Raises UnsupportedFormat, ValueError (undecodable body) or
+    validation.ValidationFailed (request-level problems such as a missing column).
+    ``record(rows, results)`` gets lazy row/result views for the audit log.
+    """
+    fmt = media_type(content_type)
+    if fmt is None:
+        raise UnsupportedFormat(f"Unsupported content type: {content_type}")
+    if handle.validator is None:
+        raise UnsupportedFormat("Columnar payloads need a model bundle with feature_columns/num_cols/cat_cols.")
+
+    schema = handle.schema
+    columns, n = decode(fmt, body, schema.columns, all(schema.is_numeric))
+    if n == 0:
+        raise ValueError("Batch is empty.")
+    if max_rows is not None and n > max_rows:
+        raise ValueError(f"Batch too large: {n} rows, limit is {max_rows}.")
+
+    typed, valid_idx, failed = handle.validator.validate_columns(columns, n)
+    labels: List[Any] = [None] * n
+    confidences: List[Optional[float]] = [None] * n
+    errors: List[Optional[str]] = [None] * n
+    details: List[Optional[Any]] = [None] * n
+    if len(valid_idx):
+        scored_labels, scored_conf = handle.predict_columns(typed, len(valid_idx))
+        for i, y, c in zip(valid_idx.tolist(), scored_labels, scored_conf):
+            labels[i] = y
+            confidences[i] = None if c is None else round(float(c), 6)
+    for i, errs in failed.items():
+        errors[i] = "bad_input"
+        details[i] = errs
+    if record is not None:
+        record(ColumnRows(columns, n), ColumnResults(labels, confidences, errors))
+    return encode(fmt, labels, confidences, errors, details), fmt
@@ -0,0 +1,510 @@
+"""
+Streaming input-drift monitor.
+
+Every LoadedModel with a feature schema gets a DriftMonitor. The scoring calls hand
+it the typed rows (or columns) they have already built; ``offer()`` only puts them
+on a bounded queue shared by all monitors and drops them when it is full. One
+background thread folds queued batches into fixed-size sketches:
+
+- numeric columns: counts over fixed bin edges, plus count/sum/sum of squares/min/max
+- categorical columns: a count per fitted category, the unseen total and a
+  Misra-Gries top-k of the unseen values
+
+Memory per model does not grow with traffic, and sketches merge by addition
+(Misra-Gries by add-then-trim), so the per-worker states written to
+INFERENCE_DRIFT_DIR can be combined by whichever worker serves the drift endpoint.
+Sketches are kept for the process lifetime and for wall-clock windows of
+INFERENCE_DRIFT_WINDOW_SECONDS, aligned on the epoch so windows line up across
+workers; "recent" scores cover the current and the previous window.
+
+The reference profile is built once per model load, from either:
+
+- a ``drift_reference`` key in the bundle or a ``<model>.drift.json`` sidecar
+  (``manage.py drift_reference`` writes one from training data): quantile bin edges
+  with their training proportions and category frequencies, for PSI and a binned
+  KS statistic;
+- or, failing that, the fitted pipeline: StandardScaler mean/variance and the
+  OneHotEncoder categories, for the mean shift in training standard deviations,
+  the std ratio and the unseen-category rate. PSI/KS need the binned reference.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics, validation
+
+logger = logging.getLogger(__name__)
+
+offered = metrics.counter("drift_batches_total", "Batches offered to the drift monitor by outcome (queued, dropped).")
+
+PSI_EPS = 1e-4
+# bin edges, in training standard deviations around the mean, when the reference has no bins
+FALLBACK_Z = np.arange(-3.0, 3.5, 0.5)
+MEAN_SHIFT_ALERT = 0.5
+UNSEEN_RATE_ALERT = 0.01
+
+
+# ---- reference profile ----
+
+class Reference:
+
+    def __init__(self, numeric: Dict[str, Dict[str, Any]], categorical: Dict[str, Dict[str, Any]], source: str):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.source = source
+        text = json.dumps({"numeric": numeric, "categorical": categorical}, sort_keys=True, default=str)
+        self.fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+    def edges(self, col: str) -> np.ndarray:
+        ref = self.numeric[col]
+        if ref.get("edges") is not None:
+            return np.asarray(ref["edges"], dtype=np.float64)
+        if ref.get("std"):
+            return ref["mean"] + ref["std"] * FALLBACK_Z
+        return np.asarray([ref.get("mean", 0.0)], dtype=np.float64)
+
+
+def profile(columns: Dict[str, Sequence[Any]], schema: Any, bins: int = 10) -> Dict[str, Any]:
+    """Binned reference profile of training data, as stored under ``drift_reference``."""
+    numeric: Dict[str, Any] = {}
+    categorical: Dict[str, Any] = {}
+    for col in schema.num_names:
+        v = np.asarray(columns[col], dtype=np.float64)
+        v = v[~np.isnan(v)]
+        if not len(v):
+            continue
+        edges = np.unique(np.quantile(v, np.linspace(0.0, 1.0, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, v, side="right"), minlength=len(edges) + 1)
+        numeric[col] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+            "mean": float(v.mean()),
+            "std": float(v.std()),
+        }
+    for col in schema.cat_names:
+        counts = Counter(str(x) for x in columns[col] if x is not None and x == x)
+        total = sum(counts.values()) or 1
+        cats = sorted(counts)
+        categorical[col] = {"categories": cats, "proportions": [counts[c] / total for c in cats]}
+    return {"numeric": numeric, "categorical": categorical}
+
+
+def reference_path(model_path: str) -> str:
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, "drift_reference.json")
+    return model_path + ".drift.json"
+
+
+def load_reference(raw: Any, model: Any, schema: Any, model_path: str) -> Reference:
+    stored = raw.get("drift_reference") if isinstance(raw, dict) else None
+    source = "bundle"
+    if stored is None and os.path.isfile(reference_path(model_path)):
+        with open(reference_path(model_path), encoding="utf-8") as f:
+            stored = json.load(f)
+        source = "sidecar"
+    if stored is not None:
+        numeric = {c: stored.get("numeric", {}).get(c, {}) for c in schema.num_names}
+        categorical = {c: stored.get("categorical", {}).get(c, {}) for c in schema.cat_names}
+    else:
+        source = "pipeline"
+        numeric = {c: {} for c in schema.num_names}
+        categorical = {c: {} for c in schema.cat_names}
+    # the fitted pipeline fills in whatever the stored profile does not have
+    for col, (mean, std) in _scaler_stats(model).items():
+        if col in numeric:
+            numeric[col].setdefault("mean", mean)
+            numeric[col].setdefault("std", std)
+    for col, cats in validation.fitted_categories(model).items():
+        if col in categorical:
+            categorical[col].setdefault("categories", [str(c) for c in cats])
+    return Reference(numeric, categorical, source)
+
+
+def _scaler_stats(model: Any) -> Dict[str, Tuple[float, float]]:
+    out: Dict[str, Tuple[float, float]] = {}
+    for col, (lo, hi) in validation.fitted_ranges(model, 1.0).items():
+        out[col] = ((lo + hi) / 2.0, (hi - lo) / 2.0)
+    return out
+
+
+# ---- sketches ----
+
+class NumericSketch:
+
+    def __init__(self, n_bins: int):
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.missing = 0
+        self.n = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def update(self, values: np.ndarray, edges: np.ndarray) -> None:
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        v = values[~nan]
+        if not len(v):
+            return
+        self.counts += np.bincount(np.searchsorted(edges, v, side="right"), minlength=len(self.counts))
+        self.n += len(v)
+        self.sum += float(v.sum())
+        self.sumsq += float(np.dot(v, v))
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+
+    def merge(self, d: Dict[str, Any]) -> None:
+        self.counts += np.asarray(d["counts"], dtype=np.int64)
+        self.missing += d["missing"]
+        self.n += d["n"]
+        self.sum += d["sum"]
+        self.sumsq += d["sumsq"]
+        if d["n"]:
+            self.min = min(self.min, d["min"])
+            self.max = max(self.max, d["max"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts.tolist(), "missing": self.missing, "n": self.n, "sum": self.sum,
+                "sumsq": self.sumsq, "min": self.min if self.n else None, "max": self.max if self.n else None}
+
+
+class CategoricalSketch:
+
+    def __init__(self, categories: Sequence[str], top_k: int):
+        self.index = {c: i for i, c in enumerate(categories)}
+        self.counts = np.zeros(len(categories), dtype=np.int64)
+        self.missing = 0
+        self.unseen = 0
+        self.top_k = top_k
+        self.top: Dict[str, int] = {}
+
+    def update(self, values: Iterable[Any]) -> None:
+        for v, c in Counter(values).items():
+            if v is None or v != v:
+                self.missing += c
+                continue
+            i = self.index.get(str(v))
+            if i is not None:
+                self.counts[i] += c
+            else:
+                self.unseen += c
+                self._add_unseen(str(v), c)
+
+    def _add_unseen(self, value: str, count: int) -> None:
+        # weighted Misra-Gries: add, then subtract the (k+1)-th largest counter from all
+        self.top[value] = self.top.get(value, 0) + count
+        if len(self.top) > self.top_k:
+            cut = sorted(self.top.values(), reverse=True)[self.top_k]
+            self.top = {k: c - cut for k, c in self.top.items() if c > cut}
+
+    def merge(self, d: Dict[str, Any]) -> None:
+        self.counts += np.asarray(d["counts"], dtype=np.int64)
+        self.missing += d["missing"]
+        self.unseen += d["unseen"]
+        for value, count in d["top"].items():
+            self._add_unseen(value, count)
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum()) + self.unseen
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts.tolist(), "missing": self.missing, "unseen": self.unseen, "top": dict(self.top)}
+
+
+class Sketches:
+    """One sketch per schema column."""
+
+    def __init__(self, reference: Reference, schema: Any, top_k: int):
+        self.rows = 0
+        self.numeric = {c: NumericSketch(len(reference.edges(c)) + 1) for c in schema.num_names}
+        self.categorical = {c: CategoricalSketch(reference.categorical[c].get("categories", []), top_k)
+                            for c in schema.cat_names}
+
+    def merge(self, d: Dict[str, Any]) -> None:
+        self.rows += d["rows"]
+        for c, s in d["numeric"].items():
+            if c in self.numeric:
+                self.numeric[c].merge(s)
+        for c, s in d["categorical"].items():
+            if c in self.categorical:
+                self.categorical[c].merge(s)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "numeric": {c: s.to_dict() for c, s in self.numeric.items()},
+            "categorical": {c: s.to_dict() for c, s in self.categorical.items()},
+        }
+
+
+# ---- scores ----
+
+def psi(counts: np.ndarray, expected: Optional[Sequence[float]]) -> Optional[float]:
+    total = counts.sum()
+    if expected is None or total == 0 or len(expected) != len(counts):
+        return None
+    a = np.maximum(counts / total, PSI_EPS)
+    e = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPS)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks(counts: np.ndarray, expected: Optional[Sequence[float]]) -> Optional[float]:
+    """Largest CDF gap at the bin edges: a lower bound on the two-sample KS statistic."""
+    total = counts.sum()
+    if expected is None or total == 0 or len(expected) != len(counts):
+        return None
+    return float(np.max(np.abs(np.cumsum(counts) / total - np.cumsum(expected))))
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v, 6)
+
+
+def scores(sketches: Sketches, reference: Reference, psi_alert: float) -> Dict[str, Any]:
+    columns: Dict[str, Any] = {}
+    drifted: List[str] = []
+    for col, s in sketches.numeric.items():
+        ref = reference.numeric[col]
+        out: Dict[str, Any] = {"kind": "numeric", "rows": s.n + s.missing,
+                               "missing_rate": _round(s.missing / (s.n + s.missing)) if s.n + s.missing else None}
+        if s.n:
+            mean = s.sum / s.n
+            std = max(s.sumsq / s.n - mean * mean, 0.0) ** 0.5
+            out.update(mean=_round(mean), std=_round(std), min=s.min, max=s.max)
+            if ref.get("std"):
+                out["mean_shift"] = _round((mean - ref["mean"]) / ref["std"])
+                out["std_ratio"] = _round(std / ref["std"])
+        out["psi"] = _round(psi(s.counts, ref.get("proportions")))
+        out["ks"] = _round(binned_ks(s.counts, ref.get("proportions")))
+        if (out["psi"] or 0.0) >= psi_alert or abs(out.get("mean_shift") or 0.0) >= MEAN_SHIFT_ALERT:
+            drifted.append(col)
+        columns[col] = out
+    for col, s in sketches.categorical.items():
+        ref = reference.categorical[col]
+        n = s.n
+        out = {"kind": "categorical", "rows": n + s.missing,
+               "missing_rate": _round(s.missing / (n + s.missing)) if n + s.missing else None,
+               "unseen_rate": _round(s.unseen / n) if n else None,
+               "top_unseen": sorted(s.top.items(), key=lambda kv: -kv[1])}
+        expected = ref.get("proportions")
+        # unseen values form one extra bin the training data had nothing in
+        out["psi"] = _round(psi(np.append(s.counts, s.unseen), None if expected is None else list(expected) + [0.0]))
+        if (out["psi"] or 0.0) >= psi_alert or (out["unseen_rate"] or 0.0) >= UNSEEN_RATE_ALERT:
+            drifted.append(col)
+        columns[col] = out
+    return {"rows": sketches.rows, "drifted": drifted, "columns": columns}
+
+
+# ---- monitor ----
+
+class DriftMonitor:
+
+    def __init__(self, key: str, schema: Any, reference: Reference, window_seconds: float = 300.0,
+                 top_k: int = 20, psi_alert: float = 0.2):
+        self.key = key
+        self.schema = schema
+        self.reference = reference
+        self.window_seconds = max(float(window_seconds), 1.0)
+        self.top_k = max(int(top_k), 1)
+        self.psi_alert = float(psi_alert)
+        self._edges = {c: reference.edges(c) for c in schema.num_names}
+        self._num_pos = [schema.columns.index(c) for c in schema.num_names]
+        self._cat_pos = [schema.columns.index(c) for c in schema.cat_names]
+        self._lock = threading.Lock()
+        self.lifetime = self._empty()
+        self.windows: Dict[int, Sketches] = {}
+
+    def _empty(self) -> Sketches:
+        return Sketches(self.reference, self.schema, self.top_k)
+
+    def _window_id(self) -> int:
+        return int(time.time() // self.window_seconds)
+
+    # request side: no work beyond the enqueue
+    def offer_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        _enqueue(self, rows, None, len(rows))
+
+    def offer_columns(self, columns: Dict[str, Any], n: int) -> None:
+        _enqueue(self, None, columns, n)
+
+    # worker side
+    def update(self, rows: Optional[Sequence[Sequence[Any]]], columns: Optional[Dict[str, Any]], n: int) -> None:
+        if rows is not None:
+            cols = list(zip(*rows))
+            num = {c: np.asarray(cols[i], dtype=np.float64) for c, i in zip(self.schema.num_names, self._num_pos)}
+            cat = {c: cols[i] for c, i in zip(self.schema.cat_names, self._cat_pos)}
+        else:
+            num = {c: np.asarray(columns[c], dtype=np.float64) for c in self.schema.num_names}
+            cat = {c: columns[c] for c in self.schema.cat_names}
+        wid = self._window_id()
+        with self._lock:
+            window = self.windows.get(wid)
+            if window is None:
+                window = self.windows[wid] = self._empty()
+                for old in [w for w in self.windows if w < wid - 1]:
+                    del self.windows[old]
+            for sk in (self.lifetime, window):
+                sk.rows += n
+                for c, v in num.items():
+                    sk.numeric[c].update(v, self._edges[c])
+                for c, v in cat.items():
+                    sk.categorical[c].update(v)
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "reference": self.reference.fingerprint,
+                "lifetime": self.lifetime.to_dict(),
+                "windows": {str(w): s.to_dict() for w, s in self.windows.items()},
+            }
+
+    def report(self, states: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """Scores of the merged ``states`` (this and other workers' state())."""
+        recent, lifetime = self._empty(), self._empty()
+        oldest = self._window_id() - 1
+        merged = 0
+        for st in states:
+            if st.get("reference") != self.reference.fingerprint:
+                continue  # another worker still serving a different artifact
+            merged += 1
+            lifetime.merge(st["lifetime"])
+            for w, sk in st["windows"].items():
+                if int(w) >= oldest:
+                    recent.merge(sk)
+        return {
+            "model": self.key,
+            "reference": self.reference.source,
+            "window_seconds": self.window_seconds,
+            "workers": merged,
+            "recent": scores(recent, self.reference, self.psi_alert),
+            "lifetime": scores(lifetime, self.reference, self.psi_alert),
+        }
+
+
+# ---- background worker, one per process ----
+
+_queue: "Optional[queue.Queue[Tuple[DriftMonitor, Any, Any, int]]]" = None
+_monitors: Dict[str, DriftMonitor] = {}
+_worker_pid: Optional[int] = None
+_worker_lock = threading.Lock()
+_disabled = False
+
+
+def disable() -> None:
+    """Turns monitoring off for models loaded later in this process (offline scoring workers)."""
+    global _disabled
+    _disabled = True
+
+
+def _enqueue(monitor: DriftMonitor, rows: Any, columns: Any, n: int) -> None:
+    _ensure_worker()
+    try:
+        _queue.put_nowait((monitor, rows, columns, n))
+    except queue.Full:
+        offered.inc(outcome="dropped")
+        return
+    offered.inc(outcome="queued")
+
+
+def _ensure_worker() -> None:
+    global _queue, _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        # also taken after a fork: the parent's thread did not come along
+        _queue = queue.Queue(maxsize=max(int(getattr(settings, "INFERENCE_DRIFT_QUEUE_SIZE", 256)), 1))
+        _worker_pid = os.getpid()
+        threading.Thread(target=_run, name="drift-monitor", daemon=True).start()
+
+
+def _run() -> None:
+    directory = getattr(settings, "INFERENCE_DRIFT_DIR", "")
+    interval = float(getattr(settings, "INFERENCE_DRIFT_FLUSH_SECONDS", 5.0))
+    next_flush = time.monotonic() + interval
+    q = _queue
+    while True:
+        try:
+            monitor, rows, columns, n = q.get(timeout=max(next_flush - time.monotonic(), 0.05))
+            try:
+                monitor.update(rows, columns, n)
+            except Exception:
+                logger.exception("Drift monitor update failed for %s", monitor.key)
+        except queue.Empty:
+            pass
+        if directory and time.monotonic() >= next_flush:
+            try:
+                write_state(directory)
+            except OSError:
+                pass
+            next_flush = time.monotonic() + interval
+
+
+def monitor_for(handle: Any) -> Optional[DriftMonitor]:
+    """Builds and registers the monitor of a LoadedModel, or None when disabled or without a schema."""
+    # settings.configured: services is also imported by the benchmarks without Django
+    if _disabled or not settings.configured or not getattr(settings, "INFERENCE_DRIFT_ENABLED", False) or handle.schema is None:
+        return None
+    try:
+        reference = load_reference(handle.raw, handle.model, handle.schema, handle.path)
+    except (OSError, ValueError) as e:
+        logger.warning("Drift monitor disabled for %s: %s", handle.path, e)
+        return None
+    key = f"{handle.metric_labels['model']}:{handle.metric_labels['version']}"
+    monitor = DriftMonitor(
+        key, handle.schema, reference,
+        window_seconds=getattr(settings, "INFERENCE_DRIFT_WINDOW_SECONDS", 300.0),
+        top_k=getattr(settings, "INFERENCE_DRIFT_TOP_K", 20),
+        psi_alert=getattr(settings, "INFERENCE_DRIFT_PSI_ALERT", 0.2),
+    )
+    _ensure_worker()
+    _monitors[key] = monitor
+    return monitor
+
+
+def forget(monitor: Optional[DriftMonitor]) -> None:
+    """Drops an unloaded model's monitor so its sketches stop being flushed and reported."""
+    if monitor is not None and _monitors.get(monitor.key) is monitor:
+        del _monitors[monitor.key]
+
+
+# ---- multi-process aggregation, same layout as metrics: <dir>/drift-<pid>.json ----
+
+def write_state(directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"drift-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({key: m.state() for key, m in list(_monitors.items())}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def collect(monitor: DriftMonitor, directory: str = "") -> Dict[str, Any]:
+    """Drift report for ``monitor``'s model over this worker, or all workers when ``directory`` is set."""
+    if not directory:
+        return monitor.report([monitor.state()])
+    write_state(directory)
+    states = []
+    for entry in os.scandir(directory):
+        if not (entry.name.startswith("drift-") and entry.name.endswith(".json")):
+            continue
+        try:
+            with open(entry.path, encoding="utf-8") as f:
+                st = json.load(f).get(monitor.key)
+        except (OSError, ValueError):
+            continue
+        if st is not None:
+            states.append(st)
+    return monitor.report(states)
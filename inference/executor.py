@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from django.conf import settings
+
+from . import metrics, services, threads
+
+admissions = metrics.counter("executor_admissions_total", "Async inference admissions by outcome (accepted, rejected, expired).")
+queue_wait_hist = metrics.histogram("executor_queue_wait_ms", "Time between admission and a pool worker picking the request up (ms).")
+
+
+class Overloaded(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _run_before_deadline(deadline: Optional[float], enqueued: float, fn: Callable, *args: Any) -> Any:
+    # runs in the pool; deadline/enqueued are wall-clock so they survive a process hop
+    if deadline is not None and time.time() > deadline:
+        raise DeadlineExceeded("Deadline expired while queued.")
+    return (time.time() - enqueued) * 1000.0, fn(*args)
+
+
+class BoundedExecutor:
+    """
+    A fixed-size thread or process pool behind an admission limit of
+    ``workers + queue_size`` in-flight calls. Calls over the limit fail fast with
+    Overloaded instead of queueing; queued calls whose deadline has passed are
+    cancelled (or skipped when a worker picks them up) instead of being run late.
+    """
+
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        self.workers = max(int(workers), 1)
+        self.capacity = self.workers + max(int(queue_size), 0)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        if kind == "process":
+            self._pool = ProcessPoolExecutor(self.workers)
+        elif kind == "thread":
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+        else:
+            raise ValueError(f"Unknown executor kind: {kind!r}")
+        self.kind = kind
+
+    def submit(self, fn: Callable, *args: Any, deadline: Optional[float] = None) -> Future:
+        if not self._slots.acquire(blocking=False):
+            admissions.inc(outcome="rejected")
+            raise Overloaded(f"Inference queue is full ({self.capacity} in flight).")
+        try:
+            fut = self._pool.submit(_run_before_deadline, deadline, time.time(), fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        admissions.inc(outcome="accepted")
+        return fut
+
+    async def run(self, fn: Callable, *args: Any, deadline: Optional[float] = None) -> Any:
+        fut = self.submit(fn, *args, deadline=deadline)
+        timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+        try:
+            # cancelling the asyncio wrapper cancels the pool future if it has not started
+            waited_ms, result = await asyncio.wait_for(asyncio.wrap_future(fut), timeout)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            admissions.inc(outcome="expired")
+            raise DeadlineExceeded("Deadline exceeded.") from None
+        queue_wait_hist.observe(waited_ms, kind=self.kind)
+        return result
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def predict_payload(payload: Union[List[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    # plain services call so it can run in a process pool worker
+    handle = services.default_model()
+    return handle.predict(handle.preprocess(payload))
+
+
+def predict_payload_cached(payload: Union[List[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    from . import batching, cache
+
+    handle = services.default_model()
+    return cache.predict(handle.preprocess(payload), batching.predict)
+
+
+_executor: Optional[BoundedExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> BoundedExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(
+                    workers=getattr(settings, "INFERENCE_ASYNC_WORKERS", None) or threads.budget().cpus,
+                    queue_size=getattr(settings, "INFERENCE_ASYNC_QUEUE_SIZE", 64),
+                    kind=getattr(settings, "INFERENCE_ASYNC_EXECUTOR", "thread"),
+                )
+    return _executor
+
+
+def predict_fn() -> Callable[[Any], Dict[str, Any]]:
+    return predict_payload if get_executor().kind == "process" else predict_payload_cached
@@ -0,0 +1,222 @@
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .preprocess import FeatureSchema
+
+
+class UnsupportedPipeline(Exception):
+    pass
+
+
+class _NumericBlock:
+    """Imputer/scaler steps folded into per-column fill, offset and scale arrays."""
+
+    def __init__(self, src_idx: np.ndarray, out: slice, steps: Sequence[Any], names: Sequence[str] = ()):
+        self.src_idx = src_idx
+        self.names = list(names)
+        self.out = out
+        self.ops: List[Tuple[str, np.ndarray, Optional[np.ndarray]]] = []
+        for step in steps:
+            kind = type(step).__name__
+            if kind == "SimpleImputer":
+                _check_imputer(step)
+                self.ops.append(("fill", np.asarray(step.statistics_, dtype=np.float64), None))
+            elif kind == "StandardScaler":
+                n = len(src_idx)
+                # mean_ is fitted even when with_mean=False, so go by the flags
+                mean = np.asarray(step.mean_, dtype=np.float64) if step.with_mean else np.zeros(n)
+                scale = np.asarray(step.scale_, dtype=np.float64) if step.with_std else np.ones(n)
+                self.ops.append(("affine", mean, scale))
+            else:
+                raise UnsupportedPipeline(f"Unsupported numeric step: {kind}")
+
+    def apply(self, grid: np.ndarray, out: np.ndarray) -> None:
+        self._apply(np.asarray(grid[:, self.src_idx], dtype=np.float64), out)
+
+    def apply_columns(self, columns: Mapping[str, np.ndarray], out: np.ndarray) -> None:
+        x = np.empty((len(out), len(self.names)), dtype=np.float64)
+        for j, name in enumerate(self.names):
+            x[:, j] = columns[name]
+        self._apply(x, out)
+
+    def _apply(self, x: np.ndarray, out: np.ndarray) -> None:
+        for op, a, b in self.ops:
+            if op == "fill":
+                np.copyto(x, a, where=np.isnan(x))
+            else:
+                x -= a
+                x /= b
+        out[:, self.out] = x
+
+
+class _CategoricalBlock:
+    """One-hot encoding as a category -> output-column lookup table per input column."""
+
+    def __init__(self, src_idx: np.ndarray, out: slice, steps: Sequence[Any], names: Sequence[str] = ()):
+        self.src_idx = [int(i) for i in src_idx]
+        self.names = list(names)
+        self.fill: Optional[List[Any]] = None
+        encoder = None
+        for step in steps:
+            kind = type(step).__name__
+            if kind == "SimpleImputer" and encoder is None:
+                _check_imputer(step)
+                self.fill = list(step.statistics_)
+            elif kind == "OneHotEncoder" and encoder is None:
+                encoder = step
+            else:
+                raise UnsupportedPipeline(f"Unsupported categorical step: {kind}")
+        if encoder is None:
+            raise UnsupportedPipeline("Categorical block has no OneHotEncoder.")
+        if getattr(encoder, "drop_idx_", None) is not None:
+            raise UnsupportedPipeline("OneHotEncoder(drop=...) is not supported.")
+        if getattr(encoder, "infrequent_categories_", None) is not None and any(
+            c is not None for c in encoder.infrequent_categories_
+        ):
+            raise UnsupportedPipeline("OneHotEncoder infrequent categories are not supported.")
+
+        self.strict = encoder.handle_unknown == "error"
+        self.lookup: List[Dict[Any, int]] = []
+        offset = out.start
+        for cats in encoder.categories_:
+            self.lookup.append({_key(c): offset + k for k, c in enumerate(cats)})
+            offset += len(cats)
+        if offset != out.stop:
+            raise UnsupportedPipeline("OneHotEncoder output width does not match the ColumnTransformer slice.")
+        self.out = out
+
+    def apply(self, grid: np.ndarray, out: np.ndarray) -> None:
+        self._apply([grid[:, src] for src in self.src_idx], out)
+
+    def apply_columns(self, columns: Mapping[str, np.ndarray], out: np.ndarray) -> None:
+        self._apply([columns[name] for name in self.names], out)
+
+    def _apply(self, source: List[np.ndarray], out: np.ndarray) -> None:
+        out[:, self.out] = 0.0
+        for j, (column, table) in enumerate(zip(source, self.lookup)):
+            for r in range(len(column)):
+                v = column[r]
+                if _is_missing(v):
+                    if self.fill is None:
+                        raise ValueError("Missing categorical value and no imputer in the pipeline.")
+                    v = self.fill[j]
+                pos = table.get(_key(v))
+                if pos is not None:
+                    out[r, pos] = 1.0
+                elif self.strict:
+                    raise ValueError(f"Unknown category {v!r}.")
+
+
+class CompiledPipeline:
+    """
+    Replays a fitted ColumnTransformer(imputer/scaler, imputer/one-hot) pipeline with
+    NumPy lookup tables and feeds the final estimator a dense float matrix.
+
+    When the fitted transformer produced sparse output, absent entries were "missing"
+    for the estimator (not 0.0), so zeros are written as NaN to keep parity.
+    """
+
+    def __init__(self, schema: FeatureSchema, blocks: List[Any], n_out: int, sparse: bool, estimator: Any):
+        self.schema = schema
+        self.blocks = blocks
+        self.n_out = n_out
+        self.sparse = sparse
+        self.estimator = estimator
+        self.classes_ = getattr(estimator, "classes_", None)
+
+    def with_estimator(self, estimator: Any) -> "CompiledPipeline":
+        """Same preprocessing feeding a different final estimator (e.g. a trees.FlatForest)."""
+        return CompiledPipeline(self.schema, self.blocks, self.n_out, self.sparse, estimator)
+
+    def transform(self, rows: Sequence[Sequence[Any]]) -> np.ndarray:
+        n = len(rows)
+        grid = np.empty((n, len(self.schema)), dtype=object)
+        if n:
+            grid[:] = rows
+        out = np.empty((n, self.n_out), dtype=np.float64)
+        for block in self.blocks:
+            block.apply(grid, out)
+        if self.sparse:
+            out[out == 0.0] = np.nan
+        return out
+
+    def transform_columns(self, columns: Mapping[str, np.ndarray], n: int) -> np.ndarray:
+        """Same output as transform() from one array per column (e.g. decoded Arrow buffers)."""
+        out = np.empty((n, self.n_out), dtype=np.float64)
+        for block in self.blocks:
+            block.apply_columns(columns, out)
+        if self.sparse:
+            out[out == 0.0] = np.nan
+        return out
+
+    def predict_proba(self, rows: Sequence[Sequence[Any]]) -> np.ndarray:
+        return self.estimator.predict_proba(self.transform(rows))
+
+    def predict(self, rows: Sequence[Sequence[Any]]) -> np.ndarray:
+        return self.estimator.predict(self.transform(rows))
+
+
+def compile_pipeline(model: Any, schema: Optional[FeatureSchema]) -> CompiledPipeline:
+    if schema is None:
+        raise UnsupportedPipeline("A typed feature schema is required.")
+    steps = getattr(model, "steps", None)
+    if not steps or len(steps) != 2:
+        raise UnsupportedPipeline("Expected Pipeline([ColumnTransformer, estimator]).")
+    ct, estimator = steps[0][1], steps[1][1]
+    if type(ct).__name__ != "ColumnTransformer":
+        raise UnsupportedPipeline(f"First step must be a ColumnTransformer, got {type(ct).__name__}.")
+    if not hasattr(estimator, "predict_proba"):
+        raise UnsupportedPipeline("Final estimator has no predict_proba.")
+
+    position = {c: i for i, c in enumerate(schema.columns)}
+    slices = ct.output_indices_
+    blocks: List[Any] = []
+    for name, transformer, cols in ct.transformers_:
+        out = slices[name]
+        if out.stop == out.start or transformer == "drop":
+            continue
+        if isinstance(cols, str) or not all(isinstance(c, str) for c in cols):
+            raise UnsupportedPipeline(f"Transformer '{name}' must select columns by name.")
+        missing = [c for c in cols if c not in position]
+        if missing:
+            raise UnsupportedPipeline(f"Transformer '{name}' uses columns outside the schema: {missing}")
+        src = np.array([position[c] for c in cols], dtype=np.intp)
+
+        if transformer == "passthrough":
+            inner: Sequence[Any] = []
+        elif hasattr(transformer, "steps"):
+            inner = [s for _, s in transformer.steps if s != "passthrough"]
+        else:
+            inner = [transformer]
+
+        if any(type(s).__name__ == "OneHotEncoder" for s in inner):
+            blocks.append(_CategoricalBlock(src, out, inner, cols))
+        else:
+            if not all(schema.is_numeric[i] for i in src):
+                raise UnsupportedPipeline(f"Transformer '{name}' has non-numeric columns without an encoder.")
+            blocks.append(_NumericBlock(src, out, inner, cols))
+
+    n_out = max((b.out.stop for b in blocks), default=0)
+    n_expected = getattr(estimator, "n_features_in_", n_out)
+    if n_out != n_expected:
+        raise UnsupportedPipeline(f"Compiled width {n_out} does not match estimator input {n_expected}.")
+    return CompiledPipeline(schema, blocks, n_out, bool(getattr(ct, "sparse_output_", False)), estimator)
+
+
+def _check_imputer(step: Any) -> None:
+    if getattr(step, "add_indicator", False):
+        raise UnsupportedPipeline("SimpleImputer(add_indicator=True) is not supported.")
+    mv = step.missing_values
+    if not (mv is None or (isinstance(mv, float) and math.isnan(mv))):
+        raise UnsupportedPipeline(f"SimpleImputer(missing_values={mv!r}) is not supported.")
+
+
+def _is_missing(v: Any) -> bool:
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def _key(v: Any) -> Any:
+    # numpy scalars hash like their Python equivalents; normalise to be safe
+    return v.item() if isinstance(v, np.generic) else v
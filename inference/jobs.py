@@ -0,0 +1,416 @@
+"""
+Bulk scoring jobs: POST a file to /api/v1/jobs/, poll its progress, download the results.
+
+Everything lives on disk under INFERENCE_JOBS_DIR, one directory per job:
+``input.<fmt>``, ``results.<jsonl|csv>``, ``job.json`` (status and checkpoint) and a
+``cancel`` marker. There is no broker: a dispatcher thread in each server process hands
+queued jobs to scoring processes (spawned, niced, one model thread each by default),
+at most INFERENCE_JOBS_MAX_CONCURRENT at a time across all workers, so bulk scoring
+cannot take the CPUs /predict/ needs.
+
+Slots and job ownership are lock files holding the pid of the scoring process. A lock
+whose process is gone is taken over, so a job left ``running`` by a killed worker is
+picked up again and resumes from its last checkpoint (chunks done and output bytes,
+as in ``manage.py score_file --resume``).
+
+The endpoints are off unless INFERENCE_JOBS_ENABLED=True and have no authentication of
+their own; put them behind a proxy that checks callers. Uploads larger than
+INFERENCE_JOBS_MAX_UPLOAD_MB are refused before anything is written to the jobs directory.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from . import bulk, metrics
+from .audit import _pid_alive
+
+logger = logging.getLogger(__name__)
+
+submitted = metrics.counter("jobs_submitted_total", "Bulk scoring job submissions by outcome (queued, rejected).")
+
+TERMINAL = ("done", "failed", "cancelled")
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+# scoring processes run Django too; none of the per-request machinery belongs in them
+CHILD_ENV = {
+    "INFERENCE_JOBS_ENABLED": "False",
+    "INFERENCE_DRIFT_ENABLED": "False",
+    "INFERENCE_AUDIT_ENABLED": "False",
+    "INFERENCE_PRELOAD": "False",
+    "INFERENCE_CAPTURE_RATE": "0",
+    "INFERENCE_SHADOW_MODELS": "",
+    "INFERENCE_AB_WEIGHTS": "",
+    "INFERENCE_METRICS_DIR": "",
+}
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _holder(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def claim(path: str, pid: Optional[int] = None) -> bool:
+    """Creates the lock file for ``pid``; a lock left by a dead process is taken over."""
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            holder = _holder(path)
+            if holder == 0 or _pid_alive(holder):
+                return False  # 0: being written right now
+            stale = f"{path}.stale-{os.getpid()}-{time.time_ns()}"
+            try:
+                os.rename(path, stale)  # only one process wins the takeover
+            except OSError:
+                return False
+            os.remove(stale)
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(pid or os.getpid()))
+        return True
+    return False
+
+
+def hand_over(path: str, pid: int) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(pid))
+    os.replace(tmp, path)
+
+
+def release(path: str) -> None:
+    if _holder(path) == os.getpid():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def public(job: Dict[str, Any]) -> Dict[str, Any]:
+    total = job.get("total_rows")
+    out = {k: job.get(k) for k in (
+        "id", "status", "filename", "format", "output", "created_at", "started_at", "finished_at",
+        "rows_done", "total_rows", "attempts", "error",
+    )}
+    out["progress"] = round(job["rows_done"] / total, 4) if total else (1.0 if job["status"] == "done" else 0.0)
+    return out
+
+
+class JobQueue:
+
+    def __init__(self, directory: str, max_concurrent: int = 1, max_queued: int = 100, chunk_rows: int = 5000,
+                 threads_per_job: int = 1, nice: int = 10, retention_hours: float = 24.0,
+                 poll_seconds: float = 2.0, max_attempts: int = 3, max_upload_bytes: int = 0):
+        self.directory = str(directory)
+        self.slots_dir = os.path.join(self.directory, ".slots")
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.max_queued = int(max_queued)
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.threads_per_job = max(int(threads_per_job), 1)
+        self.nice = int(nice)
+        self.retention = timedelta(hours=float(retention_hours))
+        self.poll_seconds = float(poll_seconds)
+        self.max_attempts = max(int(max_attempts), 1)
+        self.max_upload_bytes = int(max_upload_bytes)
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    # ---- files ----
+
+    def job_dir(self, job_id: str) -> str:
+        if not JOB_ID.fullmatch(job_id or ""):
+            raise KeyError(job_id)
+        return os.path.join(self.directory, job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return _read(os.path.join(self.job_dir(job_id), "job.json"))
+        except KeyError:
+            return None
+
+    def save(self, job: Dict[str, Any]) -> None:
+        bulk.write_json(os.path.join(self.job_dir(job["id"]), "job.json"), job)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        found = [self.get(n) for n in names if JOB_ID.fullmatch(n)]
+        return sorted((j for j in found if j), key=lambda j: j["created_at"])
+
+    def input_path(self, job: Dict[str, Any]) -> str:
+        return os.path.join(self.job_dir(job["id"]), f"input.{job['format']}")
+
+    def results_path(self, job: Dict[str, Any]) -> str:
+        return os.path.join(self.job_dir(job["id"]), f"results.{job['output']}")
+
+    # ---- API ----
+
+    def submit(self, upload: Any, fmt: str = "", output: str = "jsonl") -> Dict[str, Any]:
+        """
+        Stores an uploaded file as a queued job. ValueError for a bad format (UploadTooLarge
+        past max_upload_bytes), OverflowError when the queue is full.
+        """
+        fmt = bulk.detect_format(getattr(upload, "name", "") or "", fmt)
+        if self.max_upload_bytes > 0 and (getattr(upload, "size", None) or 0) > self.max_upload_bytes:
+            submitted.inc(outcome="rejected")
+            raise UploadTooLarge(f"The file is larger than {self.max_upload_bytes} bytes.")
+        if output not in bulk.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output} ({', '.join(bulk.OUTPUT_FORMATS)}).")
+        if self.max_queued > 0 and sum(j["status"] == "queued" for j in self.jobs()) >= self.max_queued:
+            submitted.inc(outcome="rejected")
+            raise OverflowError(f"{self.max_queued} jobs are already queued.")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id, "status": "queued", "filename": os.path.basename(getattr(upload, "name", "") or ""),
+            "format": fmt, "output": output, "chunk_rows": self.chunk_rows,
+            "created_at": _now(), "started_at": None, "finished_at": None,
+            "rows_done": 0, "chunks_done": 0, "output_bytes": 0, "total_rows": None, "attempts": 0, "error": None,
+        }
+        # written under a hidden name and renamed, so the dispatcher never sees half an upload
+        incoming = os.path.join(self.directory, f".incoming-{job_id}")
+        os.makedirs(incoming)
+        try:
+            with open(os.path.join(incoming, f"input.{fmt}"), "wb") as f:
+                written = 0
+                for part in upload.chunks():
+                    written += len(part)
+                    if self.max_upload_bytes > 0 and written > self.max_upload_bytes:
+                        # size was missing or wrong; stop copying instead of trusting it
+                        raise UploadTooLarge(f"The file is larger than {self.max_upload_bytes} bytes.")
+                    f.write(part)
+            bulk.write_json(os.path.join(incoming, "job.json"), job)
+            os.rename(incoming, os.path.join(self.directory, job_id))
+        except BaseException as e:
+            shutil.rmtree(incoming, ignore_errors=True)
+            if isinstance(e, UploadTooLarge):
+                submitted.inc(outcome="rejected")
+            raise
+        submitted.inc(outcome="queued")
+        self.start()
+        self._wake.set()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Stops a queued or running job (between chunks); deletes a finished one."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        jdir = self.job_dir(job_id)
+        if job["status"] in TERMINAL:
+            shutil.rmtree(jdir, ignore_errors=True)
+            job["deleted"] = True
+            return job
+        open(os.path.join(jdir, "cancel"), "w").close()
+        if job["status"] == "queued" and claim(os.path.join(jdir, "owner")):
+            try:
+                job = self.get(job_id) or job
+                if job["status"] == "queued":
+                    job.update(status="cancelled", finished_at=_now())
+                    self.save(job)
+            finally:
+                release(os.path.join(jdir, "owner"))
+        return job
+
+    # ---- dispatcher ----
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                os.makedirs(self.slots_dir, exist_ok=True)
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="jobs-dispatcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                multiprocessing.active_children()  # reaps finished children so their pids read as dead
+                while self.dispatch():
+                    pass
+                if time.monotonic() - self._last_cleanup > 60:
+                    self._last_cleanup = time.monotonic()
+                    self.cleanup()
+            except Exception:
+                logger.exception("Job dispatcher failed")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def dispatch(self) -> bool:
+        """Starts one job if a slot is free and a job is waiting (queued, or orphaned by a dead process)."""
+        slot = next((p for p in (os.path.join(self.slots_dir, f"slot-{i}") for i in range(self.max_concurrent)) if claim(p)), None)
+        if slot is None:
+            return False
+        for job in self.jobs():
+            if job["status"] not in ("queued", "running"):
+                continue
+            owner = os.path.join(self.job_dir(job["id"]), "owner")
+            if not claim(owner):
+                continue
+            proc = multiprocessing.get_context("spawn").Process(
+                target=work, name=f"job-{job['id'][:8]}", daemon=True,
+                args=(self.directory, job["id"], slot, owner, self.threads_per_job, self.nice, self.max_attempts),
+            )
+            try:
+                proc.start()
+            except Exception:
+                release(owner)
+                release(slot)
+                raise
+            hand_over(owner, proc.pid)
+            hand_over(slot, proc.pid)
+            return True
+        release(slot)
+        return False
+
+    def cleanup(self) -> None:
+        """Deletes finished jobs older than INFERENCE_JOBS_RETENTION_HOURS."""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        for job in self.jobs():
+            if job["status"] in TERMINAL and job.get("finished_at") and datetime.fromisoformat(job["finished_at"]) < cutoff:
+                shutil.rmtree(self.job_dir(job["id"]), ignore_errors=True)
+
+    # ---- scoring (runs in the job process) ----
+
+    def execute(self, job_id: str) -> Dict[str, Any]:
+        jdir = self.job_dir(job_id)
+        job = self.get(job_id)
+        if job is None or job["status"] in TERMINAL:
+            return job or {}
+        job["attempts"] += 1
+        try:
+            if os.path.exists(os.path.join(jdir, "cancel")):
+                job["status"] = "cancelled"
+            elif job["attempts"] > self.max_attempts:
+                job.update(status="failed", error=f"Gave up after {self.max_attempts} attempts.")
+            else:
+                self._score(job)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            job.update(status="failed", error=str(e))
+        job["finished_at"] = _now()
+        self.save(job)
+        return job
+
+    def _score(self, job: Dict[str, Any]) -> None:
+        src, cancel = self.input_path(job), os.path.join(self.job_dir(job["id"]), "cancel")
+        job.update(status="running", started_at=job["started_at"] or _now(), pid=os.getpid())
+        if job["total_rows"] is None:
+            job["total_rows"] = bulk.count_rows(src, job["format"])
+        self.save(job)
+
+        writer = bulk.ResultWriter(self.results_path(job), job["output"], job["output_bytes"])
+        try:
+            chunks = bulk.read_chunks(src, job["format"], job["chunk_rows"])
+            for _ in range(job["chunks_done"]):
+                next(chunks, None)
+            for rows in chunks:
+                if os.path.exists(cancel):
+                    job["status"] = "cancelled"
+                    return
+                writer.write(job["rows_done"], bulk.score_chunk(rows))
+                job["output_bytes"] = writer.commit()
+                job["chunks_done"] += 1
+                job["rows_done"] += len(rows)
+                self.save(job)
+        finally:
+            writer.close()
+        job["status"] = "done"
+
+
+def work(directory: str, job_id: str, slot: str, owner: str, threads_per_job: int, nice: int, max_attempts: int) -> None:
+    """Entry point of a spawned job process."""
+    for path in (owner, slot):
+        hand_over(path, os.getpid())  # the dispatcher does the same; whichever runs last, the locks name this process
+    os.environ.update(CHILD_ENV)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mlapi.settings")
+    import django
+
+    django.setup()
+    try:
+        if nice:
+            os.nice(nice)
+        from . import threads
+
+        bulk.init_worker(max(threads.detect_cpus()[0] // threads_per_job, 1))
+        JobQueue(directory, max_attempts=max_attempts).execute(job_id)
+    finally:
+        release(owner)
+        release(slot)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "INFERENCE_JOBS_ENABLED", False))
+
+
+def max_upload_bytes() -> int:
+    return int(float(getattr(settings, "INFERENCE_JOBS_MAX_UPLOAD_MB", 256)) * 1024 * 1024)
+
+
+def pending(directory: str) -> bool:
+    """True when a queued or running job is on disk (a restarted server has work to resume)."""
+    return any(j["status"] not in TERMINAL for j in JobQueue(directory).jobs())
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(
+                    str(getattr(settings, "INFERENCE_JOBS_DIR", "jobs")),
+                    max_concurrent=getattr(settings, "INFERENCE_JOBS_MAX_CONCURRENT", 1),
+                    max_queued=getattr(settings, "INFERENCE_JOBS_MAX_QUEUED", 100),
+                    chunk_rows=getattr(settings, "INFERENCE_JOBS_CHUNK_ROWS", 5000),
+                    threads_per_job=getattr(settings, "INFERENCE_JOBS_THREADS", 1),
+                    nice=getattr(settings, "INFERENCE_JOBS_NICE", 10),
+                    retention_hours=getattr(settings, "INFERENCE_JOBS_RETENTION_HOURS", 24.0),
+                    poll_seconds=getattr(settings, "INFERENCE_JOBS_POLL_SECONDS", 2.0),
+                    max_attempts=getattr(settings, "INFERENCE_JOBS_MAX_ATTEMPTS", 3),
+                    max_upload_bytes=max_upload_bytes(),
+                )
+    return _queue
@@ -0,0 +1,190 @@
+"""
+Lean WSGI mount for the hot inference routes.
+
+POST /api/v1/predict/ and /api/v1/predict/batch/ are served by plain Django views
+behind a short middleware list (INFERENCE_LEAN_MIDDLEWARE) with no URL resolver,
+DRF parsing/rendering or content negotiation. Every other path falls through to the
+regular Django application. Responses match the DRF views in views.py, which stay
+mounted (and documented by drf-spectacular) at the same URLs; both share
+views.predict_row / score_rows / score_columnar.
+
+Opt-in (INFERENCE_LEAN_MOUNT=True). Only INFERENCE_LEAN_MIDDLEWARE runs on these
+routes: by default SecurityMiddleware and CORS, but not CommonMiddleware, sessions,
+CSRF, authentication, messages or X-Frame-Options. The ALLOWED_HOSTS check that
+CommonMiddleware would trigger is done here (request.get_host()).
+"""
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from . import audit, columnar, metrics, services
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+DEFAULT_MIDDLEWARE = (
+    "inference.profiling.ProfilingMiddleware",
+    "inference.capture.CaptureMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+)
+
+# same series as the DRF views, so dashboards do not depend on which mount served a request
+request_stage_hist = metrics.histogram(
+    "request_stage_ms", "Time per request stage (parse, validate, predict, postprocess, total) in ms."
+)
+requests_total = metrics.counter("requests_total", "Requests by endpoint and outcome (ok or the HTTP status returned).")
+request_errors = metrics.counter("request_errors_total", "Failed requests by endpoint, error code and exception class.")
+
+
+if orjson is not None:
+    def loads(body: bytes) -> Any:
+        return orjson.loads(body)
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+else:
+    def loads(body: bytes) -> Any:
+        return json.loads(body)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def json_response(data: Any, status: int = 200) -> HttpResponse:
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def _parse(request) -> Any:
+    if not request.body:
+        return {}
+    return loads(request.body)
+
+
+def _field(data: Any, name: str) -> Any:
+    if not isinstance(data, dict):
+        raise _Invalid({"non_field_errors": [f"Invalid data. Expected a dictionary, but got {type(data).__name__}."]})
+    if name not in data:
+        raise _Invalid({name: ["This field is required."]})
+    return data[name]
+
+
+class _Invalid(Exception):
+
+    def __init__(self, errors: Any):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def predict(request) -> HttpResponse:
+    started = time.perf_counter()
+    response = _predict(request)
+    request_stage_hist.observe((time.perf_counter() - started) * 1000.0, endpoint="predict", stage="total")
+    requests_total.inc(endpoint="predict", outcome="ok" if response.status_code < 400 else str(response.status_code))
+    return response
+
+
+def _predict(request) -> HttpResponse:
+    from .views import predict_row
+
+    started = time.perf_counter()
+    with request_stage_hist.time(endpoint="predict", stage="parse"):
+        try:
+            data = _parse(request)
+        except ValueError as e:
+            request_errors.inc(endpoint="predict", error="parse_error", exception=type(e).__name__)
+            return json_response({"detail": f"JSON parse error - {e}"}, 400)
+    return predict_row(data, audit.request_id(request), json_response, started)
+
+
+def predict_batch(request) -> HttpResponse:
+    from .views import score_columnar, score_rows
+
+    try:
+        handle = services.default_model()
+    except FileNotFoundError as e:
+        return json_response({"error": "model_not_found", "detail": str(e)}, 500)
+    except Exception as e:
+        return json_response({"error": "model_introspection_failed", "detail": str(e)}, 500)
+
+    rid = audit.request_id(request)
+    if columnar.media_type(request.content_type) is not None:
+        return score_columnar(handle, request.content_type, request.body, json_response, rid)
+
+    try:
+        data = _parse(request)
+    except ValueError as e:
+        return json_response({"detail": f"JSON parse error - {e}"}, 400)
+
+    try:
+        rows = _field(data, "rows")
+        if not isinstance(rows, list):
+            raise _Invalid({"rows": [f'Expected a list of items but got type "{type(rows).__name__}".']})
+        if not rows:
+            raise _Invalid({"rows": ["This list may not be empty."]})
+        max_rows = getattr(settings, "INFERENCE_MAX_BATCH_ROWS", None)
+        if max_rows is not None and len(rows) > max_rows:
+            raise _Invalid({"rows": [f"Batch too large: {len(rows)} rows, limit is {max_rows}."]})
+    except _Invalid as e:
+        return json_response({"error": e.errors}, 400)
+
+    try:
+        results = score_rows(handle, rows, rid)
+    except FileNotFoundError as e:
+        return json_response({"error": "model_not_found", "detail": str(e)}, 500)
+    except Exception as e:
+        return json_response({"error": "inference_failed", "detail": str(e)}, 500)
+    return json_response({"results": results})
+
+
+ROUTES: Dict[str, Callable] = {
+    "/api/v1/predict/": predict,
+    "/api/v1/predict/batch/": predict_batch,
+}
+
+
+class LeanHandler(WSGIHandler):
+    """
+    WSGIHandler for ROUTES only: its own middleware chain, a dict lookup instead of
+    the URL resolver, and ``fallback`` (the full Django application) for every other path.
+    """
+
+    def __init__(self, fallback: Callable, routes: Optional[Dict[str, Callable]] = None,
+                 middleware: Optional[List[str]] = None):
+        self.fallback = fallback
+        self.routes = dict(ROUTES if routes is None else routes)
+        self.middleware = list(
+            middleware if middleware is not None else getattr(settings, "INFERENCE_LEAN_MIDDLEWARE", DEFAULT_MIDDLEWARE)
+        )
+        super().__init__()
+
+    def load_middleware(self, is_async: bool = False) -> None:
+        handler = convert_exception_to_response(self._dispatch)
+        for path in reversed(self.middleware):
+            try:
+                mw = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            handler = convert_exception_to_response(mw)
+        self._middleware_chain = handler
+
+    def _dispatch(self, request) -> HttpResponse:
+        request.get_host()  # DisallowedHost -> 400, as on the full stack
+        view = self.routes[request.path_info]
+        if request.method != "POST":
+            return json_response({"detail": f'Method "{request.method}" not allowed.'}, 405)
+        return view(request)
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") not in self.routes:
+            return self.fallback(environ, start_response)
+        return super().__call__(environ, start_response)
@@ -0,0 +1,57 @@
+import json
+import os
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inference import drift, services
+from inference.bulk import FORMATS, detect_format, read_chunks
+
+
+class Command(BaseCommand):
+    help = "Build the binned drift reference (quantile bins, category frequencies) of a model from its training data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Training data (.csv, .jsonl/.ndjson or .parquet) with the model's feature columns.")
+        parser.add_argument("--model", default="", help="Model artifact (default: MODEL_PATH).")
+        parser.add_argument("--out", default="", help="Output JSON (default: the sidecar next to the model).")
+        parser.add_argument("--format", default="", choices=("",) + FORMATS, help="Input format (default: from extension).")
+        parser.add_argument("--bins", type=int, default=10, help="Quantile bins per numeric column (default: 10).")
+
+    def handle(self, *args, **options):
+        src = options["input"]
+        if not os.path.exists(src):
+            raise CommandError(f"Input not found: {src}")
+        model_path = options["model"] or services.MODEL_PATH
+        schema = services.LoadedModel(model_path).schema
+        if schema is None:
+            raise CommandError("The model bundle has no feature_columns/num_cols/cat_cols to profile.")
+
+        columns: Dict[str, List[Any]] = {c: [] for c in schema.columns}
+        skipped = 0
+        try:
+            fmt = detect_format(src, options["format"])
+        except ValueError as e:
+            raise CommandError(str(e)) from None
+        for rows in read_chunks(src, fmt, 10000):
+            for r in rows:
+                try:
+                    typed = schema.row(r)
+                except (ValueError, TypeError, AttributeError):
+                    skipped += 1
+                    continue
+                for c, v in zip(schema.columns, typed):
+                    columns[c].append(v)
+
+        n = len(columns[schema.columns[0]]) if schema.columns else 0
+        if not n:
+            raise CommandError("No usable rows in the input.")
+        reference = drift.profile(columns, schema, bins=max(options["bins"], 2))
+        reference["rows"] = n
+
+        out = options["out"] or drift.reference_path(model_path)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(reference, f, indent=1)
+        if skipped:
+            self.stderr.write(f"Skipped {skipped} rows that did not match the schema.")
+        self.stdout.write(self.style.SUCCESS(f"Wrote the drift reference of {n} rows to {out}"))
@@ -0,0 +1,27 @@
+import json
+
+import joblib
+from django.core.management.base import BaseCommand, CommandError
+
+from inference import artifacts, services
+
+
+class Command(BaseCommand):
+    help = "Convert a joblib model bundle into the mmap-friendly directory layout (set MODEL_PATH to the directory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("out_dir", help="Directory to write the layout to.")
+        parser.add_argument("--source", default=services.MODEL_PATH, help="joblib bundle to convert (default: MODEL_PATH).")
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        if artifacts.is_mmap_layout(source):
+            raise CommandError(f"{source} is already an mmap layout.")
+        try:
+            raw = joblib.load(source)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        manifest = artifacts.export_mmap(raw, options["out_dir"])
+        self.stdout.write(json.dumps(manifest, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['out_dir']}"))
@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import pstats
+from collections import Counter
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def load_profiles(directory: str, reason: str = "", path: str = "") -> List[Dict[str, Any]]:
+    out = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if not entry.name.endswith(".json"):
+            continue
+        with open(entry.path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if reason and meta.get("reason") != reason:
+            continue
+        if path and not meta.get("path", "").startswith(path):
+            continue
+        ext = ".prof" if meta.get("kind") == "cprofile" else ".stacks"
+        meta["file"] = entry.path[: -len(".json")] + ext
+        if os.path.exists(meta["file"]):
+            out.append(meta)
+    return out
+
+
+def stack_report(files: List[str], limit: int) -> List[Dict[str, Any]]:
+    """Self and inclusive sample counts per function from collapsed-stack files."""
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    total = 0
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, _, n = line.rstrip("\n").rpartition(" ")
+                if not stack:
+                    continue
+                n = int(n)
+                frames = stack.split(";")
+                total += n
+                own[frames[-1]] += n
+                for fn in set(frames):
+                    inclusive[fn] += n
+    return [
+        {"function": fn, "self_pct": round(100.0 * n / total, 2), "inclusive_pct": round(100.0 * inclusive[fn] / total, 2)}
+        for fn, n in own.most_common(limit)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Aggregate request profiles written by ProfilingMiddleware into hot-function reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=getattr(settings, "INFERENCE_PROFILE_DIR", "profiles"), help="Profile directory.")
+        parser.add_argument("--reason", default="", choices=("", "sampled", "header", "slow"), help="Only profiles with this trigger.")
+        parser.add_argument("--path", default="", help="Only requests whose path starts with this.")
+        parser.add_argument("--sort", default="cumulative", choices=("cumulative", "tottime", "ncalls"), help="cProfile sort key.")
+        parser.add_argument("--limit", type=int, default=25, help="Functions per report (default: 25).")
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        if not os.path.isdir(directory):
+            raise CommandError(f"Profile directory not found: {directory}")
+        profiles = load_profiles(directory, options["reason"], options["path"])
+        if not profiles:
+            raise CommandError("No matching profiles.")
+
+        durations = sorted(p["duration_ms"] for p in profiles)
+        self.stdout.write(f"{len(profiles)} profiles, duration p50 {durations[len(durations) // 2]:.1f} ms, max {durations[-1]:.1f} ms")
+
+        stages: Dict[str, List[float]] = {}
+        for p in profiles:
+            for k, v in p.get("stages_ms", {}).items():
+                stages.setdefault(k, []).append(v)
+        if stages:
+            self.stdout.write("\nMean stage time (ms):")
+            for k, vals in sorted(stages.items(), key=lambda kv: -sum(kv[1]) / len(kv[1])):
+                self.stdout.write(f"  {k:<40} {sum(vals) / len(vals):>10.3f}  (n={len(vals)})")
+
+        prof_files = [p["file"] for p in profiles if p["kind"] == "cprofile"]
+        if prof_files:
+            buf = io.StringIO()
+            stats = pstats.Stats(*prof_files, stream=buf)
+            stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
+            self.stdout.write(f"\ncProfile, {len(prof_files)} requests, by {options['sort']}:")
+            self.stdout.write(buf.getvalue())
+
+        stack_files = [p["file"] for p in profiles if p["kind"] == "stacks"]
+        if stack_files:
+            self.stdout.write(f"\nStack samples, {len(stack_files)} requests (self / inclusive % of samples):")
+            for row in stack_report(stack_files, options["limit"]):
+                self.stdout.write(f"  {row['self_pct']:>6.2f}%  {row['inclusive_pct']:>6.2f}%  {row['function']}")
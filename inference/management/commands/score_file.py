@@ -0,0 +1,91 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inference import threads
+from inference.bulk import FORMATS, ResultWriter, detect_format, init_worker, read_chunks, score_chunk, write_json
+
+
+class Command(BaseCommand):
+    help = "Score a CSV/JSONL/Parquet file offline with the loaded model, in chunks, across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Input file (.csv, .jsonl/.ndjson or .parquet).")
+        parser.add_argument("output", help="Output file (.csv or .jsonl), written in input order.")
+        parser.add_argument("--format", default="", choices=("",) + FORMATS, help="Input format (default: from extension).")
+        parser.add_argument("--workers", type=int, default=0, help="Scoring processes (default: available CPUs).")
+        parser.add_argument("--chunk-rows", type=int, default=5000, help="Rows per chunk (default: 5000).")
+        parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint of this output.")
+
+    def handle(self, *args, **options):
+        src, dst = options["input"], options["output"]
+        try:
+            fmt = detect_format(src, options["format"])
+        except ValueError as e:
+            raise CommandError(str(e)) from None
+        out_fmt = "csv" if dst.lower().endswith(".csv") else "jsonl"
+        chunk_rows = max(options["chunk_rows"], 1)
+        workers = max(options["workers"] or threads.detect_cpus()[0], 1)
+        ckpt_path = dst + ".checkpoint.json"
+
+        if not os.path.exists(src):
+            raise CommandError(f"Input not found: {src}")
+
+        ckpt = {"input": os.path.abspath(src), "chunk_rows": chunk_rows, "chunks_done": 0, "rows_done": 0, "output_bytes": 0}
+        if options["resume"] and os.path.exists(ckpt_path):
+            with open(ckpt_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("input") != ckpt["input"] or saved.get("chunk_rows") != chunk_rows:
+                raise CommandError("Checkpoint was written for a different input or --chunk-rows.")
+            ckpt = saved
+            self.stderr.write(f"Resuming after {ckpt['rows_done']} rows ({ckpt['chunks_done']} chunks).")
+
+        writer = ResultWriter(dst, out_fmt, ckpt["output_bytes"])
+        chunks = read_chunks(src, fmt, chunk_rows)
+        for _ in range(ckpt["chunks_done"]):
+            next(chunks, None)
+
+        started = time.perf_counter()
+        scored_rows = 0
+        try:
+            for rows, results in self._score(chunks, workers):
+                writer.write(ckpt["rows_done"], results)
+                ckpt["output_bytes"] = writer.commit()
+                ckpt["chunks_done"] += 1
+                ckpt["rows_done"] += len(rows)
+                scored_rows += len(rows)
+                write_json(ckpt_path, ckpt)
+                rate = scored_rows / max(time.perf_counter() - started, 1e-9)
+                self.stderr.write(f"\r{ckpt['rows_done']} rows scored ({rate:,.0f} rows/s)", ending="")
+                self.stderr.flush()
+        finally:
+            writer.close()
+
+        self.stderr.write("")
+        os.remove(ckpt_path)
+        self.stdout.write(self.style.SUCCESS(f"Scored {ckpt['rows_done']} rows into {dst}"))
+
+    def _score(self, chunks: Iterator[List[Any]], workers: int) -> Iterator[Tuple[List[Any], List[Dict[str, Any]]]]:
+        if workers == 1:
+            init_worker()
+            for rows in chunks:
+                yield rows, score_chunk(rows)
+            return
+
+        # keep a bounded window of chunks in flight and yield them back in input order
+        window: deque = deque()
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(workers,)) as pool:
+            for rows in chunks:
+                window.append((rows, pool.submit(score_chunk, rows)))
+                if len(window) >= workers * 2:
+                    rows_done, fut = window.popleft()
+                    yield rows_done, fut.result()
+            while window:
+                rows_done, fut = window.popleft()
+                yield rows_done, fut.result()
+
@@ -0,0 +1,285 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+# when set (by the profiling middleware), Timer also adds its ms here under "<histogram>.<stage>"
+stage_log: "contextvars.ContextVar[Optional[Dict[str, float]]]" = contextvars.ContextVar("stage_log", default=None)
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            values = dict(self._values)
+        return {
+            "type": "counter",
+            "help": self.help,
+            "values": [{"labels": dict(k), "value": v} for k, v in values.items()],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        # one slot per bucket + overflow, then sum and count
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels: str) -> "Timer":
+        return Timer(self, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        out = []
+        for key, s in series.items():
+            count = s[-1]
+            out.append({
+                "labels": dict(key),
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], s[:-2])),
+                "sum": s[-2],
+                "count": count,
+                "mean": (s[-2] / count) if count else None,
+            })
+        return {"type": "histogram", "help": self.help, "values": out}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Timer:
+    """``with hist.time(stage="x"):`` observes the block's wall time in ms, also when it raises."""
+
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, labels: Dict[str, str]):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        self.hist.observe(ms, **self.labels)
+        log = stage_log.get()
+        if log is not None:
+            key = f"{self.hist.name}.{self.labels.get('stage', '')}"
+            log[key] = log.get(key, 0.0) + ms
+
+
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help: str = "") -> Counter:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = Counter(name, help)
+        return metric
+
+
+def histogram(name: str, help: str = "", buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = Histogram(name, help, buckets or DEFAULT_BUCKETS)
+        return metric
+
+
+def snapshot() -> Dict[str, Any]:
+    with _registry_lock:
+        metrics = dict(_registry)
+    return {name: m.snapshot() for name, m in sorted(metrics.items())}
+
+
+# ---- multi-process aggregation ----
+# Each worker process writes its own snapshot to <dir>/metrics-<pid>.json; a scrape
+# served by any worker merges all files. Files of exited workers are kept so counters
+# stay monotonic across worker restarts.
+
+_flusher: Optional[threading.Thread] = None
+_flusher_pid: Optional[int] = None
+_flusher_args: Optional[Tuple[str, float]] = None
+
+
+def write_snapshot(directory: str) -> str:
+    path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snap in snapshots:
+        for name, metric in snap.items():
+            target = merged.setdefault(name, {"type": metric["type"], "help": metric.get("help", ""), "series": {}})
+            for v in metric["values"]:
+                key = tuple(sorted(v["labels"].items()))
+                cur = target["series"].get(key)
+                if metric["type"] == "counter":
+                    target["series"][key] = (cur or 0) + v["value"]
+                elif cur is None:
+                    target["series"][key] = {"buckets": dict(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                else:
+                    for b, n in v["buckets"].items():
+                        cur["buckets"][b] = cur["buckets"].get(b, 0) + n
+                    cur["sum"] += v["sum"]
+                    cur["count"] += v["count"]
+
+    out: Dict[str, Any] = {}
+    for name in sorted(merged):
+        m = merged[name]
+        values = []
+        for key, v in m["series"].items():
+            if m["type"] == "counter":
+                values.append({"labels": dict(key), "value": v})
+            else:
+                values.append({**v, "labels": dict(key), "mean": (v["sum"] / v["count"]) if v["count"] else None})
+        out[name] = {"type": m["type"], "help": m["help"], "values": values}
+    return out
+
+
+def collect(directory: str = "") -> Dict[str, Any]:
+    """This process's metrics, or every worker's merged together when ``directory`` is set."""
+    if not directory:
+        return snapshot()
+    write_snapshot(directory)
+    snapshots = []
+    for entry in os.scandir(directory):
+        if not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+            continue
+        try:
+            with open(entry.path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # a worker may be mid-replace; its next flush will be picked up
+            continue
+    return merge(snapshots)
+
+
+def start_flusher(directory: str, interval: float = 5.0) -> None:
+    """Periodically writes this process's snapshot; restarted in forked children."""
+    global _flusher, _flusher_pid, _flusher_args
+    if not directory or interval <= 0:
+        return
+    pid = os.getpid()
+    with _registry_lock:
+        if _flusher is not None and _flusher_pid == pid:
+            return
+        _flusher_args = (directory, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_snapshot(directory)
+                except OSError:
+                    pass
+
+        _flusher = threading.Thread(target=loop, name="metrics-flusher", daemon=True)
+        _flusher_pid = pid
+    _flusher.start()
+
+
+def _reset_after_fork() -> None:
+    # a forked worker starts from zero (the parent's counts are already in the parent's
+    # file) with fresh locks, since another thread may have held one at fork time
+    global _registry_lock, _flusher, _flusher_pid
+    _registry_lock = threading.Lock()
+    for m in _registry.values():
+        m._lock = threading.Lock()
+        m.reset()
+    _flusher = _flusher_pid = None
+    if _flusher_args is not None:
+        start_flusher(*_flusher_args)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ---- Prometheus text exposition (format 0.0.4) ----
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = sorted(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not float(v).is_integer() else str(int(v))
+
+
+def render_prometheus(snap: Dict[str, Any], prefix: str = "mlapi_") -> str:
+    lines: List[str] = []
+    for name, metric in sorted(snap.items()):
+        full = prefix + name
+        if metric.get("help"):
+            lines.append(f"# HELP {full} {_escape(metric['help'])}")
+        lines.append(f"# TYPE {full} {metric['type']}")
+        for v in metric["values"]:
+            if metric["type"] == "counter":
+                lines.append(f"{full}{_labels(v['labels'])} {_num(v['value'])}")
+                continue
+            # stored per bucket; Prometheus buckets are cumulative
+            running = 0.0
+            for le, n in v["buckets"].items():
+                running += n
+                lines.append(f"{full}_bucket{_labels(v['labels'], ('le', le))} {_num(running)}")
+            lines.append(f"{full}_sum{_labels(v['labels'])} {_num(v['sum'])}")
+            lines.append(f"{full}_count{_labels(v['labels'])} {_num(v['count'])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('request_id', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('endpoint', models.CharField(max_length=32)),
+                ('row_index', models.IntegerField(blank=True, null=True)),
+                ('model_name', models.CharField(max_length=100)),
+                ('model_version', models.CharField(max_length=100)),
+                ('features', models.JSONField(blank=True, null=True)),
+                ('label', models.CharField(blank=True, max_length=100, null=True)),
+                ('confidence', models.FloatField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=64)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,3 +1,27 @@
 from django.db import models
+from django.utils import timezone
 
 
+class PredictionLog(models.Model):
+    """
+    One scored row. Written behind the request by inference.audit in bulk, so
+    created_at is the time the prediction was made, not the insert time.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    request_id = models.CharField(max_length=64, blank=True, db_index=True)
+    endpoint = models.CharField(max_length=32)
+    row_index = models.IntegerField(null=True, blank=True)
+    model_name = models.CharField(max_length=100)
+    model_version = models.CharField(max_length=100)
+    features = models.JSONField(null=True, blank=True)
+    label = models.CharField(max_length=100, null=True, blank=True)
+    confidence = models.FloatField(null=True, blank=True)
+    error = models.CharField(max_length=64, blank=True)
+    latency_ms = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.request_id}#{self.row_index} -> {self.error or self.label}"
@@ -0,0 +1,38 @@
+from rest_framework.parsers import BaseParser
+
+from . import columnar
+
+
+class ColumnarParser(BaseParser):
+    """Hands the raw body to the view; decoding happens in columnar.score once the model is known."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return columnar.Payload(media_type or self.media_type, stream.read() if stream is not None else b"")
+
+
+class ArrowStreamParser(ColumnarParser):
+    media_type = columnar.ARROW
+
+
+class NpyParser(ColumnarParser):
+    media_type = columnar.NPY
+
+
+class MsgpackParser(ColumnarParser):
+    media_type = columnar.MSGPACK
+
+
+# DRF picks a parser by exact media type: one class per alias in columnar.CONTENT_TYPES
+class ArrowFileParser(ColumnarParser):
+    media_type = "application/vnd.apache.arrow.file"
+
+
+class NumpyParser(ColumnarParser):
+    media_type = "application/x-numpy"
+
+
+class XMsgpackParser(ColumnarParser):
+    media_type = "application/x-msgpack"
+
+
+COLUMNAR_PARSERS = [ArrowStreamParser, NpyParser, MsgpackParser, ArrowFileParser, NumpyParser, XMsgpackParser]
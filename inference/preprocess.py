@@ -1,6 +1,105 @@
-﻿from typing import List, Dict, Any
+﻿import math
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+
+class FeatureSchema:
+    """
+    Typed, column-ordered converter compiled once per loaded model from the
+    bundle's feature_columns / num_cols / cat_cols.
+
+    Numeric columns are coerced to float (missing -> NaN, left to the pipeline's
+    imputer); categorical columns keep their raw value so the OneHotEncoder sees
+    the real category instead of 0.0.
+    """
+
+    def __init__(self, columns: Sequence[str], num_cols: Sequence[str], cat_cols: Sequence[str]):
+        self.columns: List[str] = [str(c) for c in columns]
+        num = set(map(str, num_cols))
+        cat = set(map(str, cat_cols))
+        unknown = [c for c in self.columns if c not in num and c not in cat]
+        if unknown:
+            raise ValueError(f"Columns missing from both num_cols and cat_cols: {unknown}")
+
+        self.is_numeric: List[bool] = [c in num for c in self.columns]
+        self.num_idx = np.array([i for i, n in enumerate(self.is_numeric) if n], dtype=np.intp)
+        self.cat_idx = np.array([i for i, n in enumerate(self.is_numeric) if not n], dtype=np.intp)
+        self.num_names: List[str] = [self.columns[i] for i in self.num_idx]
+        self.cat_names: List[str] = [self.columns[i] for i in self.cat_idx]
+        self._kinds = list(zip(self.columns, self.is_numeric))
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def row(self, x: list | Dict[str, Any]) -> List[Any]:
+        if isinstance(x, dict):
+            values = [x.get(c) for c in self.columns]
+        else:
+            values = list(x)
+            if len(values) != len(self.columns):
+                raise ValueError(f"Feature length mismatch. Expected {len(self.columns)}, got {len(values)}.")
+
+        out: List[Any] = []
+        for (name, numeric), v in zip(self._kinds, values):
+            out.append(_to_float(name, v) if numeric else _to_category(v))
+        return out
+
+    def rows(self, xs: Sequence[list | Dict[str, Any]]) -> List[List[Any]]:
+        return [self.row(x) for x in xs]
+
+    def frame(self, rows: Sequence[Sequence[Any]]):
+        """Builds the model input for already-converted rows: one float64 block for numerics, raw objects for categoricals."""
+        import pandas as pd
+
+        n = len(rows)
+        grid = np.empty((n, len(self.columns)), dtype=object)
+        if n:
+            grid[:] = rows
+        numeric = np.ascontiguousarray(grid[:, self.num_idx], dtype=np.float64)
+        data: Dict[str, Any] = {}
+        for j, name in enumerate(self.num_names):
+            data[name] = numeric[:, j]
+        for j, name in zip(self.cat_idx, self.cat_names):
+            data[name] = grid[:, j]
+        return pd.DataFrame(data, columns=self.columns, copy=False)
+
+    def transform(self, xs: Sequence[list | Dict[str, Any]]):
+        return self.frame(self.rows(xs))
+
+
+def _to_float(name: str, v: Any) -> float:
+    if v is None or v == "":
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"Column '{name}' expects a number, got {v!r}.") from None
+
+
+def _to_category(v: Any) -> Any:
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return math.nan
+    # the encoder was fitted on string categories
+    return v if isinstance(v, str) else str(v)
+
+
+def compile_schema(raw: Any) -> Optional[FeatureSchema]:
+    """Compiles a FeatureSchema from a joblib bundle, or returns None if it carries no column typing."""
+    if not isinstance(raw, dict):
+        return None
+    columns = raw.get("feature_columns")
+    num_cols = raw.get("num_cols")
+    cat_cols = raw.get("cat_cols")
+    if not isinstance(columns, (list, tuple)) or num_cols is None or cat_cols is None:
+        return None
+    return FeatureSchema(columns, num_cols, cat_cols)
+
+
+def run(x: list | Dict[str, Any], expected_columns=None, schema: Optional[FeatureSchema] = None, **kwargs) -> List[Any]:
+    if schema is not None:
+        return schema.row(x)
 
-def run(x: list | Dict[str, Any], expected_columns=None, **kwargs) -> List[float]:
     if isinstance(x, dict):
         cols = expected_columns or list(x.keys())
         values = [x.get(c) for c in cols]
@@ -0,0 +1,204 @@
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as Tally
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_INFERENCE_PROFILE"
+
+profiles_written = metrics.counter("profiles_written_total", "Request profiles written to disk by trigger (sampled, header, slow).")
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Background thread that samples the Python stacks of threads currently serving a
+    profiled request every ``interval_ms``. Cheap enough to leave on for every request,
+    so a request can be kept once it turns out to be slow.
+    """
+
+    def __init__(self, interval_ms: float = 5.0, max_depth: int = 64):
+        self.interval = max(float(interval_ms), 0.5) / 1000.0
+        self.max_depth = max_depth
+        self._active: Dict[int, Tally] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        self._ensure_started()
+        self._active[threading.get_ident()] = Tally()
+
+    def end(self) -> Tally:
+        return self._active.pop(threading.get_ident(), Tally())
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for tid, tally in list(self._active.items()):
+                frame = frames.get(tid)
+                if frame is not None:
+                    tally[self._collapse(frame)] += 1
+
+    def _collapse(self, frame) -> str:
+        stack: List[str] = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(_frame_key(frame))
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles inference requests and dumps each profile next to a JSON sidecar with the
+    request's stage timings:
+
+    - a random INFERENCE_PROFILE_SAMPLE_RATE fraction, and any request whose
+      X-Inference-Profile header matches INFERENCE_PROFILE_TOKEN, run under cProfile
+      (``<id>.prof``, readable with pstats);
+    - with INFERENCE_PROFILE_SLOW_MS set, every other request is stack-sampled and kept
+      as collapsed stacks (``<id>.stacks``) only if it took longer than the threshold.
+
+    Removes itself from the middleware chain when none of the three is configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = float(getattr(settings, "INFERENCE_PROFILE_SAMPLE_RATE", 0.0))
+        self.token = getattr(settings, "INFERENCE_PROFILE_TOKEN", "")
+        self.slow_ms = float(getattr(settings, "INFERENCE_PROFILE_SLOW_MS", 0.0))
+        if self.rate <= 0 and not self.token and self.slow_ms <= 0:
+            raise MiddlewareNotUsed()
+
+        self.prefixes = tuple(getattr(settings, "INFERENCE_PROFILE_PATHS", ("/api/v1/predict", "/api/v1/models/")))
+        self.directory = str(getattr(settings, "INFERENCE_PROFILE_DIR", "profiles"))
+        self.max_files = int(getattr(settings, "INFERENCE_PROFILE_MAX_FILES", 200))
+        self.sampler = StackSampler(getattr(settings, "INFERENCE_PROFILE_INTERVAL_MS", 5.0)) if self.slow_ms > 0 else None
+        # cProfile hooks are per interpreter on newer Pythons; profile one request at a time
+        self._cprofile_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        reason = self._reason(request)
+        profiler = None
+        if reason is not None and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        sampling = profiler is None and self.sampler is not None
+        if sampling:
+            self.sampler.begin()
+
+        stages: Dict[str, float] = {}
+        token = metrics.stage_log.set(stages)
+        started_at = time.time()
+        t0 = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+                    self._cprofile_lock.release()
+            else:
+                response = self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - t0) * 1000.0
+            metrics.stage_log.reset(token)
+            stacks = self.sampler.end() if sampling else None
+
+        if profiler is None and stacks and duration_ms >= self.slow_ms:
+            reason = "slow"
+        if reason is None or (profiler is None and not stacks):
+            return response
+
+        meta = {
+            "reason": reason,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 3),
+            "started_at": started_at,
+            "pid": os.getpid(),
+            "stages_ms": {k: round(v, 3) for k, v in sorted(stages.items())},
+        }
+        try:
+            profile_id = self._dump(meta, profiler, stacks)
+        except OSError:
+            logger.exception("Could not write request profile to %s", self.directory)
+        else:
+            response["X-Profile-Id"] = profile_id
+        return response
+
+    def _reason(self, request) -> Optional[str]:
+        header = request.META.get(HEADER)
+        if header and self.token and hmac.compare_digest(header.encode(), self.token.encode()):
+            return "header"
+        if self.rate > 0 and random.random() < self.rate:
+            return "sampled"
+        return None
+
+    def _dump(self, meta: Dict[str, Any], profiler: Optional[cProfile.Profile], stacks: Optional[Tally]) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", meta["path"]).strip("-")[:40]
+        started = meta["started_at"]
+        # millisecond timestamp first so rotation by name drops the oldest
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started)) + f"{int(started * 1000) % 1000:03d}"
+        profile_id = f"{stamp}-{meta['reason']}-{slug}-{uuid.uuid4().hex[:8]}"
+        base = os.path.join(self.directory, profile_id)
+
+        if profiler is not None:
+            meta["kind"] = "cprofile"
+            profiler.dump_stats(base + ".prof")
+        else:
+            meta["kind"] = "stacks"
+            with open(base + ".stacks", "w", encoding="utf-8") as f:
+                for stack, n in stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+        # the sidecar goes last: a profile is complete once its .json exists
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"id": profile_id, **meta}, f, indent=2)
+
+        profiles_written.inc(reason=meta["reason"])
+        self._rotate()
+        return profile_id
+
+    def _rotate(self) -> None:
+        sidecars = sorted(e.name for e in os.scandir(self.directory) if e.name.endswith(".json"))
+        for name in sidecars[: max(len(sidecars) - self.max_files, 0)]:
+            stem = name[: -len(".json")]
+            for ext in (".json", ".prof", ".stacks"):
+                try:
+                    os.remove(os.path.join(self.directory, stem + ext))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from . import artifacts, drift, metrics, services, warmup
+
+logger = logging.getLogger(__name__)
+
+loads = metrics.counter("registry_loads_total", "Registry model loads by outcome (ok, failed).")
+evictions = metrics.counter("registry_evictions_total", "Models evicted from the registry to stay under the memory budget.")
+swaps = metrics.counter("registry_swaps_total", "Hot swaps to a newer model version.")
+
+
+def _version_key(version: str) -> Tuple:
+    # natural order: v2 < v10, 2024-01-02 < 2024-01-10
+    return tuple(int(p) if p.isdigit() else p for p in re.split(r"(\d+)", version))
+
+
+def scan_catalog(root: str) -> Dict[str, Dict[str, str]]:
+    """
+    <root>/<name>/<version>.joblib  or  <root>/<name>/<version>/ (mmap layout)
+    -> {name: {version: path}}
+    """
+    catalog: Dict[str, Dict[str, str]] = {}
+    if not root or not os.path.isdir(root):
+        return catalog
+    for name_entry in os.scandir(root):
+        if not name_entry.is_dir() or name_entry.name.startswith("."):
+            continue
+        versions: Dict[str, str] = {}
+        for entry in os.scandir(name_entry.path):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_file() and entry.name.endswith(".joblib"):
+                versions[entry.name[: -len(".joblib")]] = entry.path
+            elif entry.is_dir() and artifacts.is_mmap_layout(entry.path):
+                versions[entry.name] = entry.path
+        if versions:
+            catalog[name_entry.name] = versions
+    return catalog
+
+
+class ModelRegistry:
+    """
+    Serves named, versioned models from a directory. Models load on first use and are
+    evicted least-recently-used once their on-disk size exceeds the memory budget.
+    A newer version of a model that is being served is loaded and warmed in the
+    background, then swapped in with a single reference assignment.
+    """
+
+    def __init__(self, root: str, memory_budget_bytes: int, warmup_rows: int = 8,
+                 engines: Optional[Dict[str, str]] = None):
+        self.root = root
+        self.memory_budget_bytes = int(memory_budget_bytes)
+        self.warmup_rows = warmup_rows
+        self.engines = dict(engines or {})
+        self._lock = threading.RLock()
+        self._catalog: Dict[str, Dict[str, str]] = {}
+        self._current: Dict[str, str] = {}
+        self._loaded: "OrderedDict[Tuple[str, str], services.LoadedModel]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], Future] = {}
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.scan()
+
+    def latest(self, name: str) -> Optional[str]:
+        versions = self._catalog.get(name)
+        if not versions:
+            return None
+        return max(versions, key=_version_key)
+
+    def scan(self) -> Dict[str, Dict[str, str]]:
+        catalog = scan_catalog(self.root)
+        upgrades = []
+        with self._lock:
+            self._catalog = catalog
+            for name, current in list(self._current.items()):
+                newest = self.latest(name)
+                if newest is not None and _version_key(newest) > _version_key(current):
+                    upgrades.append((name, newest))
+        for name, version in upgrades:
+            threading.Thread(target=self._upgrade, args=(name, version), name=f"registry-swap-{name}", daemon=True).start()
+        return catalog
+
+    def _upgrade(self, name: str, version: str) -> None:
+        try:
+            self._get_or_load(name, version)
+        except Exception:
+            logger.exception("Hot reload of %s:%s failed, keeping the current version", name, version)
+            return
+        with self._lock:
+            current = self._current.get(name)
+            if current is None or _version_key(version) > _version_key(current):
+                self._current[name] = version
+                swaps.inc(model=name)
+                logger.info("Swapped %s to version %s", name, version)
+
+    def get(self, name: str, version: Optional[str] = None) -> services.LoadedModel:
+        with self._lock:
+            if name not in self._catalog and not any(k[0] == name for k in self._loaded):
+                raise KeyError(f"Unknown model: {name}")
+            pinned = version is not None
+            version = version or self._current.get(name) or self.latest(name)
+            if version is None:
+                raise KeyError(f"No versions available for model: {name}")
+        handle = self._get_or_load(name, version)
+        if not pinned:
+            with self._lock:
+                self._current.setdefault(name, version)
+        return handle
+
+    def _get_or_load(self, name: str, version: str) -> services.LoadedModel:
+        key = (name, version)
+        with self._lock:
+            handle = self._loaded.get(key)
+            if handle is not None:
+                self._loaded.move_to_end(key)
+                return handle
+            path = self._catalog.get(name, {}).get(version)
+            if path is None:
+                raise KeyError(f"Unknown version {version!r} of model {name!r}")
+            fut = self._loading.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._loading[key] = Future()
+
+        if not leader:
+            return fut.result()
+
+        try:
+            handle = services.LoadedModel(path, name=name, version=version, engine=self.engines.get(name))
+            warmup.warm(handle, rows=self.warmup_rows, rounds=1)
+        except BaseException as e:
+            loads.inc(model=name, outcome="failed")
+            with self._lock:
+                self._loading.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        loads.inc(model=name, outcome="ok")
+        with self._lock:
+            self._loaded[key] = handle
+            self._loading.pop(key, None)
+            self._evict(keep=key)
+        fut.set_result(handle)
+        return handle
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        total = sum(h.size_bytes for h in self._loaded.values())
+        for key in list(self._loaded):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            handle = self._loaded.pop(key)
+            total -= handle.size_bytes
+            if self._current.get(key[0]) == key[1]:
+                del self._current[key[0]]
+            drift.forget(handle.drift)
+            evictions.inc(model=key[0])
+            logger.info("Evicted %s:%s from the registry", *key)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = []
+            for name in sorted(self._catalog):
+                versions = sorted(self._catalog[name], key=_version_key)
+                out.append({
+                    "name": name,
+                    "versions": versions,
+                    "latest": versions[-1],
+                    "serving": self._current.get(name),
+                    "loaded": [v for (n, v) in self._loaded if n == name],
+                })
+            return out
+
+    def start_watcher(self, interval: float) -> None:
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.scan()
+                except Exception:
+                    logger.exception("Registry scan failed")
+
+        self._watcher = threading.Thread(target=loop, name="registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Optional[ModelRegistry]:
+    global _registry
+    root = getattr(settings, "INFERENCE_REGISTRY_DIR", "")
+    if not root:
+        return None
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    str(root),
+                    memory_budget_bytes=int(getattr(settings, "INFERENCE_REGISTRY_MEMORY_MB", 512)) * 1024 * 1024,
+                    warmup_rows=getattr(settings, "INFERENCE_WARMUP_ROWS", 8),
+                    engines=getattr(settings, "INFERENCE_REGISTRY_ENGINES", {}),
+                )
+                _registry.start_watcher(getattr(settings, "INFERENCE_REGISTRY_POLL_SECONDS", 5.0))
+    return _registry
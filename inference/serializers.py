@@ -8,30 +8,152 @@ class PredictSerializer(serializers.Serializer):
     features = serializers.JSONField()
 
     def validate_features(self, value: Union[List[Any], Dict[str, Any]]) -> Union[List[Any], Dict[str, Any]]:
-        expected: Optional[List[str]] = self.context.get("expected_columns")
+        return validate_row(value, self.context.get("expected_columns"))
 
-        
-        if isinstance(value, list):
-            if expected is not None and len(value) != len(expected):
+
+def validate_row(value: Any, expected: Optional[List[str]] = None) -> Union[List[Any], Dict[str, Any]]:
+
+    if isinstance(value, list):
+        if expected is not None and len(value) != len(expected):
+            raise serializers.ValidationError(
+                f"Expected {len(expected)} features in list, got {len(value)}."
+            )
+        return value
+
+    if isinstance(value, dict):
+        if expected is not None:
+            missing = [c for c in expected if c not in value]
+            if missing:
                 raise serializers.ValidationError(
-                    f"Expected {len(expected)} features in list, got {len(value)}."
+                    {"missing_keys": missing, "detail": "Some required feature keys are missing."}
                 )
-            return value
+        return value
+
+    raise serializers.ValidationError("features must be either a JSON object (dict) or an array (list).")
+
+
+class PredictBatchSerializer(serializers.Serializer):
+
+    rows = serializers.ListField(child=serializers.JSONField(), allow_empty=False)
+
+    def validate_rows(self, value: List[Any]) -> List[Any]:
+        max_rows: Optional[int] = self.context.get("max_rows")
+        if max_rows is not None and len(value) > max_rows:
+            raise serializers.ValidationError(f"Batch too large: {len(value)} rows, limit is {max_rows}.")
+        return value
+
+
+class SweepAxisSerializer(serializers.Serializer):
+
+    feature = serializers.CharField()
+    values = serializers.ListField(child=serializers.JSONField(), allow_empty=False, required=False)
+    min = serializers.FloatField(required=False)
+    max = serializers.FloatField(required=False)
+    steps = serializers.IntegerField(required=False, min_value=2, max_value=10000)
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        if "values" in attrs and ("min" in attrs or "max" in attrs):
+            raise serializers.ValidationError("Give either values or min/max, not both.")
+        if ("min" in attrs) != ("max" in attrs):
+            raise serializers.ValidationError("min and max go together.")
+        return attrs
+
+
+class PredictSweepSerializer(serializers.Serializer):
+
+    features = serializers.JSONField()
+    sweep = serializers.ListField(child=SweepAxisSerializer(), min_length=1, max_length=2)
+
+    def validate_features(self, value: Union[List[Any], Dict[str, Any]]) -> Union[List[Any], Dict[str, Any]]:
+        return validate_row(value, self.context.get("expected_columns"))
+
+    def validate_sweep(self, value: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len({axis["feature"] for axis in value}) != len(value):
+            raise serializers.ValidationError("Each feature can be swept once.")
+        return value
+
+
+class SweepAxisValuesSerializer(serializers.Serializer):
+
+    feature = serializers.CharField()
+    values = serializers.ListField(child=serializers.JSONField())
+
+
+class SweepBaseSerializer(serializers.Serializer):
 
-        
-        if isinstance(value, dict):
-            if expected is not None:
-                missing = [c for c in expected if c not in value]
-                if missing:
-                    raise serializers.ValidationError(
-                        {"missing_keys": missing, "detail": "Some required feature keys are missing."}
-                    )
-            return value
+    label = serializers.JSONField()
+    confidence = serializers.FloatField(required=False)
 
-        raise serializers.ValidationError("features must be either a JSON object (dict) or an array (list).")
+
+class PredictSweepResponseSerializer(serializers.Serializer):
+
+    axes = SweepAxisValuesSerializer(many=True)
+    points = serializers.IntegerField()
+    base = SweepBaseSerializer()
+    label = serializers.ListField(child=serializers.JSONField(), help_text="Curve, or grid [first axis][second axis].")
+    confidence = serializers.ListField(child=serializers.JSONField(), required=False)
+    proba = serializers.DictField(child=serializers.ListField(child=serializers.JSONField()), required=False)
 
 
 class PredictResponseSerializer(serializers.Serializer):
  
     label = serializers.IntegerField()
     confidence = serializers.FloatField(required=False, allow_null=True)
+
+
+class PredictBatchItemSerializer(serializers.Serializer):
+
+    index = serializers.IntegerField()
+    label = serializers.IntegerField(required=False)
+    confidence = serializers.FloatField(required=False, allow_null=True)
+    error = serializers.JSONField(required=False)
+
+
+class PredictBatchResponseSerializer(serializers.Serializer):
+
+    results = PredictBatchItemSerializer(many=True)
+
+
+class ErrorResponseSerializer(serializers.Serializer):
+
+    error = serializers.CharField()
+    detail = serializers.JSONField(required=False)
+
+
+class ModelVersionsSerializer(serializers.Serializer):
+
+    name = serializers.CharField()
+    versions = serializers.ListField(child=serializers.CharField())
+    latest = serializers.CharField()
+    serving = serializers.CharField(allow_null=True)
+    loaded = serializers.ListField(child=serializers.CharField())
+
+
+class ModelListResponseSerializer(serializers.Serializer):
+
+    models = ModelVersionsSerializer(many=True)
+
+
+class JobSerializer(serializers.Serializer):
+
+    id = serializers.CharField()
+    status = serializers.ChoiceField(choices=["queued", "running", "done", "failed", "cancelled"])
+    filename = serializers.CharField()
+    format = serializers.ChoiceField(choices=["csv", "jsonl", "parquet"])
+    output = serializers.ChoiceField(choices=["jsonl", "csv"])
+    created_at = serializers.DateTimeField()
+    started_at = serializers.DateTimeField(allow_null=True)
+    finished_at = serializers.DateTimeField(allow_null=True)
+    rows_done = serializers.IntegerField()
+    total_rows = serializers.IntegerField(allow_null=True)
+    attempts = serializers.IntegerField()
+    error = serializers.CharField(allow_null=True)
+    progress = serializers.FloatField()
+    status_url = serializers.URLField(required=False)
+    results_url = serializers.URLField(required=False)
+    deleted = serializers.BooleanField(required=False)
+
+
+class JobListResponseSerializer(serializers.Serializer):
+
+    jobs = JobSerializer(many=True)
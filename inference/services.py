@@ -1,19 +1,55 @@
-﻿import os
+﻿import hashlib
+import logging
+import os
+import time
 from functools import lru_cache
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 import joblib
+import numpy as np
+
+from . import artifacts, drift, preprocess, fastpath, metrics, threads, trees, validation
+
+logger = logging.getLogger(__name__)
+
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+stage_hist = metrics.histogram("model_stage_ms", "Time per model stage (frame, model_call) in ms, by model and version.")
+rows_hist = metrics.histogram("model_batch_rows", "Rows per model call, by model and version.", ROW_BUCKETS)
 
 DEFAULT_MODEL_PATH = os.path.join(
     os.path.dirname(__file__), "model_assets", "hotel_cancel_model.joblib"
 )
 MODEL_PATH = os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+COMPILED_PIPELINE = os.getenv("INFERENCE_COMPILED_PIPELINE", "False").lower() == "true"
+# request validation: "reject" or "allow" categories the encoder never saw; 0 disables the scaler-derived range check
+UNKNOWN_CATEGORIES = os.getenv("INFERENCE_UNKNOWN_CATEGORIES", "auto").lower()
+RANGE_MAX_SIGMA = float(os.getenv("INFERENCE_RANGE_MAX_SIGMA", "0"))
+# final estimator engine: "native" or "flat" (trees.FlatForest for inputs up to INFERENCE_FLAT_MAX_ROWS rows)
+ENGINES = ("native", "flat")
+ENGINE = os.getenv("INFERENCE_ENGINE", "native").lower()
+FLAT_MAX_ROWS = int(os.getenv("INFERENCE_FLAT_MAX_ROWS", "64"))
 
-@lru_cache(maxsize=1)
-def _load_raw():
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"MODEL_PATH not found: {MODEL_PATH}")
-    return joblib.load(MODEL_PATH)
+def load_raw(path: str):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"MODEL_PATH not found: {path}")
+    if artifacts.is_mmap_layout(path):
+        return artifacts.load_mmap(path)
+    return joblib.load(path)
+
+def file_fingerprint(path: str) -> str:
+    if artifacts.is_mmap_layout(path):
+        return artifacts.layout_fingerprint(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def artifact_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+    return os.path.getsize(path)
 
 def _resolve_model_and_meta(raw) -> (Any, Dict[str, Any]):
    
@@ -47,68 +83,321 @@ def _resolve_model_and_meta(raw) -> (Any, Dict[str, Any]):
 
     return model, meta
 
-@lru_cache(maxsize=1)
-def load_model_and_meta():
-    raw = _load_raw()
-    return _resolve_model_and_meta(raw)
-
-def model_signature() -> Dict[str, Any]:
-    model, meta = load_model_and_meta()
-    sig: Dict[str, Any] = {
-        "path": MODEL_PATH,
-        "class_name": type(model).__name__,
-        "is_pipeline": hasattr(model, "steps"),
-        "has_predict_proba": hasattr(model, "predict_proba"),
-    }
-    sig.update(meta)
-    return sig
-
-def _to_model_input(features: List[float]):
+class LoadedModel:
     """
-    يبني المدخلات زي ما الموديل متوقع:
-    - لو عندنا feature_names -> نبني DataFrame بنفس الترتيب
-    - غير كده -> list[list]
-    ويتحقق من عدد الخصائص لو معروف
+    One loaded model artifact and everything compiled from it at load time
+    (schema, optional fast path, fingerprint). Instances are never mutated after
+    construction, so a reference held by an in-flight request stays valid.
     """
-    model, meta = load_model_and_meta()
-    expected = meta.get("expected_n_features")
-    names = meta.get("feature_names")
 
-    
-    if expected is not None and len(features) != expected:
-        raise ValueError(f"Feature length mismatch. Expected {expected}, got {len(features)}.")
+    def __init__(self, path: str, name: str = "default", version: Optional[str] = None,
+                 compiled: bool = COMPILED_PIPELINE, engine: Optional[str] = None):
+        self.path = path
+        self.name = name
+        self.version = version
+        self.timings_ms: Dict[str, float] = {}
 
-    if names is not None:
-        
-        if len(features) != len(names):
+        t = time.perf_counter()
+        self.raw = load_raw(path)
+        t = self._lap("unpickle", t)
+        self.model, self.meta = _resolve_model_and_meta(self.raw)
+        self.threads = threads.budget().configure(self.model)
+        self.schema: Optional[preprocess.FeatureSchema] = preprocess.compile_schema(self.raw)
+        self.validator: Optional[validation.RowValidator] = validation.compile_validator(
+            self.raw, self.model, self.schema, UNKNOWN_CATEGORIES, RANGE_MAX_SIGMA
+        )
+        self.fastpath: Optional[fastpath.CompiledPipeline] = None
+        if compiled:
+            try:
+                self.fastpath = fastpath.compile_pipeline(self.model, self.schema)
+            except fastpath.UnsupportedPipeline as e:
+                logger.warning("Compiled pipeline disabled for %s, using the full pipeline: %s", path, e)
+        # what scores the rows when there is no compiled pipeline (the fast path keeps its own estimator)
+        self.scorer: Any = self.model
+        self.engine = "native"
+        self.engine_info: Dict[str, Any] = {}
+        requested = (engine or (self.raw.get("engine") if isinstance(self.raw, dict) else None) or ENGINE).lower()
+        if requested not in ENGINES:
+            raise ValueError(f"Unknown inference engine {requested!r}; expected one of {ENGINES}.")
+        if requested == "flat":
+            self._use_flat_engine()
+        t = self._lap("compile", t)
+        self.fingerprint = file_fingerprint(path)
+        self.size_bytes = artifact_size(path)
+        self._lap("fingerprint", t)
+        self.metric_labels = {"model": name, "version": version or self.fingerprint[:12]}
+        self.drift: Optional[drift.DriftMonitor] = drift.monitor_for(self)
+        self.loaded_at = time.time()
+
+    def _use_flat_engine(self) -> None:
+        try:
+            if self.fastpath is not None:
+                forest = trees.from_xgboost(self.fastpath.estimator, FLAT_MAX_ROWS)
+                self.fastpath = self.fastpath.with_estimator(forest)
+            else:
+                self.scorer = trees.compile_forest(self.model, FLAT_MAX_ROWS)
+                forest = self.scorer.forest if isinstance(self.scorer, trees.ForestPipeline) else self.scorer
+        except trees.UnsupportedModel as e:
+            logger.warning("Flat tree engine unavailable for %s, using the native estimator: %s", self.path, e)
+            self.engine_info = {"requested": "flat", "fallback_reason": str(e)}
+            return
+        self.engine = "flat"
+        self.engine_info = forest.describe()
+
+    def _lap(self, name: str, t0: float) -> float:
+        now = time.perf_counter()
+        self.timings_ms[name] = round((now - t0) * 1000.0, 3)
+        return now
+
+    def signature(self) -> Dict[str, Any]:
+        sig: Dict[str, Any] = {
+            "path": self.path,
+            "fingerprint": self.fingerprint,
+            "class_name": type(self.model).__name__,
+            "is_pipeline": hasattr(self.model, "steps"),
+            "has_predict_proba": hasattr(self.model, "predict_proba"),
+            "compiled_pipeline": self.fastpath is not None,
+            "engine": {"name": self.engine, **self.engine_info},
+            "validator": self.validator is not None,
+            "drift_reference": None if self.drift is None else self.drift.reference.source,
+            "threads": {**threads.budget().describe(), "applied": self.threads},
+        }
+        if self.version is not None:
+            sig.update({"name": self.name, "version": self.version})
+        sig.update(self.meta)
+        return sig
+
+    def check_features(self, features: List[float]) -> Optional[List[str]]:
+        expected = self.meta.get("expected_n_features")
+        names = self.meta.get("feature_names")
+
+        if expected is not None and len(features) != expected:
+            raise ValueError(f"Feature length mismatch. Expected {expected}, got {len(features)}.")
+
+        if names is not None and len(features) != len(names):
             raise ValueError(
                 f"Feature length mismatch. Expected {len(names)} features ({names}), got {len(features)}."
             )
-        try:
+        return names
+
+    def _to_model_input(self, features: List[float]):
+        """
+        يبني المدخلات زي ما الموديل متوقع:
+        - لو عندنا feature_names -> نبني DataFrame بنفس الترتيب
+        - غير كده -> list[list]
+        ويتحقق من عدد الخصائص لو معروف
+        """
+        names = self.check_features(features)
+
+        if self.schema is not None:
+            return self.schema.frame([features])
+
+        if names is not None:
+            try:
+                import pandas as pd
+            except ImportError as e:
+                raise ImportError("pandas is required to pass named features. Install pandas.") from e
+            return pd.DataFrame([features], columns=names)
+
+        return [features]
+
+    def _to_batch_input(self, rows: List[List[Any]]):
+        if self.schema is not None:
+            return self.schema.frame(rows)
+        expected = self.meta.get("expected_n_features")
+        names = self.meta.get("feature_names")
+        if names is not None:
             import pandas as pd
-        except ImportError as e:
-            raise ImportError("pandas is required to pass named features. Install pandas.") from e
-        return pd.DataFrame([features], columns=names)
+            return pd.DataFrame(rows, columns=names)
+        if expected is not None:
+            return np.asarray(rows, dtype=float).reshape(len(rows), expected)
+        return rows
 
-    
-    return [features]
+    def _model_and_input(self, rows: List[List[Any]]):
+        if self.fastpath is not None:
+            return self.fastpath, rows
+        return self.scorer, self._to_batch_input(rows)
 
-def predict(features: List[float]) -> Dict[str, Any]:
-    model, _ = load_model_and_meta()
-    X = _to_model_input(features)
+    def preprocess(self, row: Union[List[Any], Dict[str, Any]]) -> List[Any]:
+        if self.validator is not None:
+            return self.validator.validate(row)
+        if not isinstance(row, (list, dict)):
+            raise ValueError("row must be either a JSON object (dict) or an array (list).")
+        names = self.meta.get("feature_names")
+        x = preprocess.run(row, expected_columns=names, schema=self.schema)
+        width = len(names) if names is not None else self.meta.get("expected_n_features")
+        if width is not None and len(x) != width:
+            raise ValueError(f"Feature length mismatch. Expected {width}, got {len(x)}.")
+        return x
 
- 
-    y = model.predict(X)[0]
+    def predict(self, features: List[float], track: bool = True) -> Dict[str, Any]:
+        ml = self.metric_labels
+        with stage_hist.time(stage="frame", **ml):
+            if self.fastpath is not None:
+                self.check_features(features)
+                model, X = self.fastpath, [features]
+            else:
+                model, X = self.scorer, self._to_model_input(features)
 
+        with stage_hist.time(stage="model_call", **ml):
+            labels, confidences = _score(model, X)
+        rows_hist.observe(1, **ml)
+        if track and self.drift is not None:
+            self.drift.offer_rows([features])
+        return {"label": _format_label(labels[0]), "confidence": confidences[0]}
 
-    confidence = None
-    if hasattr(model, "predict_proba"):
-        try:
-            proba_row = model.predict_proba(X)[0]
-            confidence = float(max(proba_row))
-        except Exception:
-            confidence = None
+    def predict_many(self, rows: List[List[Any]], track: bool = True) -> List[Dict[str, Any]]:
+        """Scores already-preprocessed rows of equal width with a single model call; track=False keeps them out of drift."""
+        ml = self.metric_labels
+        with stage_hist.time(stage="frame", **ml):
+            model, X = self._model_and_input(rows)
+        with stage_hist.time(stage="model_call", **ml):
+            labels, confidences = _score(model, X)
+        rows_hist.observe(len(rows), **ml)
+        if track and self.drift is not None:
+            self.drift.offer_rows(rows)
+        return [{"label": _format_label(y), "confidence": c} for y, c in zip(labels, confidences)]
 
-    
-    label_out = float(y) if isinstance(y, (int, float)) else str(y)
-    return {"label": label_out, "confidence": confidence}
+    def predict_columns(self, columns: Dict[str, np.ndarray], n: int) -> (List[Any], List[Optional[float]]):
+        """
+        Scores n already-validated rows given as one array per schema column
+        (RowValidator.validate_columns output) without materialising per-row lists.
+        """
+        ml = self.metric_labels
+        with stage_hist.time(stage="frame", **ml):
+            model, X = self._columns_input(columns, n)
+        with stage_hist.time(stage="model_call", **ml):
+            labels, confidences = _score(model, X)
+        rows_hist.observe(n, **ml)
+        if self.drift is not None:
+            self.drift.offer_columns(columns, n)
+        return [_format_label(y) for y in labels], confidences
+
+    def proba_columns(self, columns: Dict[str, np.ndarray], n: int) -> (List[Any], Optional[List[Any]], Optional[np.ndarray]):
+        """
+        Like predict_columns, but keeps every class probability: returns (labels, classes,
+        predict_proba matrix), classes and matrix None when the model has no predict_proba.
+        Meant for synthetic rows (what-if sweeps), so nothing is offered to the drift monitor.
+        """
+        ml = self.metric_labels
+        with stage_hist.time(stage="frame", **ml):
+            model, X = self._columns_input(columns, n)
+        with stage_hist.time(stage="model_call", **ml):
+            with threads.budget().scope(n):
+                scored = _proba(model, X)
+                predicted = model.predict(X) if scored is None else None
+        rows_hist.observe(n, **ml)
+        if scored is None:
+            return [_format_label(y) for y in predicted], None, None
+        classes, proba = scored
+        idx = proba.argmax(axis=1)
+        labels = np.asarray(classes)[idx] if classes is not None else idx
+        names = [_format_label(c) for c in (classes if classes is not None else range(proba.shape[1]))]
+        return [_format_label(y) for y in labels], names, proba
+
+    def _columns_input(self, columns: Dict[str, np.ndarray], n: int):
+        if self.fastpath is not None:
+            return self.fastpath.estimator, self.fastpath.transform_columns(columns, n)
+        import pandas as pd
+        return self.scorer, pd.DataFrame(columns, columns=self.schema.columns, copy=False)
+
+    def predict_batch(self, rows: List[Union[List[Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Scores N raw rows (dicts or ordered lists) with a single model call.
+        Rows that fail preprocessing get their own {"error", "detail"} entry
+        (a list of per-field errors when the model has a validator);
+        the rest of the batch is still scored.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        if self.validator is not None:
+            valid_rows, valid_idx, failed = self.validator.validate_many(rows)
+            for i, errors in failed.items():
+                results[i] = {"error": "bad_input", "detail": errors}
+        else:
+            valid_idx, valid_rows = [], []
+            for i, row in enumerate(rows):
+                try:
+                    x = self.preprocess(row)
+                except ValueError as e:
+                    results[i] = {"error": "bad_input", "detail": str(e)}
+                    continue
+                valid_idx.append(i)
+                valid_rows.append(x)
+
+        if valid_rows:
+            for i, out in zip(valid_idx, self.predict_many(valid_rows)):
+                results[i] = out
+
+        return results
+
+def _format_label(y) -> Any:
+    return float(y) if isinstance(y, (int, float)) else str(y)
+
+def _score(model, X) -> (List[Any], List[Optional[float]]):
+    """
+    One model call per input: labels are taken from the argmax of predict_proba
+    instead of running predict() and predict_proba() on the same rows.
+    """
+    with threads.budget().scope(len(X)):
+        return _score_unscoped(model, X)
+
+def _proba(model, X) -> Optional[Tuple[Any, np.ndarray]]:
+    """(classes_ or None, predict_proba matrix), or None when the model cannot give probabilities."""
+    if not hasattr(model, "predict_proba"):
+        return None
+    try:
+        proba = np.asarray(model.predict_proba(X))
+    except Exception:
+        return None
+    if proba.ndim != 2 or not len(proba):
+        return None
+    return getattr(model, "classes_", None), proba
+
+def _score_unscoped(model, X) -> (List[Any], List[Optional[float]]):
+    scored = _proba(model, X)
+    if scored is not None:
+        classes, proba = scored
+        idx = proba.argmax(axis=1)
+        labels = list(np.asarray(classes)[idx]) if classes is not None else list(idx)
+        return labels, [float(c) for c in proba.max(axis=1)]
+
+    labels = list(model.predict(X))
+    return labels, [None] * len(labels)
+
+@lru_cache(maxsize=1)
+def default_model() -> LoadedModel:
+    return LoadedModel(MODEL_PATH)
+
+def _load_raw():
+    return default_model().raw
+
+def load_model_and_meta():
+    m = default_model()
+    return m.model, m.meta
+
+def model_fingerprint() -> str:
+    return default_model().fingerprint
+
+def load_schema() -> Optional[preprocess.FeatureSchema]:
+    return default_model().schema
+
+def load_validator() -> Optional[validation.RowValidator]:
+    return default_model().validator
+
+def load_fastpath() -> Optional[fastpath.CompiledPipeline]:
+    return default_model().fastpath
+
+def model_signature() -> Dict[str, Any]:
+    return default_model().signature()
+
+def check_features(features: List[float]) -> Optional[List[str]]:
+    return default_model().check_features(features)
+
+def predict(features: List[float]) -> Dict[str, Any]:
+    return default_model().predict(features)
+
+def predict_many(rows: List[List[Any]]) -> List[Dict[str, Any]]:
+    return default_model().predict_many(rows)
+
+def predict_batch(rows: List[Union[List[Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return default_model().predict_batch(rows)
@@ -0,0 +1,349 @@
+"""
+Shadow scoring and A/B routing for candidate models.
+
+Requests scored by the primary model are offered to ``offer()``, which samples them
+and puts them on a bounded queue without waiting: when the queue is full the request
+is dropped, never delayed. Background workers (at a lower CPU priority than the
+request threads where the OS allows it) take up to INFERENCE_SHADOW_BATCH_ROWS queued
+rows at a time, score them with every candidate in one call per candidate and compare
+the results with what the primary returned: label agreement, the difference in the
+score given to the primary's label, and the candidate's latency. Items older than
+INFERENCE_SHADOW_MAX_AGE_MS are dropped instead of scored late.
+
+Candidates are registry models ("name" or "name:version") or artifact paths, loaded
+by the workers, never on the request path. Once a candidate is trusted it can take
+a share of /predict/ traffic through INFERENCE_AB_WEIGHTS; the split is sticky per
+X-Request-ID and routed requests are audited under the candidate's name/version.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from . import metrics, postprocess
+
+logger = logging.getLogger(__name__)
+
+offered = metrics.counter("shadow_offered_total", "Requests offered to shadow scoring by outcome (queued, sampled_out, dropped, stale).")
+compared = metrics.counter("shadow_rows_total", "Shadow-scored rows by candidate and outcome (agree, disagree, error).")
+delta_hist = metrics.histogram(
+    "shadow_score_delta", "Absolute difference between candidate and primary score for the primary's label.",
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0),
+)
+latency_hist = metrics.histogram("shadow_latency_ms", "Candidate model time per shadow batch (ms).")
+routed = metrics.counter("ab_routed_total", "Requests served by an A/B candidate instead of the primary model.")
+
+
+class Candidate:
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        if spec.endswith(".joblib") or os.sep in spec or os.path.isdir(spec):
+            self.name = os.path.splitext(os.path.basename(spec.rstrip(os.sep)))[0]
+            self.path: Optional[str] = spec
+            self.model_name, self.version = self.name, None
+        else:
+            self.name = spec
+            self.path = None
+            self.model_name, _, version = spec.partition(":")
+            self.version = version or None
+        self.handle: Any = None
+        self.load_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stats = {"rows": 0, "agree": 0, "errors": 0, "delta_sum": 0.0, "delta_max": 0.0, "batches": 0, "latency_ms_sum": 0.0}
+
+    def load(self) -> Any:
+        if self.handle is not None:
+            return self.handle
+        from . import registry, services
+
+        try:
+            if self.path is not None:
+                handle = services.LoadedModel(self.path, name=self.name)
+            else:
+                reg = registry.get_registry()
+                if reg is None:
+                    raise KeyError(f"{self.spec} is a registry model but INFERENCE_REGISTRY_DIR is not set.")
+                handle = reg.get(self.model_name, self.version)
+        except Exception as e:
+            self.load_error = str(e)
+            logger.warning("Shadow candidate %s failed to load: %s", self.spec, e)
+            raise
+        self.handle, self.load_error = handle, None
+        return handle
+
+    def observe(self, primary: Sequence[Dict[str, Any]], shadow: Sequence[Dict[str, Any]], elapsed_ms: float) -> None:
+        agree = errors = 0
+        deltas: List[float] = []
+        for p, s in zip(primary, shadow):
+            if "error" in s:
+                errors += 1
+                continue
+            same = s.get("label") == p.get("label")
+            agree += same
+            d = score_delta(p, s, same)
+            if d is not None:
+                deltas.append(d)
+        n = len(primary)
+        compared.inc(agree, candidate=self.name, outcome="agree")
+        compared.inc(n - agree - errors, candidate=self.name, outcome="disagree")
+        if errors:
+            compared.inc(errors, candidate=self.name, outcome="error")
+        for d in deltas:
+            delta_hist.observe(abs(d), candidate=self.name)
+        latency_hist.observe(elapsed_ms, candidate=self.name)
+        with self._lock:
+            st = self.stats
+            st["rows"] += n
+            st["agree"] += agree
+            st["errors"] += errors
+            st["delta_sum"] += sum(abs(d) for d in deltas)
+            st["delta_max"] = max([st["delta_max"]] + [abs(d) for d in deltas])
+            st["batches"] += 1
+            st["latency_ms_sum"] += elapsed_ms
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            st = dict(self.stats)
+        scored = st["rows"] - st["errors"]
+        h = self.handle
+        return {
+            "candidate": self.name,
+            "spec": self.spec,
+            "loaded": h is not None,
+            "version": None if h is None else h.metric_labels["version"],
+            "load_error": self.load_error,
+            "rows": st["rows"],
+            "errors": st["errors"],
+            "agreement_rate": round(st["agree"] / scored, 6) if scored else None,
+            "mean_abs_score_delta": round(st["delta_sum"] / scored, 6) if scored else None,
+            "max_abs_score_delta": round(st["delta_max"], 6),
+            "mean_batch_latency_ms": round(st["latency_ms_sum"] / st["batches"], 3) if st["batches"] else None,
+        }
+
+
+def score_delta(primary: Dict[str, Any], shadow: Dict[str, Any], same_label: bool) -> Optional[float]:
+    """
+    Candidate minus primary score for the primary's label. ``confidence`` is the top
+    class probability, so on a disagreement the candidate's score for the primary's
+    label is only known for binary models (1 - confidence).
+    """
+    p, s = primary.get("confidence"), shadow.get("confidence")
+    if p is None or s is None:
+        return None
+    if same_label:
+        return float(s) - float(p)
+    if shadow.get("n_classes") == 2:
+        return (1.0 - float(s)) - float(p)
+    return None
+
+
+class ShadowScorer:
+
+    def __init__(self, specs: Sequence[str], queue_size: int = 1000, workers: int = 1, batch_rows: int = 64,
+                 sample_rate: float = 1.0, max_age_ms: float = 5000.0, nice: int = 10,
+                 weights: Optional[Dict[str, float]] = None):
+        self.candidates = [Candidate(s) for s in specs]
+        self.batch_rows = max(int(batch_rows), 1)
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        self.max_age_seconds = max(float(max_age_ms), 0.0) / 1000.0
+        self.nice = int(nice)
+        self._queue: "queue.Queue[Tuple[float, str, Sequence[Any], Sequence[Dict[str, Any]]]]" = queue.Queue(
+            maxsize=max(int(queue_size), 1)
+        )
+        self.n_workers = max(int(workers), 1)
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._sample_counter = 0
+        by_name = {c.name: c for c in self.candidates}
+        self.weights: List[Tuple[float, Candidate]] = []
+        total = 0.0
+        for name, w in (weights or {}).items():
+            if name not in by_name:
+                raise ValueError(f"A/B weight for {name!r}, which is not a shadow candidate ({sorted(by_name)}).")
+            total += float(w)
+            self.weights.append((total, by_name[name]))
+        if total > 1.0:
+            raise ValueError(f"A/B weights add up to {total}, more than 1.")
+
+    # ---- request side ----
+
+    def offer(self, endpoint: str, rows: Sequence[Any], results: Sequence[Dict[str, Any]]) -> None:
+        """Queues rows the primary has answered; returns at once and drops the request when the queue is full."""
+        if self.sample_rate < 1.0:
+            # deterministic 1-in-k sampling, no RNG on the request path
+            self._sample_counter += 1
+            if (self._sample_counter * self.sample_rate) % 1.0 >= self.sample_rate:
+                offered.inc(outcome="sampled_out")
+                return
+        try:
+            self._queue.put_nowait((time.monotonic(), endpoint, rows, results))
+        except queue.Full:
+            offered.inc(outcome="dropped")
+            return
+        offered.inc(outcome="queued")
+
+    def route(self, request_id: str) -> Any:
+        """The candidate handle this request should be served by, or None for the primary."""
+        if not self.weights:
+            return None
+        point = zlib.crc32(request_id.encode("utf-8")) / 2**32
+        for upper, candidate in self.weights:
+            if point < upper:
+                # not loaded yet (workers load candidates at start): the primary answers meanwhile
+                handle = candidate.handle
+                if handle is not None:
+                    routed.inc(candidate=candidate.name)
+                return handle
+        return None
+
+    # ---- workers ----
+
+    def start(self) -> None:
+        if self._threads or not self.candidates:
+            return
+        for i in range(self.n_workers):
+            t = threading.Thread(target=self._run, name=f"shadow-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _lower_priority(self) -> None:
+        # Linux nice values are per thread: shadow work yields the CPU to request threads
+        if self.nice <= 0 or not hasattr(os, "setpriority"):
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except OSError as e:
+            logger.info("Could not lower shadow worker priority: %s", e)
+
+    def _run(self) -> None:
+        self._lower_priority()
+        for c in self.candidates:
+            try:
+                c.load()
+            except Exception:
+                pass
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = self._take_batch(first)
+            if batch:
+                try:
+                    self.score(batch)
+                except Exception:
+                    logger.exception("Shadow scoring failed")
+
+    def _take_batch(self, first: Tuple) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Fresh (row, primary result) pairs from ``first`` and whatever else is queued, up to batch_rows."""
+        pairs: List[Tuple[Any, Dict[str, Any]]] = []
+        item: Optional[Tuple] = first
+        oldest = time.monotonic() - self.max_age_seconds
+        while item is not None:
+            queued_at, _endpoint, rows, results = item
+            if self.max_age_seconds and queued_at < oldest:
+                offered.inc(outcome="stale")
+            else:
+                pairs.extend((r, out) for r, out in zip(rows, results) if out is not None and "error" not in out)
+            if len(pairs) >= self.batch_rows:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                item = None
+        return pairs
+
+    def score(self, pairs: Sequence[Tuple[Any, Dict[str, Any]]]) -> None:
+        """Scores the rows with every loaded candidate, one call each, and records the comparison."""
+        rows = [r for r, _ in pairs]
+        primary = [out for _, out in pairs]
+        for c in self.candidates:
+            handle = c.handle
+            if handle is None:
+                try:
+                    handle = c.load()
+                except Exception:
+                    continue
+            t = time.perf_counter()
+            try:
+                shadow = handle.predict_batch(rows)
+            except Exception as e:
+                shadow = [{"error": "inference_failed", "detail": str(e)}] * len(rows)
+            elapsed_ms = (time.perf_counter() - t) * 1000.0
+            n_classes = _n_classes(handle)
+            for out in shadow:
+                if "error" not in out:
+                    postprocess.run(out)
+                    out["n_classes"] = n_classes
+            c.observe(primary, shadow, elapsed_ms)
+
+    def describe(self) -> Dict[str, Any]:
+        lower = 0.0
+        weights = {}
+        for upper, c in self.weights:
+            weights[c.name] = round(upper - lower, 6)
+            lower = upper
+        return {
+            "candidates": [c.describe() for c in self.candidates],
+            "ab_weights": weights,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "batch_rows": self.batch_rows,
+            "workers": len(self._threads),
+            "pid": os.getpid(),
+        }
+
+
+def _n_classes(handle: Any) -> Optional[int]:
+    classes = getattr(handle.model, "classes_", None)
+    return None if classes is None else len(classes)
+
+
+_scorer: Optional[ShadowScorer] = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer() -> Optional[ShadowScorer]:
+    global _scorer
+    specs = getattr(settings, "INFERENCE_SHADOW_MODELS", [])
+    if not specs:
+        return None
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                s = ShadowScorer(
+                    specs,
+                    queue_size=getattr(settings, "INFERENCE_SHADOW_QUEUE_SIZE", 1000),
+                    workers=getattr(settings, "INFERENCE_SHADOW_WORKERS", 1),
+                    batch_rows=getattr(settings, "INFERENCE_SHADOW_BATCH_ROWS", 64),
+                    sample_rate=getattr(settings, "INFERENCE_SHADOW_SAMPLE_RATE", 1.0),
+                    max_age_ms=getattr(settings, "INFERENCE_SHADOW_MAX_AGE_MS", 5000.0),
+                    nice=getattr(settings, "INFERENCE_SHADOW_NICE", 10),
+                    weights=getattr(settings, "INFERENCE_AB_WEIGHTS", {}),
+                )
+                s.start()
+                _scorer = s
+    return _scorer
+
+
+def offer(endpoint: str, rows: Sequence[Any], results: Sequence[Dict[str, Any]]) -> None:
+    s = get_scorer()
+    if s is not None:
+        s.offer(endpoint, rows, results)
+
+
+def route(request_id: str) -> Any:
+    s = get_scorer()
+    return None if s is None else s.route(request_id)
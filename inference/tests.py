@@ -1,2 +1,1302 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
+import joblib
+import numpy as np
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import artifacts, audit, batching, bulk, cache, capture, drift, executor, fastpath, jobs, lean, metrics, preprocess, profiling, registry, services, shadow, sweep, threads, trees, validation, warmup
+from .models import PredictionLog
+
+
+def _random_rows(schema, categories, n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {}
+        for col, numeric in zip(schema.columns, schema.is_numeric):
+            if numeric:
+                row[col] = rng.choice([None, 0, 1, 2, rng.randint(0, 60), rng.uniform(-5, 400)])
+            else:
+                row[col] = rng.choice(categories[col] + ["__unseen__", None])
+        rows.append(schema.row(row))
+    return rows
+
+
+def _categories(model):
+    # fitted categories as the strings requests carry
+    return {c: [str(v) for v in cats] for c, cats in validation.fitted_categories(model).items()}
+
+
+class CompiledPipelineParityTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        raw = joblib.load(services.MODEL_PATH)
+        cls.pipeline = raw["pipeline"]
+        cls.schema = preprocess.compile_schema(raw)
+        cls.compiled = fastpath.compile_pipeline(cls.pipeline, cls.schema)
+        cls.categories = _categories(cls.pipeline)
+
+    def test_transform_matches_column_transformer(self):
+        rows = _random_rows(self.schema, self.categories, 300)
+        expected = self.pipeline.steps[0][1].transform(self.schema.frame(rows))
+        expected = expected.toarray() if hasattr(expected, "toarray") else expected
+        got = self.compiled.transform(rows)
+        np.testing.assert_allclose(np.nan_to_num(got, nan=0.0), expected, rtol=1e-12, atol=1e-12)
+
+    def test_predict_proba_matches_pipeline(self):
+        rows = _random_rows(self.schema, self.categories, 1000, seed=1)
+        expected = self.pipeline.predict_proba(self.schema.frame(rows))
+        np.testing.assert_allclose(self.compiled.predict_proba(rows), expected, rtol=0, atol=1e-7)
+
+    def test_single_row_matches_pipeline(self):
+        for row in _random_rows(self.schema, self.categories, 25, seed=2):
+            expected = self.pipeline.predict_proba(self.schema.frame([row]))
+            np.testing.assert_allclose(self.compiled.predict_proba([row]), expected, rtol=0, atol=1e-7)
+
+    def test_unsupported_pipeline_is_rejected(self):
+        with self.assertRaises(fastpath.UnsupportedPipeline):
+            fastpath.compile_pipeline(self.pipeline.steps[-1][1], self.schema)
+        with self.assertRaises(fastpath.UnsupportedPipeline):
+            fastpath.compile_pipeline(self.pipeline, None)
+
+
+class FeatureSchemaTests(SimpleTestCase):
+
+    def setUp(self):
+        self.schema = preprocess.FeatureSchema(["lead_time", "hotel", "adr"], num_cols=["lead_time", "adr"], cat_cols=["hotel"])
+
+    def test_rows_are_typed_per_column(self):
+        row = self.schema.row({"lead_time": "40", "hotel": "City Hotel", "adr": None})
+        self.assertEqual(row[:2], [40.0, "City Hotel"])
+        self.assertTrue(np.isnan(row[2]))
+        row = self.schema.row([1, 2, ""])
+        self.assertEqual(row[:2], [1.0, "2"])  # categories stay categories, as strings
+        self.assertTrue(np.isnan(row[2]))
+        self.assertTrue(np.isnan(self.schema.row({"hotel": None})[1]))
+
+    def test_bad_values_name_the_column(self):
+        with self.assertRaisesMessage(ValueError, "Column 'adr' expects a number, got 'abc'."):
+            self.schema.row({"adr": "abc"})
+        with self.assertRaisesMessage(ValueError, "Expected 3, got 2"):
+            self.schema.row([1, "x"])
+        with self.assertRaises(ValueError):
+            preprocess.FeatureSchema(["a", "b"], num_cols=["a"], cat_cols=[])
+
+    def test_frame_keeps_column_order_and_dtypes(self):
+        frame = self.schema.transform([{"lead_time": 1, "hotel": "A", "adr": 2.5}, {"hotel": "B"}])
+        self.assertEqual(list(frame.columns), ["lead_time", "hotel", "adr"])
+        self.assertEqual([str(frame[c].dtype) for c in frame.columns], ["float64", "object", "float64"])
+        self.assertEqual(frame["hotel"].tolist(), ["A", "B"])
+        self.assertIsNone(preprocess.compile_schema({"feature_columns": ["a"]}))
+        self.assertEqual(services.default_model().schema.columns, joblib.load(services.MODEL_PATH)["feature_columns"])
+
+
+class RowValidatorTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        raw = joblib.load(services.MODEL_PATH)
+        cls.schema = preprocess.compile_schema(raw)
+        cls.validator = validation.compile_validator(raw, raw["pipeline"], cls.schema, "reject")
+        cls.categories = validation.fitted_categories(raw["pipeline"])
+        cls.pipeline = raw["pipeline"]
+
+    def _valid_row(self, seed=0):
+        rng = random.Random(seed)
+        return {
+            c: (rng.choice([None, 0, 3, 12.5]) if numeric else rng.choice([str(v) for v in self.categories[c]]))
+            for c, numeric in zip(self.schema.columns, self.schema.is_numeric)
+        }
+
+    def test_valid_rows_match_schema_row(self):
+        for seed in range(50):
+            row = self._valid_row(seed)
+            nan_as_none = lambda r: [None if isinstance(v, float) and np.isnan(v) else v for v in r]
+            self.assertEqual(nan_as_none(self.validator.validate(row)), nan_as_none(self.schema.row(row)))
+
+    def test_collects_every_field_error(self):
+        row = self._valid_row()
+        del row["hotel"]
+        row["meal"] = "XX"
+        row["adr"] = "abc"
+        row["lead_time"] = [1]
+        with self.assertRaises(validation.ValidationFailed) as ctx:
+            self.validator.validate(row)
+        codes = {e["field"]: e["code"] for e in ctx.exception.errors}
+        self.assertEqual(codes, {"hotel": "required", "meal": "unknown_category", "adr": "not_a_number", "lead_time": "not_a_number"})
+
+    def test_list_length_and_ranges(self):
+        _, errors = self.validator.check([1, 2])
+        self.assertEqual(errors[0]["code"], "length")
+
+        ranged = validation.RowValidator(self.schema, self.categories, {"adr": (0.0, 1000.0)})
+        row = self._valid_row()
+        row["adr"] = -5
+        _, errors = ranged.check(row)
+        self.assertEqual([(e["field"], e["code"]) for e in errors], [("adr", "out_of_range")])
+
+    def test_unknown_categories_can_be_allowed(self):
+        lenient = validation.RowValidator(self.schema, self.categories, unknown_categories="allow")
+        row = self._valid_row()
+        row["country"] = "ZZZ"
+        self.assertEqual(lenient.validate(row)[self.schema.columns.index("country")], "ZZZ")
+
+    def test_auto_policy_follows_the_encoder(self):
+        row = self._valid_row()
+        row["country"] = "ZZZ"
+        auto = validation.compile_validator({}, self.pipeline, self.schema)
+        self.assertEqual(auto.validate(row)[self.schema.columns.index("country")], "ZZZ")
+
+        strict = validation.RowValidator(self.schema, self.categories, unknown_categories="auto", strict_columns=["country"])
+        with self.assertRaises(validation.ValidationFailed) as ctx:
+            strict.validate(row)
+        self.assertEqual([e["code"] for e in ctx.exception.errors], ["unknown_category"])
+
+    def test_validate_many_splits_valid_and_invalid(self):
+        rows = [self._valid_row(1), {"hotel": "City Hotel"}, self._valid_row(2)]
+        valid, idx, failed = self.validator.validate_many(rows)
+        self.assertEqual(idx, [0, 2])
+        self.assertEqual(len(valid), 2)
+        self.assertEqual(list(failed), [1])
+
+    def test_validate_columns_matches_validate_many(self):
+        rows = [self._valid_row(seed) for seed in range(20)]
+        rows[3]["country"] = "ZZZ"
+        rows[7][self.schema.num_names[0]] = "abc"
+        columns = {c: np.array([r[c] for r in rows], dtype=object) for c in self.schema.columns}
+        typed, idx, failed = self.validator.validate_columns(columns, len(rows))
+        valid, expected_idx, expected_failed = self.validator.validate_many(rows)
+        self.assertEqual(idx.tolist(), expected_idx)
+        self.assertEqual(failed, expected_failed)
+        for j, c in enumerate(self.schema.columns):
+            got = [None if isinstance(v, float) and np.isnan(v) else v for v in typed[c].tolist()]
+            want = [None if isinstance(r[j], float) and np.isnan(r[j]) else r[j] for r in valid]
+            self.assertEqual(got, want, c)
+
+
+class BenchmarkStatsTests(SimpleTestCase):
+
+    def test_percentiles_interpolate(self):
+        from benchmarks import stats
+
+        self.assertEqual(stats.percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertEqual(stats.percentile([5.0], 99), 5.0)
+        summary = stats.summarize_ms([i / 1000.0 for i in range(1, 101)])
+        self.assertEqual((summary["p50_ms"], summary["p99_ms"], summary["max_ms"], summary["mean_ms"]), (50.5, 99.01, 100.0, 50.5))
+
+    def test_compare_flags_regressions_in_the_right_direction(self):
+        from benchmarks import compare
+
+        base = {"results": {"predict": {"p99_ms": 10.0, "rows_per_s": 1000.0, "errors": 0, "n": 5}}}
+        cur = {"results": {"predict": {"p99_ms": 12.0, "rows_per_s": 950.0, "errors": 0, "n": 9}}}
+        rows = {metric: regressed for metric, _, _, _, regressed in compare.compare(base, cur, threshold=0.10)}
+        self.assertEqual(rows, {"predict.p99_ms": True, "predict.rows_per_s": False, "predict.errors": False})
+        rows = {metric: regressed for metric, _, _, _, regressed in compare.compare(cur, base, threshold=0.10)}
+        self.assertFalse(any(rows.values()))  # getting faster is never a regression
+
+
+class MetricsMergeTests(SimpleTestCase):
+
+    def worker(self, requests, latencies):
+        c = metrics.Counter("worker_requests_total", "Requests.")
+        h = metrics.Histogram("worker_stage_ms", "Stage time.", buckets=(1, 10))
+        c.inc(requests, endpoint="predict")
+        for ms in latencies:
+            h.observe(ms, stage="model_call")
+        return {"worker_requests_total": c.snapshot(), "worker_stage_ms": h.snapshot()}
+
+    def test_worker_snapshots_add_up(self):
+        merged = metrics.merge([self.worker(3, [0.5, 20]), self.worker(2, [5])])
+        self.assertEqual(merged["worker_requests_total"]["values"], [{"labels": {"endpoint": "predict"}, "value": 5}])
+        hist = merged["worker_stage_ms"]["values"][0]
+        self.assertEqual((hist["buckets"], hist["sum"], hist["count"]), ({"1": 1, "10": 1, "+Inf": 1}, 25.5, 3))
+        self.assertEqual(hist["mean"], 8.5)
+
+    def test_prometheus_text_is_cumulative(self):
+        text = metrics.render_prometheus(metrics.merge([self.worker(3, [0.5, 20]), self.worker(2, [5])]))
+        for line in (
+            "# TYPE mlapi_worker_requests_total counter",
+            'mlapi_worker_requests_total{endpoint="predict"} 5',
+            'mlapi_worker_stage_ms_bucket{stage="model_call",le="1"} 1',
+            'mlapi_worker_stage_ms_bucket{stage="model_call",le="10"} 2',
+            'mlapi_worker_stage_ms_bucket{stage="model_call",le="+Inf"} 3',
+            'mlapi_worker_stage_ms_sum{stage="model_call"} 25.5',
+            'mlapi_worker_stage_ms_count{stage="model_call"} 3',
+        ):
+            self.assertIn(line, text.splitlines())
+
+    def test_scrape_merges_every_pid_file(self):
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, "metrics-1.json"), "w") as f:
+            json.dump(self.worker(7, [2]), f)
+        with open(os.path.join(directory, "metrics-2.json.tmp"), "w") as f:
+            f.write("{torn")
+        with override_settings(INFERENCE_METRICS_DIR=directory):
+            res = self.client.get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('mlapi_worker_requests_total{endpoint="predict"} 7', res.content.decode().splitlines())
+        self.assertIn(f"metrics-{os.getpid()}.json", os.listdir(directory))
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def batcher(self, fn=None, **kwargs):
+        self.calls = []
+
+        def record(items):
+            self.calls.append(list(items))
+            return [x * 10 for x in items]
+
+        b = batching.MicroBatcher(fn or record, **kwargs)
+        self.addCleanup(b.close, 1)
+        return b
+
+    def test_flushes_when_full(self):
+        b = self.batcher(max_batch_size=3, max_wait_ms=10_000)
+        futures = [b.submit(i) for i in range(3)]
+        self.assertEqual([f.result(timeout=2) for f in futures], [0, 10, 20])
+        self.assertEqual(self.calls, [[0, 1, 2]])
+
+    def test_flushes_after_max_wait(self):
+        b = self.batcher(max_batch_size=100, max_wait_ms=20)
+        started = time.perf_counter()
+        futures = [b.submit(i) for i in range(2)]
+        self.assertEqual([f.result(timeout=2) for f in futures], [0, 10])
+        self.assertGreaterEqual(time.perf_counter() - started, 0.015)
+        self.assertEqual(self.calls, [[0, 1]])
+
+    def test_failures_reach_every_caller_in_the_batch(self):
+        def broken(items):
+            raise ValueError("bad batch")
+
+        b = self.batcher(broken, max_batch_size=2, max_wait_ms=10_000)
+        futures = [b.submit(i) for i in range(2)]
+        for f in futures:
+            with self.assertRaisesMessage(ValueError, "bad batch"):
+                f.result(timeout=2)
+        short = self.batcher(lambda items: items[:1], max_batch_size=2, max_wait_ms=10_000)
+        with self.assertRaises(RuntimeError):
+            [short.submit(i) for i in range(2)][1].result(timeout=2)
+
+    def test_close_flushes_what_is_queued(self):
+        b = self.batcher(max_batch_size=100, max_wait_ms=10_000)
+        future = b.submit(7)
+        b.close(2)
+        self.assertEqual(future.result(timeout=0), 70)
+        with self.assertRaises(RuntimeError):
+            b.submit(8)
+
+
+class PredictionCacheTests(SimpleTestCase):
+
+    def test_concurrent_misses_compute_once(self):
+        pc = cache.PredictionCache(cache.LocalBackend())
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(2)
+            return {"label": "1", "confidence": 0.5}
+
+        with ThreadPoolExecutor(5) as pool:
+            futures = [pool.submit(pc.get_or_compute, "k", compute) for _ in range(5)]
+            time.sleep(0.05)
+            release.set()
+            results = [f.result(timeout=2) for f in futures]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"label": "1", "confidence": 0.5}] * 5)
+        results[0]["label"] = "changed"  # callers get copies
+        self.assertEqual(pc.get_or_compute("k", compute)["label"], "1")
+
+    def test_failures_are_not_cached(self):
+        pc = cache.PredictionCache(cache.LocalBackend())
+        with self.assertRaises(ZeroDivisionError):
+            pc.get_or_compute("k", lambda: 1 / 0)
+        self.assertEqual(pc.get_or_compute("k", lambda: {"label": "0"}), {"label": "0"})
+
+    def test_key_changes_with_the_model(self):
+        row = [1.0, "City Hotel", float("nan")]
+        self.assertEqual(cache.feature_key(row, "a" * 64), cache.feature_key([1.0, "City Hotel", None], "a" * 64))
+        self.assertNotEqual(cache.feature_key(row, "a" * 64), cache.feature_key(row, "b" * 64))
+
+        scored = []
+
+        def score(x):
+            scored.append(x)
+            return {"label": "1"}
+
+        with override_settings(INFERENCE_CACHE_BACKEND="local"), mock.patch.object(cache, "_cache", None):
+            cache.predict(row, score, "a" * 64)
+            cache.predict(row, score, "a" * 64)
+            cache.predict(row, score, "b" * 64)  # a swapped model never sees the old entries
+        self.assertEqual(len(scored), 2)
+
+    def test_local_backend_lru_and_ttl(self):
+        backend = cache.LocalBackend(max_entries=2, ttl=60)
+        backend.set("a", {"v": 1})
+        backend.set("b", {"v": 2})
+        backend.get("a")
+        backend.set("c", {"v": 3})
+        self.assertEqual((backend.get("a"), backend.get("b"), len(backend)), ({"v": 1}, None, 2))
+        backend.ttl = -1
+        backend.set("d", {"v": 4})
+        self.assertIsNone(backend.get("d"))
+
+
+class ThreadBudgetTests(SimpleTestCase):
+
+    def test_split_and_parallel_slots(self):
+        b = threads.ThreadBudget(cpus=8, server_threads=8, parallel_min_rows=100)
+        self.assertEqual((b.batch_threads, b.parallel_slots), (4, 2))
+        with b.scope(1) as n:
+            self.assertEqual(n, 1)
+        with b.scope(500) as first, b.scope(500) as second, b.scope(500) as third:
+            self.assertEqual((first, second, third), (4, 4, 1))
+        with b.scope(500) as n:
+            self.assertEqual(n, 4)
+
+    def test_cgroup_quota_caps_cpus(self):
+        files = {"/sys/fs/cgroup/cpu.max": "150000 100000"}
+        with mock.patch.object(threads, "_read", files.get), \
+                mock.patch.object(threads.os, "sched_getaffinity", lambda pid: set(range(16)), create=True):
+            self.assertEqual(threads.cgroup_cpu_limit(), 1.5)
+            self.assertEqual(threads.detect_cpus()[0], 2)
+        files = {"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000"}
+        with mock.patch.object(threads, "_read", files.get):
+            self.assertIsNone(threads.cgroup_cpu_limit())
+
+
+class AuditWriterTests(TestCase):
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.writer = audit.AuditWriter(batch_rows=2, backoff_seconds=0, spill_dir=self.spill_dir)
+        self.handle = mock.Mock(metric_labels={"model": "default", "version": "abc"})
+
+    def _record(self, n=3):
+        rows = [{"lead_time": i, "hotel": "City Hotel"} for i in range(n)]
+        results = [{"index": i, "label": "1", "confidence": 0.9} for i in range(n - 1)]
+        results.append({"index": n - 1, "error": "bad_input", "detail": []})
+        self.writer.record("predict_batch", self.handle, rows, results, 12.5, "req-1")
+
+    def test_flush_bulk_inserts_queued_rows(self):
+        self._record()
+        self.assertEqual(PredictionLog.objects.count(), 0)
+        self.writer.flush()
+        logs = list(PredictionLog.objects.order_by("row_index"))
+        self.assertEqual([(r.row_index, r.label, r.error) for r in logs], [(0, "1", ""), (1, "1", ""), (2, None, "bad_input")])
+        self.assertEqual(logs[0].features, {"lead_time": 0, "hotel": "City Hotel"})
+        self.assertEqual((logs[0].model_version, logs[0].request_id, logs[0].latency_ms), ("abc", "req-1", 12.5))
+
+    def test_database_errors_spill_and_replay(self):
+        self._record()
+        with mock.patch.object(PredictionLog.objects, "bulk_create", side_effect=RuntimeError("db down")), \
+                self.assertLogs("inference.audit", "WARNING"):
+            self.writer.flush()
+        self.assertEqual(PredictionLog.objects.count(), 0)
+        self.assertEqual(len(os.listdir(self.spill_dir)), 1)
+
+        self._record()
+        self.writer.flush()
+        self.assertEqual(PredictionLog.objects.count(), 6)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_writer_and_sigterm_drain_only_start_when_asked(self):
+        # app loading (manage.py, tests, scripts) leaves SIGTERM alone and starts no writer
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+        self.assertIsNone(audit._writer)
+        with override_settings(INFERENCE_AUDIT_ENABLED=False):
+            audit.install_sigterm_drain()
+            self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+        with override_settings(INFERENCE_AUDIT_ENABLED=True):
+            try:
+                audit.install_sigterm_drain()
+                self.assertIsNot(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+            finally:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+class FlatForestParityTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        raw = joblib.load(services.MODEL_PATH)
+        cls.pipeline = raw["pipeline"]
+        cls.estimator = cls.pipeline.steps[-1][1]
+        cls.schema = preprocess.compile_schema(raw)
+        cls.forest = trees.from_xgboost(cls.estimator)
+        categories = _categories(cls.pipeline)
+        cls.rows = _random_rows(cls.schema, categories, 500, seed=7)
+        cls.X = fastpath.compile_pipeline(cls.pipeline, cls.schema).transform(cls.rows)
+
+    def test_predict_proba_is_bit_identical(self):
+        np.testing.assert_array_equal(self.forest.predict_proba(self.X), self.estimator.predict_proba(self.X))
+        for i in range(0, 500, 50):
+            np.testing.assert_array_equal(self.forest.predict_proba(self.X[i:i + 1]), self.estimator.predict_proba(self.X[i:i + 1]))
+
+    def test_leaves_match_xgboost(self):
+        import xgboost
+
+        expected = self.estimator.get_booster().predict(xgboost.DMatrix(self.X), pred_leaf=True)
+        np.testing.assert_array_equal(self.forest.leaves(self.X) - self.forest.roots, expected)
+
+    def test_pipeline_with_sparse_output(self):
+        frame = self.schema.frame(self.rows[:100])
+        forest_pipeline = trees.compile_forest(self.pipeline)
+        np.testing.assert_array_equal(forest_pipeline.predict_proba(frame), self.pipeline.predict_proba(frame))
+
+    def test_multiclass_softprob(self):
+        import xgboost
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 5)).astype(np.float32)
+        X[rng.random(X.shape) < 0.1] = np.nan
+        y = rng.integers(0, 3, size=300)
+        clf = xgboost.XGBClassifier(n_estimators=15, max_depth=4, n_jobs=1).fit(X, y)
+        np.testing.assert_array_equal(trees.from_xgboost(clf).predict_proba(X), clf.predict_proba(X))
+
+    def test_large_inputs_and_unsupported_models_fall_back(self):
+        routed = trees.from_xgboost(self.estimator, max_rows=4)
+        with mock.patch.object(routed, "margins", side_effect=AssertionError("flat path used")):
+            routed.predict_proba(self.X[:5])
+        with self.assertRaises(trees.UnsupportedModel):
+            trees.compile_forest(self.pipeline.steps[0][1])
+        with mock.patch.object(trees, "from_xgboost", side_effect=trees.UnsupportedModel("nope")):
+            handle = services.LoadedModel(services.MODEL_PATH, engine="flat")
+        self.assertEqual(handle.signature()["engine"], {"name": "native", "requested": "flat", "fallback_reason": "nope"})
+
+
+class ShadowScorerTests(SimpleTestCase):
+
+    def test_offer_drops_instead_of_waiting(self):
+        scorer = shadow.ShadowScorer([services.MODEL_PATH], queue_size=1)
+        scorer.offer("predict", [[1]], [{"label": "1", "confidence": 0.9}])
+        scorer.offer("predict", [[2]], [{"label": "1", "confidence": 0.9}])
+        self.assertEqual(scorer.describe()["queue_depth"], 1)
+
+    def test_score_records_agreement_and_delta(self):
+        handle = services.default_model()
+        categories = _categories(handle.model)
+        rows = _random_rows(handle.schema, categories, 40, seed=11)
+        primary = [dict(out) for out in handle.predict_batch(rows)]
+        scored = [i for i, out in enumerate(primary) if "error" not in out]
+        flipped = primary[scored[0]]
+        flipped.update(label="0" if flipped["label"] == "1" else "1", confidence=1.0 - flipped["confidence"])
+
+        scorer = shadow.ShadowScorer([services.MODEL_PATH], batch_rows=100)
+        scorer.offer("predict_batch", rows, primary)
+        scorer.score(scorer._take_batch(scorer._queue.get_nowait()))
+        stats = scorer.describe()["candidates"][0]
+        self.assertEqual(stats["rows"], len(scored))
+        self.assertAlmostEqual(stats["agreement_rate"], (len(scored) - 1) / len(scored), places=5)
+        self.assertLess(stats["mean_abs_score_delta"], 1e-6)
+
+    def test_route_is_sticky_and_weighted(self):
+        scorer = shadow.ShadowScorer(["churn:v2"], weights={"churn:v2": 0.3})
+        self.assertIsNone(scorer.route("req-1"))  # candidate not loaded yet
+        scorer.candidates[0].handle = arm = object()
+        picks = [scorer.route(f"req-{i}") is arm for i in range(4000)]
+        self.assertAlmostEqual(sum(picks) / len(picks), 0.3, delta=0.03)
+        self.assertEqual([scorer.route(f"req-{i}") is arm for i in range(50)], picks[:50])
+        with self.assertRaises(ValueError):
+            shadow.ShadowScorer(["churn:v2"], weights={"other": 0.1})
+
+
+class DriftMonitorTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handle = services.default_model()
+        cls.schema = handle.schema
+        categories = _categories(handle.model)
+        cls.train = _random_rows(cls.schema, categories, 2000, seed=3)
+        columns = {c: [r[i] for r in cls.train] for i, c in enumerate(cls.schema.columns)}
+        raw = {**handle.raw, "drift_reference": drift.profile(columns, cls.schema)}
+        cls.reference = drift.load_reference(raw, handle.model, cls.schema, handle.path)
+        cls.categories = categories
+
+    def _monitor(self, rows, **kwargs):
+        m = drift.DriftMonitor("test", self.schema, self.reference, **kwargs)
+        m.update(rows, None, len(rows))
+        return m
+
+    def test_same_distribution_does_not_drift(self):
+        live = _random_rows(self.schema, self.categories, 2000, seed=4)
+        report = self._monitor(live).report([self._monitor(live).state()])
+        self.assertLess(report["recent"]["columns"]["lead_time"]["psi"], 0.05)
+        self.assertEqual(report["reference"], "bundle")
+
+    def test_shifted_column_and_new_categories_drift(self):
+        pos = self.schema.columns.index("lead_time"), self.schema.columns.index("country")
+        live = _random_rows(self.schema, self.categories, 2000, seed=5)
+        for r in live[:600]:
+            r[pos[0]] = 900.0
+            r[pos[1]] = "ATLANTIS"
+        m = self._monitor(live)
+        columns = m.report([m.state()])["recent"]["columns"]
+        self.assertGreater(columns["lead_time"]["psi"], 0.2)
+        self.assertAlmostEqual(columns["country"]["unseen_rate"], 0.3, delta=0.05)
+        self.assertEqual(columns["country"]["top_unseen"][0][0], "ATLANTIS")
+
+    def test_worker_states_merge_like_one_stream(self):
+        live = _random_rows(self.schema, self.categories, 900, seed=6)
+        whole = self._monitor(live)
+        parts = [self._monitor(live[:300]).state(), self._monitor(live[300:]).state()]
+        self.assertEqual(whole.report([whole.state()])["lifetime"], whole.report(parts)["lifetime"])
+
+    def test_unseen_values_stay_bounded(self):
+        sketch = drift.CategoricalSketch(["PRT"], top_k=3)
+        sketch.update(["NEW"] * 400 + [f"X{i}" for i in range(1000)])
+        self.assertLessEqual(len(sketch.top), 3)
+        self.assertIn("NEW", sketch.top)
+        self.assertEqual(sketch.unseen, 1400)
+
+
+class CaptureTests(SimpleTestCase):
+
+    def test_middleware_writes_redacted_replayable_records(self):
+        directory = tempfile.mkdtemp()
+        writer = capture.CaptureWriter(directory, redact=["adr"])
+        writer.start()
+        respond = lambda request: HttpResponse(b'{"label":"1","confidence":0.9}', content_type="application/json")
+        with mock.patch.object(capture, "_writer", writer), override_settings(INFERENCE_CAPTURE_RATE=1.0):
+            middleware = capture.CaptureMiddleware(respond)
+            for features in ({"hotel": "City Hotel", "adr": 99.5}, ["City Hotel"] + [0] * 26):
+                request = RequestFactory().post("/api/v1/predict/", json.dumps({"features": features}),
+                                                content_type="application/json", HTTP_X_REQUEST_ID="req-7")
+                middleware(request)
+            middleware(RequestFactory().get("/api/v1/predict/"))
+        writer.close()
+
+        records = list(capture.read_capture([directory]))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["body"], {"features": {"hotel": "City Hotel", "adr": None}})
+        self.assertIsNone(records[1]["body"]["features"][services.default_model().schema.columns.index("adr")])
+        self.assertEqual((records[0]["request_id"], records[0]["status"]), ("req-7", 200))
+        self.assertEqual(records[0]["response"], {"label": "1", "confidence": 0.9})
+        self.assertEqual(json.loads(capture.request_body(records[0])), records[0]["body"])
+
+    def test_stream_bodies_are_redacted_and_binary_ones_skipped(self):
+        directory = tempfile.mkdtemp()
+        writer = capture.CaptureWriter(directory, redact=["adr"])
+        writer.start()
+        respond = lambda request: HttpResponse(b"", content_type="application/x-ndjson")
+        lines = [{"hotel": "City Hotel", "adr": 99.5}, {"hotel": "Resort Hotel", "adr": 120.0}]
+        with mock.patch.object(capture, "_writer", writer), override_settings(INFERENCE_CAPTURE_RATE=1.0):
+            middleware = capture.CaptureMiddleware(respond)
+            middleware(RequestFactory().post("/api/v1/predict/stream/", "\n".join(map(json.dumps, lines)) + "\n\n",
+                                             content_type="application/x-ndjson"))
+            middleware(RequestFactory().post("/api/v1/predict/batch/", b"ARROW1 adr=99.5",
+                                             content_type="application/vnd.apache.arrow.stream"))
+        writer.close()
+
+        records = list(capture.read_capture([directory]))
+        self.assertEqual(len(records), 1)  # the binary body could not be redacted
+        self.assertEqual([r["adr"] for r in records[0]["body_lines"]], [None, None])
+        self.assertNotIn(b"99.5", capture.request_body(records[0]))
+        self.assertEqual([json.loads(line)["hotel"] for line in capture.request_body(records[0]).splitlines()],
+                         ["City Hotel", "Resort Hotel"])
+        unredacted = capture.CaptureWriter(directory).record({
+            "ts": 0, "method": "POST", "path": "/api/v1/predict/batch/", "query": "", "request_id": "",
+            "content_type": "application/x-npy", "body": b"\x93NUMPY", "status": 200, "latency_ms": 1.0,
+            "response_type": "application/json", "response": b"{}",
+        })
+        self.assertEqual(capture.request_body(unredacted), b"\x93NUMPY")
+
+    def test_off_unless_sampling(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            capture.CaptureMiddleware(lambda request: None)
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.factory = RequestFactory()
+
+    def middleware(self, sleep_ms=0, **overrides):
+        hist = metrics.histogram("inference_stage_ms")
+
+        def view(request):
+            with hist.time(stage="model_call"):
+                time.sleep(sleep_ms / 1000.0)
+            return HttpResponse("ok")
+
+        conf = {"INFERENCE_PROFILE_SAMPLE_RATE": 0, "INFERENCE_PROFILE_TOKEN": "", "INFERENCE_PROFILE_SLOW_MS": 0,
+                "INFERENCE_PROFILE_DIR": self.dir, **overrides}
+        with override_settings(**conf):
+            return profiling.ProfilingMiddleware(view)
+
+    def sidecars(self):
+        return sorted(n for n in os.listdir(self.dir) if n.endswith(".json"))
+
+    def test_off_unless_configured(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware()
+
+    def test_header_token_writes_cprofile_and_stages(self):
+        mw = self.middleware(INFERENCE_PROFILE_TOKEN="s3cret", INFERENCE_PROFILE_MAX_FILES=1)
+        self.assertNotIn("X-Profile-Id", mw(self.factory.post("/api/v1/predict/", HTTP_X_INFERENCE_PROFILE="wrong")))
+        self.assertNotIn("X-Profile-Id", mw(self.factory.get("/api/v1/health/", HTTP_X_INFERENCE_PROFILE="s3cret")))
+        self.assertEqual(self.sidecars(), [])
+
+        for _ in range(2):
+            time.sleep(0.002)  # profile ids sort by their millisecond timestamp
+            res = mw(self.factory.post("/api/v1/predict/", HTTP_X_INFERENCE_PROFILE="s3cret"))
+        self.assertEqual(self.sidecars(), [res["X-Profile-Id"] + ".json"])  # rotated down to max_files
+        with open(os.path.join(self.dir, res["X-Profile-Id"] + ".json")) as f:
+            meta = json.load(f)
+        self.assertEqual((meta["reason"], meta["kind"], meta["status"]), ("header", "cprofile", 200))
+        self.assertIn("inference_stage_ms.model_call", meta["stages_ms"])
+        self.assertTrue(os.path.exists(os.path.join(self.dir, res["X-Profile-Id"] + ".prof")))
+
+    def test_only_slow_requests_keep_their_stacks(self):
+        fast = self.middleware(sleep_ms=0, INFERENCE_PROFILE_SLOW_MS=200, INFERENCE_PROFILE_INTERVAL_MS=1)
+        self.assertNotIn("X-Profile-Id", fast(self.factory.post("/api/v1/predict/")))
+        slow = self.middleware(sleep_ms=60, INFERENCE_PROFILE_SLOW_MS=20, INFERENCE_PROFILE_INTERVAL_MS=1)
+        res = slow(self.factory.post("/api/v1/predict/"))
+        with open(os.path.join(self.dir, res["X-Profile-Id"] + ".stacks")) as f:
+            self.assertIn("tests.py:view", f.read())
+
+        out = io.StringIO()
+        call_command("profile_report", dir=self.dir, stdout=out)
+        self.assertIn("tests.py:view", out.getvalue())
+
+
+class ScoreFileCommandTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        columns = services.default_model().schema.columns
+        self.rows = []
+        for i in range(10):
+            row = dict.fromkeys(columns, "")
+            row.update(hotel="City Hotel", lead_time=i * 30, adr=50 + i, country="NA" if i == 3 else "PRT")
+            self.rows.append(row)
+        self.rows[5]["adr"] = "abc"
+        self.src = os.path.join(self.dir, "rows.csv")
+        with open(self.src, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=columns)
+            w.writeheader()
+            w.writerows(self.rows)
+        self.expected = services.predict_batch([{k: (None if v == "" else v) for k, v in r.items()} for r in self.rows])
+
+    def results(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def check(self, out):
+        self.assertEqual([r["index"] for r in out], list(range(10)))
+        self.assertEqual(out[5]["error"], "bad_input")
+        for got, want in zip(out, self.expected):
+            self.assertEqual(got.get("label"), want.get("label"))
+            if "confidence" in want:
+                self.assertAlmostEqual(got["confidence"], want["confidence"], places=6)
+
+    def test_parallel_output_is_in_input_order(self):
+        dst = os.path.join(self.dir, "out.jsonl")
+        call_command("score_file", self.src, dst, workers=2, chunk_rows=3, stdout=io.StringIO(), stderr=io.StringIO())
+        self.check(self.results(dst))
+        self.assertFalse(os.path.exists(dst + ".checkpoint.json"))
+
+    def test_resume_continues_after_the_last_checkpoint(self):
+        from inference.management.commands import score_file
+
+        dst = os.path.join(self.dir, "out.jsonl")
+        real, calls = bulk.score_chunk, []
+
+        def crash_on_third(rows):
+            calls.append(len(rows))
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return real(rows)
+
+        opts = dict(workers=1, chunk_rows=3, stdout=io.StringIO(), stderr=io.StringIO())
+        with mock.patch.object(score_file, "init_worker"), mock.patch.object(score_file, "score_chunk", crash_on_third):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("score_file", self.src, dst, **opts)
+        self.assertEqual(len(self.results(dst)), 6)
+
+        with mock.patch.object(score_file, "init_worker"), mock.patch.object(score_file, "score_chunk", wraps=real) as scored:
+            call_command("score_file", self.src, dst, resume=True, **opts)
+        self.assertEqual(scored.call_count, 2)  # only the chunks after the checkpoint
+        self.check(self.results(dst))
+
+        with self.assertRaisesMessage(CommandError, "Cannot infer format"):
+            call_command("score_file", os.path.join(self.dir, "rows.txt"), dst, **opts)
+
+
+class JobQueueTests(SimpleTestCase):
+
+    def setUp(self):
+        self.queue = jobs.JobQueue(tempfile.mkdtemp(), chunk_rows=2)
+        columns = services.default_model().schema.columns
+        self.lines = [json.dumps(dict.fromkeys(columns)) for _ in range(4)] + ["{bad"]
+        self.start = mock.patch.object(jobs.JobQueue, "start").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def submit(self, **kwargs):
+        return self.queue.submit(SimpleUploadedFile("rows.jsonl", "\n".join(self.lines).encode()), **kwargs)
+
+    def test_resumes_from_checkpoint(self):
+        job = self.submit()
+        self.assertEqual(self.queue.jobs()[0]["status"], "queued")
+        # a worker killed after the first chunk: checkpoint written, then a torn line
+        with open(self.queue.results_path(job), "wb") as f:
+            f.write(b'{"index":0}\n{"index":1}\n{"ind')
+        job.update(status="running", chunks_done=1, rows_done=2, output_bytes=24)
+        self.queue.save(job)
+
+        done = self.queue.execute(job["id"])
+        self.assertEqual((done["status"], done["rows_done"], done["total_rows"], done["attempts"]), ("done", 5, 5, 1))
+        with open(self.queue.results_path(done)) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r["index"] for r in rows], list(range(5)))
+        self.assertEqual(rows[4]["error"], "bad_input")
+        self.assertEqual(jobs.public(done)["progress"], 1.0)
+
+    def test_cancel_and_limits(self):
+        job = self.submit(output="csv")
+        self.assertEqual(self.queue.cancel(job["id"])["status"], "cancelled")
+        self.assertTrue(self.queue.cancel(job["id"])["deleted"])
+        self.assertIsNone(self.queue.get(job["id"]))
+        self.assertIsNone(self.queue.get("../etc"))
+        with self.assertRaises(ValueError):
+            self.submit(output="xml")
+        self.queue.max_queued = 1
+        self.submit()
+        with self.assertRaises(OverflowError):
+            self.submit()
+
+    def run_inline(self):
+        # dispatch() with the spawned process replaced by a call to work() in this process
+        dead_pid = 2 ** 22 + 1
+
+        class Process:
+            def __init__(self, target, name, daemon, args):
+                self.target, self.args, self.pid = target, args, dead_pid
+
+            def start(self):
+                with mock.patch.dict(os.environ), mock.patch.object(jobs.bulk, "init_worker"):
+                    self.target(*self.args)
+
+        context = mock.Mock(Process=Process)
+        os.makedirs(self.queue.slots_dir, exist_ok=True)  # start() is patched out
+        with mock.patch.object(jobs.multiprocessing, "get_context", return_value=context):
+            return self.queue.dispatch()
+
+    def test_http_submit_dispatch_and_download(self):
+        self.queue.nice = 0
+        client = self.client
+        with override_settings(INFERENCE_JOBS_ENABLED=True, INFERENCE_JOBS_MAX_UPLOAD_MB=1), \
+                mock.patch.object(jobs, "get_queue", return_value=self.queue):
+            upload = SimpleUploadedFile("rows.jsonl", "\n".join(self.lines).encode())
+            res = client.post("/api/v1/jobs/", {"file": upload, "output": "jsonl"})
+            self.assertEqual(res.status_code, 202, res.content)
+            job_id = res.json()["id"]
+            self.assertEqual(client.get(f"/api/v1/jobs/{job_id}/results/").status_code, 409)
+
+            self.assertTrue(self.run_inline())
+            self.assertFalse(self.run_inline())  # nothing left to start
+            status = client.get(f"/api/v1/jobs/{job_id}/").json()
+            self.assertEqual((status["status"], status["rows_done"], status["progress"]), ("done", 5, 1.0))
+            res = client.get(f"/api/v1/jobs/{job_id}/results/")
+            rows = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+            self.assertEqual([r["index"] for r in rows], list(range(5)))
+            self.assertEqual(rows[4]["error"], "bad_input")
+            expected = services.predict_batch([json.loads(line) for line in self.lines[:4]])
+            self.assertEqual([{k: v for k, v in r.items() if k != "index"} for r in rows[:4]], expected)
+
+            self.assertTrue(client.delete(f"/api/v1/jobs/{job_id}/").json()["deleted"])
+            self.assertEqual(client.get(f"/api/v1/jobs/{job_id}/").status_code, 404)
+
+            for fmt in ("xlsx", "a/b"):  # rejected up front, not left to fail in the worker
+                upload = SimpleUploadedFile("rows.jsonl", "\n".join(self.lines).encode())
+                res = client.post("/api/v1/jobs/", {"file": upload, "format": fmt})
+                self.assertEqual((res.status_code, res.json()["error"]), (400, "bad_input"), fmt)
+            upload = SimpleUploadedFile("rows.txt", "\n".join(self.lines).encode())
+            res = client.post("/api/v1/jobs/", {"file": upload, "format": "NDJSON"})  # alias, any case
+            self.assertEqual(res.status_code, 202, res.content)
+            client.delete(f"/api/v1/jobs/{res.json()['id']}/")  # cancel, then delete
+            client.delete(f"/api/v1/jobs/{res.json()['id']}/")
+
+            big = SimpleUploadedFile("big.jsonl", b"{}\n" * (2 ** 19))
+            self.assertEqual(client.post("/api/v1/jobs/", {"file": big}).status_code, 413)
+            self.assertEqual(os.listdir(self.queue.directory), [".slots"])
+
+        with override_settings(INFERENCE_JOBS_ENABLED=False):
+            self.assertEqual(client.get("/api/v1/jobs/").status_code, 404)
+
+    def test_upload_limit_is_checked_while_copying(self):
+        self.queue.max_upload_bytes = 10
+        upload = SimpleUploadedFile("rows.jsonl", "\n".join(self.lines).encode())
+        with self.assertRaises(jobs.UploadTooLarge):
+            self.queue.submit(upload)
+        upload.size = None  # a size the queue cannot trust
+        with self.assertRaises(jobs.UploadTooLarge):
+            self.queue.submit(upload)
+        self.assertEqual(os.listdir(self.queue.directory), [])
+
+    def test_orphaned_running_job_is_dispatched_again(self):
+        self.queue.nice = 0
+        job = self.submit()
+        job.update(status="running", attempts=1)
+        self.queue.save(job)
+        owner = os.path.join(self.queue.job_dir(job["id"]), "owner")
+        jobs.hand_over(owner, 2 ** 22 + 1)  # the worker that held it is gone
+
+        self.assertTrue(self.run_inline())
+        done = self.queue.get(job["id"])
+        self.assertEqual((done["status"], done["attempts"], done["rows_done"]), ("done", 2, 5))
+
+        # a live owner keeps the job to itself
+        job = self.submit()
+        owner = os.path.join(self.queue.job_dir(job["id"]), "owner")
+        self.assertTrue(jobs.claim(owner))
+        self.assertFalse(self.run_inline())
+        self.assertEqual(self.queue.get(job["id"])["status"], "queued")
+        jobs.release(owner)
+
+    def test_stale_locks_are_taken_over(self):
+        slot = os.path.join(self.queue.directory, "slot-0")
+        self.assertTrue(jobs.claim(slot))
+        self.assertFalse(jobs.claim(slot))
+        jobs.hand_over(slot, 2 ** 22 + 1)  # no such pid
+        self.assertTrue(jobs.claim(slot))
+        jobs.release(slot)
+        self.assertFalse(os.path.exists(slot))
+
+
+class SweepTests(SimpleTestCase):
+
+    def setUp(self):
+        self.handle = services.default_model()
+        self.base = dict.fromkeys(self.handle.schema.columns)
+        self.base.update(hotel="City Hotel", lead_time=40, adr=90.0)
+
+    def test_grid_matches_row_by_row_scoring(self):
+        axes = [{"feature": "adr", "min": 50, "max": 300, "steps": 4}, {"feature": "deposit_type"}]
+        out = sweep.run(self.handle, self.base, axes, chunk_rows=5)
+        deposits = out["axes"][1]["values"]
+        self.assertEqual(out["points"], 4 * len(deposits))
+        self.assertEqual(out["axes"][0]["values"], [50.0, 50 + 250 / 3, 50 + 500 / 3, 300.0])
+
+        rows = [{**self.base, "adr": a, "deposit_type": d} for a in out["axes"][0]["values"] for d in deposits]
+        expected = self.handle.predict_batch(rows)
+        got = [(y, c) for ys, cs in zip(out["label"], out["confidence"]) for y, c in zip(ys, cs)]
+        for (y, c), e in zip(got, expected):
+            self.assertEqual(y, e["label"])
+            self.assertAlmostEqual(c, e["confidence"], places=5)
+        self.assertEqual(sorted(out["proba"]), ["0", "1"])
+        self.assertEqual(out["base"]["label"], self.handle.predict_batch([self.base])[0]["label"])
+
+    def test_openapi_schema_covers_every_view(self):
+        # --fail-on-warn turns "unable to guess serializer" and operationId collisions into errors
+        path = os.path.join(tempfile.mkdtemp(), "schema.yml")
+        call_command("spectacular", "--fail-on-warn", "--validate", "--file", path)
+        with open(path) as f:
+            schema = f.read()
+        for operation in ("v1_predict_sweep_create", "v1_jobs_list", "v1_drift_retrieve", "v1_shadow_retrieve"):
+            self.assertIn(f"operationId: {operation}", schema)
+
+    def test_rejects_bad_values_and_large_grids(self):
+        with self.assertRaises(validation.ValidationFailed) as ctx:
+            sweep.run(self.handle, self.base, [{"feature": "adr", "values": [10, "abc"]}])
+        self.assertEqual([e["value"] for e in ctx.exception.errors], ["abc"])
+        with self.assertRaisesMessage(ValueError, "Sweep too large"):
+            sweep.run(self.handle, self.base, [{"feature": "adr", "min": 0, "max": 1, "steps": 50},
+                                               {"feature": "lead_time", "min": 0, "max": 1, "steps": 50}], max_points=100)
+
+
+class PredictApiTests(TestCase):
+
+    def setUp(self):
+        self.row = dict.fromkeys(services.default_model().schema.columns)
+        self.row.update(hotel="City Hotel", lead_time=40, adr=90.0, country="PRT")
+
+    def post(self, path, body):
+        return self.client.post(path, json.dumps(body), content_type="application/json")
+
+    def test_unknown_category_is_scored_like_the_encoder_does(self):
+        known = self.post("/api/v1/predict/", {"features": self.row})
+        unseen = self.post("/api/v1/predict/", {"features": {**self.row, "country": "ZZZ"}})
+        self.assertEqual((known.status_code, unseen.status_code), (200, 200))
+        self.assertIn("label", unseen.json())
+        bad = self.post("/api/v1/predict/", {"features": {**self.row, "adr": "abc"}})
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(bad.json()["detail"][0]["code"], "not_a_number")
+
+    def test_batch_scores_valid_rows_in_one_model_call(self):
+        rows = [self.row, {**self.row, "adr": "abc"}, {**self.row, "lead_time": 300}]
+        with mock.patch.object(services, "_score", wraps=services._score) as score:
+            res = self.post("/api/v1/predict/batch/", {"rows": rows})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(len(score.call_args.args[1]), 2)
+        results = res.json()["results"]
+        self.assertEqual([(r["index"], r.get("error")) for r in results], [(0, None), (1, "bad_input"), (2, None)])
+        for k in (0, 2):
+            single = self.post("/api/v1/predict/", {"features": rows[k]}).json()
+            self.assertEqual(results[k]["label"], single["label"])
+            self.assertAlmostEqual(results[k]["confidence"], single["confidence"], places=6)
+        self.assertEqual(self.post("/api/v1/predict/batch/", {"rows": []}).status_code, 400)
+
+    def test_columnar_formats_without_optional_packages_are_415(self):
+        with mock.patch.dict(sys.modules, {"pyarrow": None, "pyarrow.ipc": None, "msgpack": None}):
+            for content_type in ("application/vnd.apache.arrow.stream", "application/msgpack"):
+                res = self.client.post("/api/v1/predict/batch/", b"\x00", content_type=content_type)
+                self.assertEqual((res.status_code, res.json()["error"]), (415, "unsupported_format"))
+                self.assertIn("requirements-optional.txt", res.json()["detail"])
+
+    def columnar_case(self):
+        handle = services.default_model()
+        rows = _random_rows(handle.schema, _categories(handle.model), 25, seed=11)
+        rows = [[None if isinstance(v, float) and v != v else v for v in r] for r in rows]  # NaN is not JSON
+        res = self.post("/api/v1/predict/batch/", {"rows": rows})
+        self.assertEqual(res.status_code, 200, res.content)
+        expected = [(None if r.get("label") is None else str(r["label"]), r.get("error")) for r in res.json()["results"]]
+        columns = {c: [r[i] for r in rows] for i, c in enumerate(handle.schema.columns)}
+        return columns, expected
+
+    def test_arrow_ipc_round_trip_matches_json_batch(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        columns, expected = self.columnar_case()
+        table = pa.table(columns)
+        for content_type, new in (("application/vnd.apache.arrow.stream", pa.ipc.new_stream),
+                                  ("application/vnd.apache.arrow.file", pa.ipc.new_file)):
+            sink = pa.BufferOutputStream()
+            with new(sink, table.schema) as writer:
+                writer.write_table(table)
+            res = self.client.post("/api/v1/predict/batch/", sink.getvalue().to_pybytes(), content_type=content_type)
+            self.assertEqual(res.status_code, 200, (content_type, res.content))
+            out = pa.ipc.open_stream(res.content).read_all().to_pydict()
+            self.assertEqual(list(zip(out["label"], out["error"])), expected, content_type)
+
+    def test_msgpack_round_trip_matches_json_batch(self):
+        try:
+            import msgpack
+        except ImportError:
+            self.skipTest("msgpack is not installed")
+        columns, expected = self.columnar_case()
+        body = msgpack.packb({"columns": columns}, use_bin_type=True)
+        for content_type in ("application/msgpack", "application/x-msgpack"):
+            res = self.client.post("/api/v1/predict/batch/", body, content_type=content_type)
+            self.assertEqual(res.status_code, 200, (content_type, res.content))
+            out = msgpack.unpackb(res.content, raw=False)
+            labels = [None if v is None else str(v) for v in out["label"]]
+            self.assertEqual(list(zip(labels, out["error"])), expected, content_type)
+
+    def test_drift_is_opt_in(self):
+        self.assertEqual(self.client.get("/api/v1/drift/").json()["error"], "drift_disabled")
+
+    def test_unseen_country_shows_up_in_drift_report(self):
+        with override_settings(INFERENCE_DRIFT_ENABLED=True):
+            handle = services.LoadedModel(services.MODEL_PATH)
+        self.addCleanup(drift.forget, handle.drift)
+        for target in ("inference.views.default_model", "inference.services.default_model"):
+            patcher = mock.patch(target, return_value=handle)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for _ in range(5):
+            self.assertEqual(self.post("/api/v1/predict/", {"features": {**self.row, "country": "ATLANTIS"}}).status_code, 200)
+        deadline = time.monotonic() + 5
+        while True:
+            country = self.client.get("/api/v1/drift/").json()["lifetime"]["columns"]["country"]
+            if dict(country["top_unseen"]).get("ATLANTIS", 0) >= 5 or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)  # the monitor thread applies offers asynchronously
+        self.assertGreaterEqual(dict(country["top_unseen"]).get("ATLANTIS", 0), 5)
+        self.assertGreater(country["unseen_rate"], 0)
+
+    def stream(self, lines):
+        res = self.client.post("/api/v1/predict/stream/", "\n".join(lines), content_type="application/x-ndjson")
+        self.assertEqual(res.status_code, 200)
+        return [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+
+    @override_settings(INFERENCE_STREAM_CHUNK_ROWS=2)
+    def test_stream_keeps_input_order(self):
+        row = json.dumps(self.row)
+        out = self.stream([row, row, "", row, "{bad", json.dumps({**self.row, "adr": "abc"}), row])
+        self.assertEqual([r["index"] for r in out], list(range(6)))
+        self.assertEqual([r.get("error") for r in out], [None, None, None, "bad_input", "bad_input", None])
+        self.assertIn("Invalid JSON", out[3]["detail"])
+        self.assertEqual({k: out[0][k] for k in ("label", "confidence")}, self.post("/api/v1/predict/", {"features": self.row}).json())
+
+        # a chunk whose scoring raises still answers every row in it, and later chunks go on
+        real = services.LoadedModel.predict_batch
+        calls = []
+
+        def flaky(handle, rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return real(handle, rows)
+
+        with mock.patch.object(services.LoadedModel, "predict_batch", flaky):
+            out = self.stream([row, "{bad", row, row])
+        self.assertEqual([(r["index"], r.get("error")) for r in out],
+                         [(0, "inference_failed"), (1, "bad_input"), (2, None), (3, None)])
+        self.assertEqual(out[0]["detail"], "boom")
+
+
+class BoundedExecutorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = executor.BoundedExecutor(workers=1, queue_size=1)
+        self.release = threading.Event()
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(self.release.set)
+
+    def test_rejects_past_capacity_and_frees_slots(self):
+        running = self.pool.submit(self.release.wait, 5)
+        queued = self.pool.submit(lambda: "queued")
+        with self.assertRaises(executor.Overloaded):
+            self.pool.submit(lambda: "rejected")
+        self.release.set()
+        self.assertEqual(queued.result(timeout=2)[1], "queued")
+        running.result(timeout=2)
+        time.sleep(0.01)  # done callbacks release the slots
+        self.assertEqual(self.pool.submit(lambda: "again").result(timeout=2)[1], "again")
+
+    def test_expired_requests_are_not_run(self):
+        self.pool.submit(self.release.wait, 5)
+        ran = []
+        with self.assertRaises(executor.DeadlineExceeded):
+            asyncio.run(self.pool.run(ran.append, 1, deadline=time.time() + 0.05))
+        self.release.set()
+        time.sleep(0.05)
+        self.assertEqual(ran, [])  # cancelled while queued, never scored late
+        self.assertEqual(asyncio.run(self.pool.run(lambda: 42, deadline=time.time() + 5)), 42)
+
+    def test_http_statuses(self):
+        row = dict.fromkeys(services.default_model().schema.columns)
+        with mock.patch.object(executor, "_executor", self.pool):
+            res = self.client.post("/api/v1/predict/async/", {"features": row}, content_type="application/json")
+            self.assertEqual(res.status_code, 200, res.content)
+            self.assertIn("label", res.json())
+
+            res = self.client.post("/api/v1/predict/async/", {"features": row}, content_type="application/json",
+                                   headers={"X-Request-Timeout-Ms": "0"})
+            self.assertEqual((res.status_code, res.json()["error"]), (503, "deadline_exceeded"))
+
+            self.pool.submit(self.release.wait, 5)
+            self.pool.submit(self.release.wait, 5)
+            with override_settings(INFERENCE_ASYNC_REJECT_STATUS=429, INFERENCE_ASYNC_RETRY_AFTER=3):
+                res = self.client.post("/api/v1/predict/async/", {"features": row}, content_type="application/json")
+            self.assertEqual((res.status_code, res.json()["error"], res["Retry-After"]), (429, "overloaded", "3"))
+
+
+    def test_process_pool_survives_invalid_rows(self):
+        pool = executor.BoundedExecutor(workers=1, queue_size=2, kind="process")
+        self.addCleanup(pool.shutdown)
+        row = dict.fromkeys(services.default_model().schema.columns)
+        with self.assertRaises(validation.ValidationFailed) as ctx:
+            asyncio.run(pool.run(executor.predict_payload, {**row, "adr": "abc"}, deadline=time.time() + 30))
+        self.assertEqual([e["code"] for e in ctx.exception.errors], ["not_a_number"])
+        self.assertIn("adr:", str(ctx.exception))
+        out = asyncio.run(pool.run(executor.predict_payload, row, deadline=time.time() + 30))
+        self.assertEqual(out["label"], services.default_model().predict_batch([row])[0]["label"])
+
+        with mock.patch.object(executor, "_executor", self.pool):
+            res = self.client.post("/api/v1/predict/async/", {"features": {**row, "adr": "abc"}}, content_type="application/json")
+        self.assertEqual((res.status_code, res.json()["error"]), (400, "invalid_request"))
+        self.assertEqual(res.json()["detail"][0]["field"], "adr")
+
+
+class MmapLayoutTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.raw = joblib.load(services.MODEL_PATH)
+
+    def setUp(self):
+        self.dir = os.path.join(tempfile.mkdtemp(), "v1")
+        self.manifest = artifacts.export_mmap(self.raw, self.dir)
+
+    def test_layout_scores_like_the_joblib_file(self):
+        handle = services.LoadedModel(self.dir)
+        row = dict.fromkeys(handle.schema.columns)
+        row.update(hotel="City Hotel", lead_time=40, adr=90.0)
+        self.assertEqual(handle.predict_batch([row]), services.default_model().predict_batch([row]))
+        self.assertEqual(handle.fingerprint, artifacts.layout_fingerprint(self.dir))
+        self.assertEqual(sorted(self.manifest["sha256"]), [artifacts.BOOSTER_FILE, artifacts.BUNDLE_FILE])
+
+    def test_changed_files_are_refused(self):
+        before = artifacts.layout_fingerprint(self.dir)
+        with open(os.path.join(self.dir, artifacts.BOOSTER_FILE), "r+b") as f:
+            f.seek(100)
+            byte = f.read(1)
+            f.seek(100)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        with self.assertRaisesMessage(ValueError, "Checksum mismatch for booster.ubj"):
+            artifacts.load_mmap(self.dir)
+        with self.assertRaises(ValueError):
+            artifacts.layout_fingerprint(self.dir)
+
+        artifacts.export_mmap(self.raw, self.dir)
+        self.assertEqual(artifacts.layout_fingerprint(self.dir), before)
+        os.remove(os.path.join(self.dir, artifacts.BUNDLE_FILE))
+        with self.assertRaisesMessage(ValueError, "missing bundle.joblib"):
+            artifacts.load_mmap(self.dir)
+
+
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name, version in (("hotel", "v1"), ("other", "v1")):
+            self.add(name, version)
+
+    def add(self, name, version):
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        os.symlink(services.MODEL_PATH, os.path.join(self.root, name, f"{version}.joblib"))
+
+    def serving(self, reg, name):
+        return next(m for m in reg.describe() if m["name"] == name)
+
+    def test_new_version_is_swapped_in(self):
+        reg = registry.ModelRegistry(self.root, memory_budget_bytes=2 ** 40, warmup_rows=1)
+        old = reg.get("hotel")
+        self.assertEqual(old.version, "v1")
+        self.add("hotel", "v10")
+        self.add("hotel", "v2")
+        reg.scan()
+        deadline = time.monotonic() + 10
+        while self.serving(reg, "hotel")["serving"] != "v10" and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(reg.get("hotel").version, "v10")  # natural version order, not string order
+        self.assertEqual(reg.get("hotel", "v1"), old)  # pinned versions and in-flight handles keep working
+        self.assertEqual(self.serving(reg, "other")["serving"], None)  # only models in use are upgraded
+        with self.assertRaises(KeyError):
+            reg.get("missing")
+        with self.assertRaises(KeyError):
+            reg.get("hotel", "v99")
+
+    def test_least_recently_used_model_is_evicted(self):
+        size = services.artifact_size(services.MODEL_PATH)
+        reg = registry.ModelRegistry(self.root, memory_budget_bytes=size, warmup_rows=1)
+        hotel = reg.get("hotel")
+        reg.get("other")
+        self.assertEqual((self.serving(reg, "hotel")["loaded"], self.serving(reg, "other")["loaded"]), ([], ["v1"]))
+        self.assertIsNone(self.serving(reg, "hotel")["serving"])
+        self.assertIsNot(reg.get("hotel"), hotel)  # loaded again on demand
+        self.assertEqual(self.serving(reg, "other")["loaded"], [])
+
+    @override_settings(INFERENCE_DRIFT_ENABLED=True)
+    def test_warmup_skips_drift_and_eviction_forgets_the_monitor(self):
+        reg = registry.ModelRegistry(self.root, memory_budget_bytes=services.artifact_size(services.MODEL_PATH), warmup_rows=4)
+        with mock.patch.object(drift, "_enqueue") as enqueue:
+            hotel = reg.get("hotel")
+            other = reg.get("other")  # evicts hotel
+        enqueue.assert_not_called()
+        self.addCleanup(drift.forget, other.drift)
+        self.assertIsNotNone(hotel.drift)
+        self.assertNotIn(hotel.drift.key, drift._monitors)
+        self.assertIs(drift._monitors[other.drift.key], other.drift)
+
+    def test_http_predict_by_name(self):
+        reg = registry.ModelRegistry(self.root, memory_budget_bytes=2 ** 40, warmup_rows=1)
+        row = dict.fromkeys(services.default_model().schema.columns)
+        with override_settings(INFERENCE_REGISTRY_DIR=self.root), mock.patch.object(registry, "_registry", reg):
+            res = self.client.post("/api/v1/models/hotel/versions/v1/predict/", {"features": row}, content_type="application/json")
+            self.assertEqual(res.status_code, 200, res.content)
+            self.assertEqual(res.json()["label"], self.client.post("/api/v1/predict/", {"features": row}, content_type="application/json").json()["label"])
+            self.assertEqual(self.client.post("/api/v1/models/nope/predict/", {"features": row}, content_type="application/json").status_code, 404)
+            self.assertEqual([m["name"] for m in self.client.get("/api/v1/models/").json()["models"]], ["hotel", "other"])
+
+
+@override_settings(INFERENCE_PRELOAD=True)
+class WarmupHealthTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(warmup._state, {"state": "idle", "timings_ms": {}, "error": None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_health_is_503_until_the_model_is_warm(self):
+        res = self.client.get("/api/v1/health/")
+        self.assertEqual((res.status_code, res.json()["ready"], res.json()["status"]), (503, False, "idle"))
+
+        warmup.run(rows=2, rounds=2)
+        res = self.client.get("/api/v1/health/")
+        self.assertEqual((res.status_code, res.json()["ready"]), (200, True))
+        timings = warmup.state()["timings_ms"]
+        self.assertIn("import:xgboost", timings)
+        self.assertIn("warmup:1", timings)
+        self.assertGreater(timings["total"], 0)
+
+        with override_settings(INFERENCE_PRELOAD=False), mock.patch.dict(warmup._state, {"state": "loading"}):
+            self.assertEqual(self.client.get("/api/v1/health/").status_code, 200)  # nothing to wait for
+
+    def test_failed_load_stays_unhealthy(self):
+        with mock.patch.object(services, "default_model", side_effect=FileNotFoundError("model.joblib")), \
+                self.assertLogs("inference.warmup", "ERROR"), self.assertRaises(FileNotFoundError):
+            warmup.run(rows=1, rounds=1)
+        res = self.client.get("/api/v1/health/")
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["startup"]["error"], "FileNotFoundError: model.joblib")
+
+    def test_warmup_rows_can_be_scored(self):
+        handle = services.default_model()
+        rows = warmup.warmup_rows(3, handle)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(handle.predict_many(rows)), 3)
+
+
+class LeanMountTests(TestCase):
+
+    def call(self, app, path, body, host="testserver"):
+        environ = {
+            "REQUEST_METHOD": "POST", "PATH_INFO": path, "SCRIPT_NAME": "", "QUERY_STRING": "",
+            "SERVER_NAME": host, "SERVER_PORT": "80", "HTTP_HOST": host,
+            "CONTENT_TYPE": "application/json", "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body), "wsgi.url_scheme": "http", "wsgi.errors": sys.stderr,
+        }
+        status = []
+        out = b"".join(app(environ, lambda s, h, exc_info=None: status.append(s)))
+        return int(status[0].split()[0]), out
+
+    def test_matches_full_stack_and_checks_host(self):
+        from django.core.wsgi import get_wsgi_application
+
+        full = get_wsgi_application()
+        app = lean.LeanHandler(fallback=full)
+        row = dict.fromkeys(services.default_model().schema.columns)
+        row.update(hotel="City Hotel", lead_time=40, adr=90.0)
+        for path, body in (("/api/v1/predict/", {"features": row}),
+                           ("/api/v1/predict/", {"features": {**row, "adr": "abc"}}),
+                           ("/api/v1/predict/batch/", {"rows": [row, {"hotel": "City Hotel"}]})):
+            encoded = json.dumps(body).encode()
+            got, want = self.call(app, path, encoded), self.call(full, path, encoded)
+            self.assertEqual((got[0], json.loads(got[1])), (want[0], json.loads(want[1])), path)
+
+        self.assertEqual(self.call(app, "/api/v1/predict/", b"{}", host="evil.example")[0], 400)
+        self.assertEqual(self.call(app, "/api/v1/health/", b"")[0], 405)  # GET-only view, served by the fallback
@@ -0,0 +1,203 @@
+"""
+Thread budget shared by the server's request threads and the model's own pools.
+
+The usable CPU count comes from the scheduler affinity mask capped by the cgroup
+CPU quota (v2 cpu.max or v1 cfs_quota_us). Model calls run single-threaded by
+default, so concurrent requests do not oversubscribe the cores. Large batches
+(>= INFERENCE_PARALLEL_MIN_ROWS rows) get ``batch_threads`` OpenMP threads while
+one of ``parallel_slots`` is free. Limits go through threadpoolctl (OpenMP limits
+are per calling thread in libgomp/libomp) and through the estimator's
+n_jobs/nthread at load time.
+"""
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CPUS = int(os.getenv("INFERENCE_CPUS", "0"))  # 0: detect
+SERVER_THREADS = int(os.getenv("INFERENCE_SERVER_THREADS", "4"))  # waitress --threads, see Procfile
+MODEL_THREADS = int(os.getenv("INFERENCE_MODEL_THREADS", "0"))  # 0: half the CPUs
+PARALLEL_MIN_ROWS = int(os.getenv("INFERENCE_PARALLEL_MIN_ROWS", "256"))
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="ascii") as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the cgroup quota, or None when there is no quota."""
+    v2 = _read("/sys/fs/cgroup/cpu.max")
+    if v2:
+        quota, _, period = v2.partition(" ")
+        if quota != "max" and period:
+            try:
+                return int(quota) / int(period)
+            except ValueError:
+                pass
+        return None
+    for base in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        quota, period = _read(base + "/cpu.cfs_quota_us"), _read(base + "/cpu.cfs_period_us")
+        if quota and period:
+            try:
+                if int(quota) > 0 and int(period) > 0:
+                    return int(quota) / int(period)
+            except ValueError:
+                pass
+    return None
+
+
+def detect_cpus() -> Tuple[int, Dict[str, Any]]:
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        affinity = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    cpus = affinity if quota is None else min(affinity, max(int(math.ceil(quota)), 1))
+    return cpus, {"cpu_count": os.cpu_count(), "affinity": affinity, "cgroup_quota": quota}
+
+
+class ThreadBudget:
+
+    def __init__(self, cpus: int, server_threads: int, model_threads: int = 0,
+                 parallel_min_rows: int = PARALLEL_MIN_ROWS, detected: Optional[Dict[str, Any]] = None):
+        self.cpus = max(int(cpus), 1)
+        self.server_threads = max(int(server_threads), 1)
+        self.batch_threads = min(max(int(model_threads) or self.cpus // 2, 1), self.cpus)
+        self.parallel_slots = max(self.cpus // self.batch_threads, 1)
+        self.parallel_min_rows = max(int(parallel_min_rows), 1)
+        self.detected = detected or {}
+        self._slots = threading.BoundedSemaphore(self.parallel_slots)
+        self._local = threading.local()
+        self._openmp: List[Any] = []
+        self._blas_limited = False
+        self._lock = threading.Lock()
+
+    def threads_for(self, n_rows: int) -> int:
+        return self.batch_threads if n_rows >= self.parallel_min_rows else 1
+
+    @contextmanager
+    def scope(self, n_rows: int) -> Iterator[int]:
+        """Sets this thread's OpenMP limit for one model call on n_rows rows."""
+        acquired = False
+        n = 1
+        if self.threads_for(n_rows) > 1 and self._slots.acquire(blocking=False):
+            acquired, n = True, self.batch_threads
+        self._set(n)
+        try:
+            yield n
+        finally:
+            if acquired:
+                self._set(1)
+                self._slots.release()
+
+    def _set(self, n: int) -> None:
+        if getattr(self._local, "threads", None) == n:
+            return
+        for controller in self._openmp:
+            controller.set_num_threads(n)
+        self._local.threads = n
+
+    def _refresh_controllers(self) -> None:
+        try:
+            from threadpoolctl import ThreadpoolController
+        except ImportError:
+            return
+        controller = ThreadpoolController()
+        with self._lock:
+            # the model's OpenMP runtime is only loaded with its library, so look again after each load
+            self._openmp = list(controller.select(user_api="openmp").lib_controllers)
+            if not self._blas_limited:
+                # BLAS pools are process-wide; nothing on the request path needs more than one thread
+                controller.select(user_api="blas").limit(limits=1)
+                self._blas_limited = True
+        self._local = threading.local()
+
+    def configure(self, model: Any) -> Dict[str, Any]:
+        """
+        Caps the estimator's own thread parameters at load time and returns what was
+        applied. XGBoost keeps nthread = batch_threads as its ceiling (the per-call
+        OpenMP limit picks 1 or batch_threads); joblib-based n_jobs is set to 1.
+        """
+        applied: Dict[str, Any] = {}
+        for name, est in _estimators(model):
+            if hasattr(est, "get_booster"):
+                try:
+                    est.set_params(n_jobs=self.batch_threads)
+                    est.get_booster().set_param({"nthread": self.batch_threads})
+                except Exception as e:  # unfitted or foreign booster
+                    logger.warning("Could not set nthread on %s: %s", name, e)
+                    continue
+                applied[name] = {"nthread": self.batch_threads}
+            elif "n_jobs" in getattr(est, "get_params", dict)():
+                est.set_params(n_jobs=1)
+                applied[name] = {"n_jobs": 1}
+        self._refresh_controllers()
+        return applied
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "cpus": self.cpus,
+            "detected": self.detected,
+            "server_threads": self.server_threads,
+            "single_row_threads": 1,
+            "batch_threads": self.batch_threads,
+            "parallel_slots": self.parallel_slots,
+            "parallel_min_rows": self.parallel_min_rows,
+            # worst case: every request thread in a model call, parallel slots all taken
+            "max_model_threads": self.server_threads - min(self.parallel_slots, self.server_threads)
+            + min(self.parallel_slots, self.server_threads) * self.batch_threads,
+            "openmp_libraries": [c.filepath for c in self._openmp],
+            "threadpoolctl": bool(self._openmp) or _has_threadpoolctl(),
+        }
+
+
+def _has_threadpoolctl() -> bool:
+    try:
+        import threadpoolctl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _estimators(model: Any) -> Iterator[Tuple[str, Any]]:
+    steps = getattr(model, "steps", None)
+    if steps:
+        for name, step in steps:
+            yield from ((f"{name}.{n}" if n else name, e) for n, e in _estimators(step))
+        return
+    yield "", model
+
+
+_budget: Optional[ThreadBudget] = None
+_budget_lock = threading.Lock()
+
+
+def budget() -> ThreadBudget:
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                detected_cpus, detected = detect_cpus()
+                _budget = ThreadBudget(CPUS or detected_cpus, SERVER_THREADS, MODEL_THREADS, PARALLEL_MIN_ROWS, detected)
+    return _budget
+
+
+def set_budget(b: ThreadBudget) -> None:
+    """Replaces the process budget; call before the first model load."""
+    global _budget
+    _budget = b
+
+
+def for_processes(workers: int) -> ThreadBudget:
+    """Budget for one of ``workers`` single-threaded scoring processes sharing the CPUs."""
+    detected_cpus, detected = detect_cpus()
+    share = max((CPUS or detected_cpus) // max(int(workers), 1), 1)
+    return ThreadBudget(share, 1, share, parallel_min_rows=PARALLEL_MIN_ROWS, detected=detected)
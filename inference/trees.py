@@ -0,0 +1,254 @@
+"""
+Flat-array tree ensemble engine.
+
+At load time the booster's trees are exported into flat NumPy arrays (feature index,
+threshold, left/right child, default direction, leaf value) with one root offset per
+tree. Prediction walks every tree for every row at once: ``depth`` rounds of
+gathers over an (n_rows, n_trees) node matrix, with leaves pointing at themselves so
+rows that stop early stay put. Arithmetic follows XGBoost's CPU predictor (float32
+features and thresholds, ``x < threshold`` goes left, missing takes the default
+branch, leaf values added to the base margin in tree order, expf-rounded sigmoid),
+so results match predict_proba to the last bit.
+
+The walk beats XGBoost's per-call setup for a handful of rows but not its native
+loops on larger batches, so inputs over ``max_rows`` go to the original estimator.
+
+Only XGBoost gbtree classifiers with numerical splits are exported; anything else
+raises UnsupportedModel and the caller keeps the original estimator.
+"""
+import json
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+
+class UnsupportedModel(Exception):
+    pass
+
+
+class FlatForest:
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, roots: np.ndarray, groups: np.ndarray,
+                 depth: int, base_margin: np.ndarray, n_features: int, classes: Optional[np.ndarray] = None,
+                 native: Any = None, max_rows: Optional[int] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # children[2 * node + went_right]: one gather per level instead of a where() over two
+        self.children = np.empty(2 * len(left), dtype=np.intp)
+        self.children[0::2] = left
+        self.children[1::2] = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.groups = groups
+        self.depth = depth
+        self.base_margin = base_margin
+        self.n_groups = len(base_margin)
+        self.n_features_in_ = n_features
+        self.classes_ = classes
+        self.native = native
+        self.max_rows = max_rows
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def describe(self) -> dict:
+        return {"trees": self.n_trees, "nodes": self.n_nodes, "depth": self.depth, "groups": self.n_groups,
+                "max_rows": self.max_rows if self.native is not None else None}
+
+    def leaves(self, X: Any) -> np.ndarray:
+        """Leaf node index reached in every tree, shape (n_rows, n_trees)."""
+        x = _dense_float32(X, self.n_features_in_)
+        n = len(x)
+        flat = x.ravel()
+        row_start = (np.arange(n, dtype=np.intp) * x.shape[1])[:, None]
+        node = np.repeat(self.roots[None, :], n, axis=0)
+        for _ in range(self.depth):
+            v = flat[row_start + self.feature[node]]
+            # NaN fails the comparison, so it goes right unless the node's default is left
+            went_right = ~(v < self.threshold[node])
+            went_right &= ~(np.isnan(v) & self.default_left[node])
+            node = self.children[2 * node + went_right]
+        return node
+
+    def margins(self, X: Any) -> np.ndarray:
+        """Raw margins, shape (n_rows, n_groups), float32."""
+        leaf_values = self.value[self.leaves(X)]
+        n = len(leaf_values)
+        out = np.empty((n, self.n_groups), dtype=np.float32)
+        for g in range(self.n_groups):
+            cols = leaf_values if self.n_groups == 1 else leaf_values[:, self.groups == g]
+            # cumsum adds left to right like the predictor's per-tree accumulation;
+            # a plain sum would use pairwise float32 addition and drift in the last bits
+            acc = np.empty((n, cols.shape[1] + 1), dtype=np.float32)
+            acc[:, 0] = self.base_margin[g]
+            acc[:, 1:] = cols
+            out[:, g] = np.cumsum(acc, axis=1, dtype=np.float32)[:, -1]
+        return out
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        if self.native is not None and X.shape[0] > self.max_rows:
+            return self.native.predict_proba(X)
+        m = self.margins(X)
+        if self.n_groups == 1:
+            # XGBoost's Sigmoid(): 1 / (expf(min(-x, 88.7)) + 1 + 1e-16)
+            e = _expf(np.minimum(-m[:, 0], np.float32(88.7)))
+            p = np.float32(1.0) / (e + np.float32(1.0) + np.float32(1e-16))
+            return np.vstack((np.float32(1.0) - p, p)).T
+        # Softmax(): expf(x - max), divided by their left-to-right sum kept in double and cast to float
+        e = _expf(m - m.max(axis=1, keepdims=True))
+        return e / np.cumsum(e, axis=1, dtype=np.float64)[:, -1:].astype(np.float32)
+
+    def predict(self, X: Any) -> np.ndarray:
+        idx = self.predict_proba(X).argmax(axis=1)
+        return self.classes_[idx] if self.classes_ is not None else idx
+
+
+class ForestPipeline:
+    """The fitted preprocessing steps of a sklearn Pipeline followed by a FlatForest."""
+
+    def __init__(self, pre_steps: Sequence[Any], forest: FlatForest):
+        self.steps = list(pre_steps) + [("forest", forest)]
+        self.forest = forest
+        self.classes_ = forest.classes_
+
+    def _transform(self, X: Any) -> Any:
+        for _, step in self.steps[:-1]:
+            X = step.transform(X)
+        return X
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self.forest.predict_proba(self._transform(X))
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.forest.predict(self._transform(X))
+
+
+def _expf(x: np.ndarray) -> np.ndarray:
+    # NumPy's float32 exp can be an ulp off libm's expf; double precision rounded back is exact here
+    return np.exp(x.astype(np.float64)).astype(np.float32)
+
+
+def _dense_float32(X: Any, n_features: int) -> np.ndarray:
+    if hasattr(X, "tocsr"):
+        # entries a sparse matrix does not store are missing for XGBoost, not 0.0
+        X = X.tocsr()
+        out = np.full(X.shape, np.nan, dtype=np.float32)
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        out[rows, X.indices] = X.data
+    else:
+        out = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    if out.ndim != 2 or out.shape[1] != n_features:
+        raise ValueError(f"Expected {n_features} features, got shape {out.shape}.")
+    return out
+
+
+def _tree_depth(left: List[int], right: List[int]) -> int:
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier if left[n] != -1 for c in (left[n], right[n])]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def from_xgboost(estimator: Any, max_rows: Optional[int] = None) -> FlatForest:
+    if not hasattr(estimator, "get_booster"):
+        raise UnsupportedModel(f"{type(estimator).__name__} is not an XGBoost estimator.")
+    try:
+        model = json.loads(estimator.get_booster().save_raw("json"))
+    except Exception as e:
+        raise UnsupportedModel(f"Could not export the booster: {e}") from e
+
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("binary:logistic", "multi:softprob"):
+        raise UnsupportedModel(f"Objective {objective} is not supported.")
+    booster = learner["gradient_booster"]
+    if booster["name"] != "gbtree":
+        raise UnsupportedModel(f"Booster {booster['name']} is not supported (gbtree only).")
+    if learner.get("feature_types") and any(t == "c" for t in learner["feature_types"]):
+        raise UnsupportedModel("Categorical features are not supported.")
+
+    params = learner["learner_model_param"]
+    n_features = int(params["num_feature"])
+    n_groups = max(int(params["num_class"]), 1)
+    base_score = float(params["base_score"])
+    if n_groups == 1:
+        base = np.array([np.log(base_score / (1.0 - base_score))], dtype=np.float32)
+    else:
+        base = np.full(n_groups, base_score, dtype=np.float32)
+
+    gbtree = booster["model"]
+    trees, tree_info = gbtree["trees"], gbtree["tree_info"]
+    best = getattr(estimator, "best_iteration", None)
+    if best is not None:
+        # same trees predict_proba uses after early stopping
+        end = int(gbtree["iteration_indptr"][best + 1])
+        trees, tree_info = trees[:end], tree_info[:end]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise UnsupportedModel("Categorical splits are not supported.")
+        lc, rc = tree["left_children"], tree["right_children"]
+        n = len(lc)
+        for i in range(n):
+            if lc[i] == -1:
+                # leaf: both children point back at the node, the value is in split_conditions
+                feature.append(0)
+                threshold.append(0.0)
+                left.append(offset + i)
+                right.append(offset + i)
+                default_left.append(True)
+                value.append(tree["split_conditions"][i])
+            else:
+                feature.append(tree["split_indices"][i])
+                threshold.append(tree["split_conditions"][i])
+                left.append(offset + lc[i])
+                right.append(offset + rc[i])
+                default_left.append(bool(tree["default_left"][i]))
+                value.append(0.0)
+        roots.append(offset)
+        depth = max(depth, _tree_depth(lc, rc))
+        offset += n
+
+    classes = getattr(estimator, "classes_", None)
+    return FlatForest(
+        feature=np.asarray(feature, dtype=np.intp),
+        threshold=np.asarray(threshold, dtype=np.float32),
+        left=np.asarray(left, dtype=np.intp),
+        right=np.asarray(right, dtype=np.intp),
+        default_left=np.asarray(default_left, dtype=bool),
+        value=np.asarray(value, dtype=np.float32),
+        roots=np.asarray(roots, dtype=np.intp),
+        groups=np.asarray(tree_info, dtype=np.intp),
+        depth=depth,
+        base_margin=base,
+        n_features=n_features,
+        classes=None if classes is None else np.asarray(classes),
+        native=estimator if max_rows is not None else None,
+        max_rows=max_rows,
+    )
+
+
+def compile_forest(model: Any, max_rows: Optional[int] = None) -> Any:
+    """
+    FlatForest for an XGBoost estimator, or a ForestPipeline for a Pipeline ending in
+    one; with max_rows set, larger inputs are scored by the original estimator.
+    Raises UnsupportedModel for everything else.
+    """
+    steps = getattr(model, "steps", None)
+    if steps:
+        return ForestPipeline(steps[:-1], from_xgboost(steps[-1][1], max_rows))
+    return from_xgboost(model, max_rows)
@@ -1,8 +1,37 @@
 ﻿from django.urls import path
-from .views import HealthView, PredictView, ModelInfoView
+from .views import (
+    HealthView,
+    PredictView,
+    PredictBatchView,
+    PredictSweepView,
+    ModelInfoView,
+    MetricsView,
+    ModelListView,
+    RegistryPredictView,
+    ShadowView,
+    DriftView,
+    JobListView,
+    JobDetailView,
+    JobResultsView,
+    predict_async,
+    predict_stream,
+)
 
 urlpatterns = [
     path("health/", HealthView.as_view(), name="health"),
     path("model-info/", ModelInfoView.as_view(), name="model_info"),  # جديد
     path("predict/", PredictView.as_view(), name="predict"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("predict/async/", predict_async, name="predict_async"),
+    path("predict/stream/", predict_stream, name="predict_stream"),
+    path("predict/batch/", PredictBatchView.as_view(), name="predict_batch"),
+    path("predict/sweep/", PredictSweepView.as_view(), name="predict_sweep"),
+    path("models/", ModelListView.as_view(), name="model_list"),
+    path("shadow/", ShadowView.as_view(), name="shadow"),
+    path("drift/", DriftView.as_view(), name="drift"),
+    path("jobs/", JobListView.as_view(), name="job_list"),
+    path("jobs/<str:job_id>/", JobDetailView.as_view(), name="job_detail"),
+    path("jobs/<str:job_id>/results/", JobResultsView.as_view(), name="job_results"),
+    path("models/<str:name>/predict/", RegistryPredictView.as_view(), name="registry_predict"),
+    path("models/<str:name>/versions/<str:version>/predict/", RegistryPredictView.as_view(), name="registry_predict_version"),
 ]
@@ -0,0 +1,308 @@
+import math
+from typing import Any, Collection, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .preprocess import FeatureSchema
+
+_MISSING = object()
+
+# auto: reject only where the fitted OneHotEncoder would (handle_unknown="error")
+UNKNOWN_CATEGORY_POLICIES = ("auto", "reject", "allow")
+
+
+class ValidationFailed(ValueError):
+    """Raised with one {"field", "code", "detail"} entry per problem found in a row."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        # errors is the only arg, so the exception survives pickling back from a process pool
+        self.errors = errors
+        super().__init__(errors)
+
+    def __str__(self) -> str:
+        return "; ".join(f"{e['field']}: {e['detail']}" for e in self.errors)
+
+
+def _error(field: str, code: str, detail: str, **extra: Any) -> Dict[str, Any]:
+    return {"field": field, "code": code, "detail": detail, **extra}
+
+
+class RowValidator:
+    """
+    Request validator compiled once per loaded model. A single pass over a row checks
+    presence, type, numeric range and categorical domain for every column and builds
+    the same typed row as FeatureSchema.row, so a valid row needs no second conversion.
+    Missing values (None, "") are accepted and left to the pipeline's imputers.
+    Unknown categories are rejected per ``unknown_categories``; with "auto" only in
+    ``strict_columns`` (the columns whose encoder cannot handle them).
+    """
+
+    def __init__(self, schema: FeatureSchema, categories: Optional[Dict[str, Sequence[Any]]] = None,
+                 ranges: Optional[Dict[str, Tuple[float, float]]] = None, unknown_categories: str = "reject",
+                 strict_columns: Optional[Collection[str]] = None):
+        if unknown_categories not in UNKNOWN_CATEGORY_POLICIES:
+            raise ValueError(f"unknown_categories must be one of {UNKNOWN_CATEGORY_POLICIES}, got {unknown_categories!r}")
+        self.schema = schema
+        self.columns = schema.columns
+        categories = categories or {}
+        ranges = ranges or {}
+        strict_columns = set(strict_columns or ())
+        self.known: Dict[str, List[str]] = {
+            name: sorted(str(c) for c in cats if not _is_nan(c)) for name, cats in categories.items() if cats is not None
+        }
+        # (name, numeric, lo, hi, domain) per column, in column order
+        self._plan: List[Tuple[str, bool, float, float, Optional[frozenset]]] = []
+        for name, numeric in zip(schema.columns, schema.is_numeric):
+            lo, hi = ranges.get(name, (-math.inf, math.inf))
+            strict = unknown_categories == "reject" or (unknown_categories == "auto" and name in strict_columns)
+            domain = None
+            if not numeric and strict and name in self.known:
+                domain = frozenset(self.known[name])
+            self._plan.append((name, numeric, float(lo), float(hi), domain))
+
+    def describe(self) -> List[Dict[str, Any]]:
+        out = []
+        for name, numeric, lo, hi, domain in self._plan:
+            if numeric:
+                out.append({"name": name, "type": "number", "min": _finite_or_none(lo), "max": _finite_or_none(hi)})
+            else:
+                out.append({"name": name, "type": "category", "values": self.known.get(name),
+                            "unknown": "reject" if domain is not None else "allow"})
+        return out
+
+    def check(self, x: Any) -> Tuple[Optional[List[Any]], List[Dict[str, Any]]]:
+        """Returns (typed row, []) for a valid row, or (None, errors)."""
+        if isinstance(x, dict):
+            get = x.get
+            values = [get(name, _MISSING) for name in self.columns]
+        elif isinstance(x, list):
+            if len(x) != len(self.columns):
+                return None, [_error("features", "length", f"Expected {len(self.columns)} features in list, got {len(x)}.")]
+            values = x
+        else:
+            return None, [_error("features", "invalid_type", "features must be either a JSON object (dict) or an array (list).")]
+
+        row: List[Any] = []
+        errors: List[Dict[str, Any]] = []
+        for (name, numeric, lo, hi, domain), v in zip(self._plan, values):
+            if v is _MISSING:
+                errors.append(_error(name, "required", "This feature is required."))
+                continue
+            if v is None or v == "":
+                row.append(math.nan)
+                continue
+            if numeric:
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    f = float(v)
+                elif isinstance(v, str):
+                    try:
+                        f = float(v)
+                    except ValueError:
+                        errors.append(_error(name, "not_a_number", f"Expected a number, got {v!r}."))
+                        continue
+                else:
+                    errors.append(_error(name, "not_a_number", f"Expected a number, got {type(v).__name__}."))
+                    continue
+                if math.isnan(f):
+                    row.append(f)
+                    continue
+                if not (lo <= f <= hi):
+                    errors.append(_error(name, "out_of_range", f"{f!r} is outside [{lo}, {hi}].", min=_finite_or_none(lo), max=_finite_or_none(hi)))
+                    continue
+                row.append(f)
+            else:
+                if isinstance(v, float) and math.isnan(v):
+                    row.append(v)
+                    continue
+                if isinstance(v, (dict, list)):
+                    errors.append(_error(name, "invalid_type", f"Expected a category, got {type(v).__name__}."))
+                    continue
+                s = v if isinstance(v, str) else str(v)
+                if domain is not None and s not in domain:
+                    errors.append(_error(name, "unknown_category", f"{s!r} is not a category the model was trained on."))
+                    continue
+                row.append(s)
+        if errors:
+            return None, errors
+        return row, errors
+
+    def validate(self, x: Any) -> List[Any]:
+        row, errors = self.check(x)
+        if errors:
+            raise ValidationFailed(errors)
+        return row
+
+    def validate_many(self, xs: Sequence[Any]) -> Tuple[List[List[Any]], List[int], Dict[int, List[Dict[str, Any]]]]:
+        """Returns (valid typed rows, their indexes, {index: errors} for the invalid ones)."""
+        rows: List[List[Any]] = []
+        idx: List[int] = []
+        failed: Dict[int, List[Dict[str, Any]]] = {}
+        check = self.check
+        for i, x in enumerate(xs):
+            row, errors = check(x)
+            if errors:
+                failed[i] = errors
+            else:
+                rows.append(row)
+                idx.append(i)
+        return rows, idx, failed
+
+
+    def validate_columns(self, columns: Mapping[str, Any], n: int) -> Tuple[Dict[str, np.ndarray], np.ndarray, Dict[int, List[Dict[str, Any]]]]:
+        """
+        Columnar counterpart of validate_many for decoded Arrow/NumPy/msgpack batches.
+        Returns (typed columns for the valid rows, their indexes, {index: errors}).
+        Numeric columns come back as float64 arrays (unchanged if they already are);
+        a missing column fails the whole request.
+        """
+        missing = [name for name in self.columns if name not in columns]
+        if missing:
+            raise ValidationFailed([_error(name, "required", "This column is required.") for name in missing])
+
+        import pandas as pd
+
+        typed: Dict[str, np.ndarray] = {}
+        failed: Dict[int, List[Dict[str, Any]]] = {}
+
+        for name, numeric, lo, hi, domain in self._plan:
+            col = columns[name]
+            if len(col) != n:
+                raise ValidationFailed([_error(name, "length", f"Expected {n} values, got {len(col)}.")])
+            if numeric:
+                arr = np.asarray(col)
+                if arr.dtype.kind in "fiu":
+                    values = arr.astype(np.float64, copy=False)
+                else:
+                    values = np.full(n, np.nan)
+                    for i, v in enumerate(arr.tolist()):
+                        if v is None or v == "":
+                            continue
+                        try:
+                            if isinstance(v, (bool, dict, list)):
+                                raise TypeError
+                            values[i] = float(v)
+                        except (TypeError, ValueError):
+                            failed.setdefault(i, []).append(_error(name, "not_a_number", f"Expected a number, got {v!r}."))
+                if math.isfinite(lo) or math.isfinite(hi):
+                    with np.errstate(invalid="ignore"):
+                        bad = np.flatnonzero(~np.isnan(values) & ~((values >= lo) & (values <= hi)))
+                    for i in bad.tolist():
+                        failed.setdefault(i, []).append(_error(
+                            name, "out_of_range", f"{values[i]!r} is outside [{lo}, {hi}].",
+                            min=_finite_or_none(lo), max=_finite_or_none(hi),
+                        ))
+                typed[name] = values
+            else:
+                arr = np.asarray(col, dtype=object)
+                present = np.array([not (v is None or v == "" or _is_nan(v)) for v in arr.tolist()], dtype=bool)
+                values = np.where(present, arr, np.nan).astype(object)
+                if not all(isinstance(v, str) for v in values[present].tolist()):
+                    values[present] = [v if isinstance(v, str) else str(v) for v in values[present].tolist()]
+                if domain is not None:
+                    known = pd.Series(values, copy=False).isin(domain).to_numpy()
+                    for i in np.flatnonzero(present & ~known).tolist():
+                        failed.setdefault(i, []).append(_error(
+                            name, "unknown_category", f"{values[i]!r} is not a category the model was trained on."
+                        ))
+                typed[name] = values
+
+        if not failed:
+            return typed, np.arange(n), failed
+        keep = np.ones(n, dtype=bool)
+        keep[list(failed)] = False
+        return {k: v[keep] for k, v in typed.items()}, np.flatnonzero(keep), failed
+
+
+def _is_nan(v: Any) -> bool:
+    return isinstance(v, float) and math.isnan(v)
+
+
+def _finite_or_none(v: float) -> Optional[float]:
+    return v if math.isfinite(v) else None
+
+
+def _encoders(model: Any) -> Iterator[Tuple[str, List[Any], Any]]:
+    # same walk as debug_model.py: ColumnTransformer -> (pipeline ->) OneHotEncoder
+    for _, step in getattr(model, "steps", []):
+        for _, transformer, cols in getattr(step, "transformers_", []):
+            encoder = transformer
+            if hasattr(transformer, "named_steps"):
+                encoder = next((s for s in transformer.named_steps.values() if hasattr(s, "categories_")), None)
+            if encoder is None or not hasattr(encoder, "categories_") or isinstance(cols, str):
+                continue
+            for col, cats in zip(cols, encoder.categories_):
+                yield str(col), list(cats), encoder
+
+
+def fitted_categories(model: Any) -> Dict[str, List[Any]]:
+    return {col: cats for col, cats, _ in _encoders(model)}
+
+
+def strict_categories(model: Any) -> Set[str]:
+    """Columns whose fitted encoder raises on an unseen category (handle_unknown="error")."""
+    return {col for col, _, encoder in _encoders(model) if getattr(encoder, "handle_unknown", "error") == "error"}
+
+
+def fitted_ranges(model: Any, max_sigma: float) -> Dict[str, Tuple[float, float]]:
+    """mean +/- max_sigma * std per numeric column, from the fitted StandardScaler."""
+    out: Dict[str, Tuple[float, float]] = {}
+    if max_sigma <= 0:
+        return out
+    for _, step in getattr(model, "steps", []):
+        for _, transformer, cols in getattr(step, "transformers_", []):
+            steps = transformer.named_steps.values() if hasattr(transformer, "named_steps") else [transformer]
+            scaler = next((s for s in steps if hasattr(s, "var_") and hasattr(s, "mean_")), None)
+            if scaler is None or scaler.var_ is None or isinstance(cols, str):
+                continue
+            for col, mean, var in zip(cols, scaler.mean_, scaler.var_):
+                std = math.sqrt(var)
+                if std > 0:
+                    out[str(col)] = (mean - max_sigma * std, mean + max_sigma * std)
+    return out
+
+
+def compile_validator(raw: Any, model: Any, schema: Optional[FeatureSchema], unknown_categories: str = "auto",
+                      max_sigma: float = 0.0) -> Optional[RowValidator]:
+    """
+    Builds the validator for a loaded bundle. Numeric ranges come from the bundle's
+    optional ``num_ranges`` ({column: [min, max]}) and, when max_sigma > 0, from the
+    fitted scaler; categorical domains from the fitted OneHotEncoder, enforced (under
+    "auto") only where the encoder itself would fail on an unseen value.
+    """
+    if schema is None:
+        return None
+    ranges = fitted_ranges(model, max_sigma)
+    if isinstance(raw, dict) and isinstance(raw.get("num_ranges"), dict):
+        ranges.update({str(k): (float(v[0]), float(v[1])) for k, v in raw["num_ranges"].items()})
+    return RowValidator(schema, fitted_categories(model), ranges, unknown_categories, strict_categories(model))
+
+
+def request_features(data: Any, field: str = "features") -> Any:
+    if not isinstance(data, dict):
+        raise ValidationFailed([_error(field, "invalid_type", f"Expected a JSON object with a '{field}' key.")])
+    if field not in data:
+        raise ValidationFailed([_error(field, "required", "This field is required.")])
+    return data[field]
+
+
+def validate_features(handle: Any, data: Any, field: str = "features") -> List[Any]:
+    """
+    Checks a /predict/ body and returns the typed row for ``handle`` (a LoadedModel).
+    Failures raise ValidationFailed with per-field errors.
+    """
+    features = request_features(data, field)
+    if handle.validator is not None:
+        return handle.validator.validate(features)
+
+    # models without column typing: key presence, then the legacy float coercion
+    names = handle.meta.get("feature_names")
+    if isinstance(features, dict) and names:
+        missing = [c for c in names if c not in features]
+        if missing:
+            raise ValidationFailed([_error(c, "required", "This feature is required.") for c in missing])
+    try:
+        return handle.preprocess(features)
+    except ValidationFailed:
+        raise
+    except ValueError as e:
+        raise ValidationFailed([_error(field, "invalid", str(e))]) from None
@@ -1,17 +1,48 @@
 ﻿from typing import Optional, List, Any, Dict, Union
 
+import json
+import os
+import time
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, serializers
+from rest_framework.settings import api_settings
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from .serializers import (
+    PredictSerializer,
+    PredictResponseSerializer,
+    PredictBatchSerializer,
+    PredictBatchResponseSerializer,
+    PredictSweepSerializer,
+    PredictSweepResponseSerializer,
+    ErrorResponseSerializer,
+    ModelListResponseSerializer,
+    JobSerializer,
+    JobListResponseSerializer,
+    validate_row,
+)
+from . import audit, postprocess, batching, cache, columnar, drift, executor, jobs, metrics, registry, shadow, sweep, validation, warmup
+from .parsers import COLUMNAR_PARSERS
+from .services import model_signature, default_model
+from . import services
 
-from .serializers import PredictSerializer, PredictResponseSerializer
-from . import preprocess, postprocess
-from .services import predict as do_predict, model_signature
+
+request_stage_hist = metrics.histogram(
+    "request_stage_ms", "Time per request stage (parse, validate, predict, postprocess, total) in ms."
+)
+requests_total = metrics.counter("requests_total", "Requests by endpoint and outcome (ok or the HTTP status returned).")
+request_errors = metrics.counter("request_errors_total", "Failed requests by endpoint, error code and exception class.")
 
 
 class HealthView(APIView):
@@ -21,10 +52,19 @@ class HealthView(APIView):
 
     @extend_schema(
         description="Simple health check",
-        responses={200: {"type": "object", "properties": {"status": {"type": "string"}, "service": {"type": "string"}}}},
+        responses={
+            200: {"type": "object", "properties": {"status": {"type": "string"}, "service": {"type": "string"}, "ready": {"type": "boolean"}}},
+            503: {"type": "object", "properties": {"status": {"type": "string"}, "ready": {"type": "boolean"}, "startup": {"type": "object"}}},
+        },
     )
     def get(self, request):
-        return Response({"status": "ok", "service": "ML API"}, status=200)
+        if not getattr(settings, "INFERENCE_PRELOAD", False):
+            return Response({"status": "ok", "service": "ML API", "ready": True}, status=200)
+
+        startup = warmup.state()
+        if startup["state"] != "ready":
+            return Response({"status": startup["state"], "service": "ML API", "ready": False, "startup": startup}, status=503)
+        return Response({"status": "ok", "service": "ML API", "ready": True}, status=200)
 
 
 class ModelInfoView(APIView):
@@ -32,10 +72,14 @@ class ModelInfoView(APIView):
     authentication_classes: list = []
     permission_classes: list = []
 
-    @extend_schema(description="Inspect loaded model signature (debug).")
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT, 500: ErrorResponseSerializer},
+        description="Inspect loaded model signature (debug), with the startup/warmup state.",
+    )
     def get(self, request):
         try:
             info = model_signature()  # لازم يرجّع dict فيه feature_columns على الأقل
+            info["startup"] = warmup.state()
             return Response(info, status=200)
         except FileNotFoundError as e:
             return Response({"error": "model_not_found", "detail": str(e)}, status=500)
@@ -43,6 +87,25 @@ class ModelInfoView(APIView):
             return Response({"error": "model_introspection_failed", "detail": str(e)}, status=500)
 
 
+class MetricsView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Inference metrics (stages, micro-batching, cache, ...) as JSON, merged across workers.",
+    )
+    def get(self, request):
+        return Response(metrics.collect(getattr(settings, "INFERENCE_METRICS_DIR", "")), status=200)
+
+
+def prometheus_metrics(request):
+    """Same metrics as MetricsView in the Prometheus text exposition format."""
+    snap = metrics.collect(getattr(settings, "INFERENCE_METRICS_DIR", ""))
+    return HttpResponse(metrics.render_prometheus(snap), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @method_decorator(csrf_exempt, name="dispatch")  # للتجربة محليًا من Swagger بدون CSRF
 class PredictView(APIView):
 
@@ -62,6 +125,8 @@ class PredictView(APIView):
                 name="Dict (named raw features)",
                 value={
                     "features": {
+                        "hotel": "City Hotel",
+                        "lead_time": 30,
                         "arrival_date_year": 2016,
                         "arrival_date_month": "January",
                         "arrival_date_week_number": 1,
@@ -70,9 +135,12 @@ class PredictView(APIView):
                         "stays_in_week_nights": 0,
                         "adults": 2,
                         "children": 0,
+                        "babies": 0,
                         "meal": "BB",
                         "country": "PRT",
                         "market_segment": "Online TA",
+                        "distribution_channel": "TA/TO",
+                        "is_repeated_guest": 0,
                         "previous_cancellations": 0,
                         "previous_bookings_not_canceled": 0,
                         "reserved_room_type": "A",
@@ -93,40 +161,602 @@ class PredictView(APIView):
                 value={"label": 1, "confidence": 0.92},
                 response_only=True,
             ),
+            OpenApiExample(
+                name="Validation error",
+                value={
+                    "error": "invalid_request",
+                    "detail": [
+                        {"field": "meal", "code": "unknown_category", "detail": "'XX' is not a category the model was trained on."},
+                        {"field": "adr", "code": "not_a_number", "detail": "Expected a number, got 'abc'."},
+                    ],
+                },
+                response_only=True,
+                status_codes=["400"],
+            ),
+        ],
+        description=(
+            "Accepts raw features as a dict (preferred) or list (ordered). Server applies training preprocessing. "
+            "Rows are checked against the model's fitted schema (types, ranges, known categories)."
+        ),
+    )
+    def post(self, request):
+        started = time.perf_counter()
+        response = self._post(request)
+        request_stage_hist.observe((time.perf_counter() - started) * 1000.0, endpoint="predict", stage="total")
+        requests_total.inc(endpoint="predict", outcome="ok" if response.status_code < 400 else str(response.status_code))
+        return response
+
+    def _post(self, request):
+        started = time.perf_counter()
+        with request_stage_hist.time(endpoint="predict", stage="parse"):
+            data = request.data
+        return predict_row(data, audit.request_id(request), Response, started)
+
+
+def predict_row(data: Any, request_id: str, respond, started: Optional[float] = None):
+    """
+    Single-row /predict/ shared by the DRF and lean views, from the parsed body on:
+    A/B arm, validation, cache/micro-batcher, postprocess, audit and shadow.
+    ``respond(data, status=)`` builds the response.
+    """
+    started = time.perf_counter() if started is None else started
+
+    def failed(code: str, e: Exception, status_code: int):
+        request_errors.inc(endpoint="predict", error=code, exception=type(e).__name__)
+        return respond({"error": code, "detail": str(e)}, status=status_code)
+
+    # 1) الموديل المحمّل ومعاه الـ validator المبني من الـ schema بتاعه
+    try:
+        handle = default_model()
+    except FileNotFoundError as e:
+        return failed("model_not_found", e, 500)
+    except Exception as e:
+        return failed("model_introspection_failed", e, 500)
+    arm = shadow.route(request_id)
+    if arm is not None:
+        handle = arm
+
+    with request_stage_hist.time(endpoint="predict", stage="validate"):
+        try:
+            X = validation.validate_features(handle, data)
+        except validation.ValidationFailed as e:
+            request_errors.inc(endpoint="predict", error="invalid_request", exception="ValidationFailed")
+            return respond({"error": "invalid_request", "detail": e.errors}, status=400)
+
+    try:
+        with request_stage_hist.time(endpoint="predict", stage="predict"):
+            if arm is None:
+                y = cache.predict(X, batching.predict)
+            else:
+                y = cache.predict(X, arm.predict, fingerprint=arm.fingerprint)
+
+        with request_stage_hist.time(endpoint="predict", stage="postprocess"):
+            out = postprocess.run(y)
+        audit.record("predict", handle, [data["features"]], [out],
+                     (time.perf_counter() - started) * 1000.0, request_id)
+        if arm is None:
+            shadow.offer("predict", [data["features"]], [out])
+        return respond(out, status=200)
+
+    except ValueError as e:
+        return failed("bad_input", e, 400)
+    except FileNotFoundError as e:
+        return failed("model_not_found", e, 500)
+    except Exception as e:
+        return failed("inference_failed", e, 500)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class PredictBatchView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + COLUMNAR_PARSERS
+
+    @extend_schema(
+        request={
+            "application/json": PredictBatchSerializer,
+            columnar.ARROW: OpenApiTypes.BINARY,
+            columnar.NPY: OpenApiTypes.BINARY,
+            columnar.MSGPACK: OpenApiTypes.BINARY,
+        },
+        responses={200: PredictBatchResponseSerializer},
+        examples=[
+            OpenApiExample(
+                name="Mixed dict/list rows",
+                value={"rows": [{"hotel": "City Hotel", "lead_time": 30}, ["Resort Hotel", 12]]},
+                request_only=True,
+            ),
+            OpenApiExample(
+                name="Sample response",
+                value={
+                    "results": [
+                        {"index": 0, "label": 1, "confidence": 0.92},
+                        {"index": 1, "error": "bad_input", "detail": "Expected 27 features in list, got 2."},
+                    ]
+                },
+                response_only=True,
+            ),
         ],
-        description="Accepts raw features as a dict (preferred) or list (ordered). Server applies training preprocessing.",
+        description=(
+            "Scores N rows in one model call. Invalid rows get their own error entry; the rest are still scored. "
+            "Columnar Arrow IPC, .npy (numeric-only models) and msgpack bodies are answered in the same format."
+        ),
     )
     def post(self, request):
-    # 1) هات ترتيب الأعمدة الخام من توقيع الموديل
         try:
-            sig: Dict[str, Any] = model_signature()
-            expected_cols: Optional[List[str]] = sig.get("feature_columns")
+            handle = default_model()
         except FileNotFoundError as e:
             return Response({"error": "model_not_found", "detail": str(e)}, status=500)
         except Exception as e:
             return Response({"error": "model_introspection_failed", "detail": str(e)}, status=500)
 
-       
-        serializer = PredictSerializer(data=request.data, context={"expected_columns": expected_cols})
+        rid = audit.request_id(request)
+        if isinstance(request.data, columnar.Payload):
+            return score_columnar(handle, request.data.content_type, request.data.body, Response, rid)
+
+        serializer = PredictBatchSerializer(
+            data=request.data, context={"max_rows": getattr(settings, "INFERENCE_MAX_BATCH_ROWS", None)}
+        )
         if not serializer.is_valid():
             return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+        rows: List[Any] = serializer.validated_data["rows"]
         try:
-            payload: Union[Dict[str, Any], List[Any]] = serializer.validated_data["features"]
+            results = score_rows(handle, rows, rid)
+        except FileNotFoundError as e:
+            return Response({"error": "model_not_found", "detail": str(e)}, status=500)
+        except Exception as e:
+            return Response({"error": "inference_failed", "detail": str(e)}, status=500)
+        return Response({"results": results}, status=200)
+
+
+def score_columnar(handle, content_type: str, body: bytes, respond, request_id: str = ""):
+    """Columnar batch shared by the DRF and lean batch views; ``respond(data, status=)`` builds error responses."""
+    started = time.perf_counter()
+
+    def record(rows, results):
+        audit.record("predict_batch", handle, rows, results, (time.perf_counter() - started) * 1000.0, request_id)
+
+    try:
+        data, fmt = columnar.score(
+            handle, content_type, body, getattr(settings, "INFERENCE_MAX_BATCH_ROWS", None), record=record
+        )
+    except columnar.UnsupportedFormat as e:
+        return respond({"error": "unsupported_format", "detail": str(e)}, status=415)
+    except validation.ValidationFailed as e:
+        return respond({"error": "invalid_request", "detail": e.errors}, status=400)
+    except ValueError as e:
+        return respond({"error": "bad_input", "detail": str(e)}, status=400)
+    except FileNotFoundError as e:
+        return respond({"error": "model_not_found", "detail": str(e)}, status=500)
+    except Exception as e:
+        return respond({"error": "inference_failed", "detail": str(e)}, status=500)
+    return HttpResponse(data, content_type=fmt)
+
+
+def score_rows(handle, rows: List[Any], request_id: str = "") -> List[Dict[str, Any]]:
+    """Batch scoring shared by the DRF and lean batch views; bad rows get an indexed error entry."""
+    started = time.perf_counter()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    valid_idx: List[int] = list(range(len(rows)))
+    valid_rows: List[Any] = rows
+    if handle.validator is None:
+        # the validator checks key presence itself; models without one get the old pre-check
+        expected_cols: Optional[List[str]] = handle.meta.get("feature_names")
+        valid_idx, valid_rows = [], []
+        for i, row in enumerate(rows):
+            try:
+                valid_rows.append(validate_row(row, expected_cols))
+                valid_idx.append(i)
+            except serializers.ValidationError as e:
+                results[i] = {"index": i, "error": "bad_input", "detail": e.detail}
+
+    scored = handle.predict_batch(valid_rows) if valid_rows else []
+    for i, out in zip(valid_idx, scored):
+        results[i] = {"index": i, **(out if "error" in out else postprocess.run(out))}
+    audit.record("predict_batch", handle, rows, results, (time.perf_counter() - started) * 1000.0, request_id)
+    shadow.offer("predict_batch", rows, results)
+    return results
+
+
+class ModelListView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        responses={200: ModelListResponseSerializer, 404: ErrorResponseSerializer},
+        description="Models and versions available in the registry directory.",
+    )
+    def get(self, request):
+        reg = registry.get_registry()
+        if reg is None:
+            return Response({"error": "registry_disabled", "detail": "INFERENCE_REGISTRY_DIR is not set."}, status=404)
+        return Response({"models": reg.describe()}, status=200)
 
-            
-            X = preprocess.run(payload, expected_columns=expected_cols)
 
-            
-            y = do_predict(X)
+class DriftView(APIView):
 
-           
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("model", str, description="Registry model name (default: the MODEL_PATH model)."),
+            OpenApiParameter("version", str, description="Registry version (default: the one being served)."),
+        ],
+        responses={200: OpenApiTypes.OBJECT, 404: ErrorResponseSerializer, 500: ErrorResponseSerializer},
+        description=(
+            "Input drift of the default model (or ?model=<name>[&version=] from the registry) against its "
+            "training reference: PSI / binned KS per column when the reference is binned, mean shift, std ratio "
+            "and unseen-category rate otherwise. Merged across workers when INFERENCE_DRIFT_DIR is set."
+        ),
+    )
+    def get(self, request):
+        name = request.query_params.get("model")
+        try:
+            if name:
+                reg = registry.get_registry()
+                if reg is None:
+                    return Response({"error": "registry_disabled", "detail": "INFERENCE_REGISTRY_DIR is not set."}, status=404)
+                handle = reg.get(name, request.query_params.get("version"))
+            else:
+                handle = default_model()
+        except KeyError as e:
+            return Response({"error": "model_not_found", "detail": str(e.args[0])}, status=404)
+        except FileNotFoundError as e:
+            return Response({"error": "model_not_found", "detail": str(e)}, status=500)
+        except Exception as e:
+            return Response({"error": "model_load_failed", "detail": str(e)}, status=500)
+        if handle.drift is None:
+            return Response(
+                {"error": "drift_disabled", "detail": "INFERENCE_DRIFT_ENABLED is off or the model has no feature schema."},
+                status=404,
+            )
+        return Response(drift.collect(handle.drift, getattr(settings, "INFERENCE_DRIFT_DIR", "")), status=200)
+
+
+class ShadowView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT, 404: ErrorResponseSerializer},
+        description="Shadow candidates of this worker: agreement rate, score deltas, latency and A/B weights.",
+    )
+    def get(self, request):
+        scorer = shadow.get_scorer()
+        if scorer is None:
+            return Response({"error": "shadow_disabled", "detail": "INFERENCE_SHADOW_MODELS is not set."}, status=404)
+        return Response(scorer.describe(), status=200)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class PredictSweepView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        request=PredictSweepSerializer,
+        responses={200: PredictSweepResponseSerializer, 400: ErrorResponseSerializer, 500: ErrorResponseSerializer},
+        examples=[
+            OpenApiExample(
+                name="adr curve by deposit type",
+                value={
+                    "features": {"hotel": "City Hotel", "lead_time": 30, "adr": 120},
+                    "sweep": [{"feature": "adr", "min": 50, "max": 300, "steps": 26}, {"feature": "deposit_type"}],
+                },
+                request_only=True,
+            ),
+        ],
+        description=(
+            "What-if sweep: scores the base booking with one or two features replaced by value grids "
+            "(values, min/max/steps for numbers, every fitted category when omitted for a categorical feature), "
+            "in a few vectorized model calls. label/confidence/proba are curves (one feature) or "
+            "grids indexed [first axis][second axis]."
+        ),
+    )
+    def post(self, request):
+        try:
+            handle = default_model()
+        except FileNotFoundError as e:
+            return Response({"error": "model_not_found", "detail": str(e)}, status=500)
+        except Exception as e:
+            return Response({"error": "model_introspection_failed", "detail": str(e)}, status=500)
+
+        serializer = PredictSweepSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            out = sweep.run(
+                handle, data["features"], data["sweep"],
+                chunk_rows=getattr(settings, "INFERENCE_SWEEP_CHUNK_ROWS", 2048),
+                max_points=getattr(settings, "INFERENCE_SWEEP_MAX_POINTS", None),
+            )
+        except validation.ValidationFailed as e:
+            return Response({"error": "invalid_request", "detail": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({"error": "bad_input", "detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": "inference_failed", "detail": str(e)}, status=500)
+        return Response(out, status=200)
+
+
+def _job_response(request, job) -> dict:
+    out = jobs.public(job)
+    out["status_url"] = request.build_absolute_uri(reverse("job_detail", args=[job["id"]]))
+    out["results_url"] = request.build_absolute_uri(reverse("job_results", args=[job["id"]]))
+    return out
+
+
+def _jobs_disabled() -> Response:
+    return Response({"error": "jobs_disabled", "detail": "INFERENCE_JOBS_ENABLED is off."}, status=404)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class JobListView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        operation_id="v1_jobs_list",
+        responses={200: JobListResponseSerializer, 404: ErrorResponseSerializer},
+        description="Bulk scoring jobs on disk, oldest first.",
+    )
+    def get(self, request):
+        if not jobs.enabled():
+            return _jobs_disabled()
+        return Response({"jobs": [_job_response(request, j) for j in jobs.get_queue().jobs()]}, status=200)
+
+    @extend_schema(
+        request={"multipart/form-data": {"type": "object", "properties": {
+            "file": {"type": "string", "format": "binary"},
+            "format": {"type": "string", "enum": ["csv", "jsonl", "parquet"]},
+            "output": {"type": "string", "enum": ["jsonl", "csv"]},
+        }, "required": ["file"]}},
+        responses={
+            202: JobSerializer,
+            400: ErrorResponseSerializer,
+            404: ErrorResponseSerializer,
+            413: ErrorResponseSerializer,
+            429: ErrorResponseSerializer,
+        },
+        description=(
+            "Queue a CSV/JSONL/Parquet file (multipart field 'file') for scoring with the default model. "
+            "Returns 202 with the job id; poll status_url, then download results_url."
+        ),
+    )
+    def post(self, request):
+        if not jobs.enabled():
+            return _jobs_disabled()
+        # checked before request.FILES, which would spool the whole body to a temp file first
+        max_bytes = jobs.max_upload_bytes()
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > max_bytes + 64 * 1024:  # room for the multipart headers and form fields
+            return Response({"error": "payload_too_large", "detail": f"The file is larger than {max_bytes} bytes."}, status=413)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "bad_input", "detail": "Upload the input as multipart field 'file'."}, status=400)
+        try:
+            job = jobs.get_queue().submit(upload, request.data.get("format", ""), request.data.get("output", "jsonl"))
+        except jobs.UploadTooLarge as e:
+            return Response({"error": "payload_too_large", "detail": str(e)}, status=413)
+        except ValueError as e:
+            return Response({"error": "bad_input", "detail": str(e)}, status=400)
+        except OverflowError as e:
+            return Response({"error": "too_many_jobs", "detail": str(e)}, status=429)
+        return Response(_job_response(request, job), status=202)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class JobDetailView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        responses={200: JobSerializer, 404: ErrorResponseSerializer},
+        description="Status and progress of a bulk scoring job.",
+    )
+    def get(self, request, job_id: str):
+        job = jobs.get_queue().get(job_id) if jobs.enabled() else None
+        if job is None:
+            return Response({"error": "job_not_found", "detail": job_id}, status=404)
+        return Response(_job_response(request, job), status=200)
+
+    @extend_schema(
+        responses={200: JobSerializer, 404: ErrorResponseSerializer},
+        description="Cancel a queued or running job (it stops after the current chunk), or delete a finished one.",
+    )
+    def delete(self, request, job_id: str):
+        job = jobs.get_queue().cancel(job_id) if jobs.enabled() else None
+        if job is None:
+            return Response({"error": "job_not_found", "detail": job_id}, status=404)
+        return Response({**jobs.public(job), "deleted": job.get("deleted", False)}, status=200)
+
+
+class JobResultsView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        responses={
+            (200, "application/x-ndjson"): OpenApiTypes.BINARY,
+            (200, "text/csv"): OpenApiTypes.BINARY,
+            404: ErrorResponseSerializer,
+            409: ErrorResponseSerializer,
+        },
+        description="Results file of a finished job (one line per input row, in input order).",
+    )
+    def get(self, request, job_id: str):
+        queue = jobs.get_queue()
+        job = queue.get(job_id) if jobs.enabled() else None
+        if job is None:
+            return Response({"error": "job_not_found", "detail": job_id}, status=404)
+        if job["status"] != "done":
+            return Response({"error": "job_not_done", "detail": f"The job is {job['status']}."}, status=409)
+        name = f"{os.path.splitext(job['filename'] or 'input')[0]}-scored.{job['output']}"
+        content_type = "text/csv" if job["output"] == "csv" else "application/x-ndjson"
+        return FileResponse(open(queue.results_path(job), "rb"), as_attachment=True, filename=name, content_type=content_type)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class RegistryPredictView(APIView):
+
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        request=PredictSerializer,
+        responses={200: PredictResponseSerializer, 400: ErrorResponseSerializer, 404: ErrorResponseSerializer},
+        description="Predict with a named model from the registry (latest version unless one is pinned in the URL).",
+    )
+    def post(self, request, name: str, version: Optional[str] = None):
+        reg = registry.get_registry()
+        if reg is None:
+            return Response({"error": "registry_disabled", "detail": "INFERENCE_REGISTRY_DIR is not set."}, status=404)
+        try:
+            handle = reg.get(name, version)
+        except KeyError as e:
+            return Response({"error": "model_not_found", "detail": str(e.args[0])}, status=404)
+        except Exception as e:
+            return Response({"error": "model_load_failed", "detail": str(e)}, status=500)
+
+        started = time.perf_counter()
+        try:
+            X = validation.validate_features(handle, request.data)
+        except validation.ValidationFailed as e:
+            return Response({"error": "invalid_request", "detail": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            y = cache.predict(X, handle.predict, fingerprint=handle.fingerprint)
             out = postprocess.run(y)
+            out.update({"model": handle.name, "version": handle.version})
+            audit.record("registry_predict", handle, [request.data["features"]], [out],
+                         (time.perf_counter() - started) * 1000.0, audit.request_id(request))
             return Response(out, status=200)
-
         except ValueError as e:
             return Response({"error": "bad_input", "detail": str(e)}, status=400)
-        except FileNotFoundError as e:
-            return Response({"error": "model_not_found", "detail": str(e)}, status=500)
         except Exception as e:
             return Response({"error": "inference_failed", "detail": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def predict_async(request):
+    """
+    Native async /predict/: the model call runs on a sized pool (executor.get_executor()),
+    requests over the admission limit are rejected with Retry-After, and requests that
+    outlive their deadline (X-Request-Timeout-Ms, capped by INFERENCE_ASYNC_DEADLINE_MS)
+    are dropped instead of being scored late.
+    """
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError as e:
+        return JsonResponse({"error": "bad_input", "detail": f"Invalid JSON: {e}"}, status=400)
+    if not isinstance(body, dict) or not isinstance(body.get("features"), (list, dict)):
+        return JsonResponse(
+            {"error": {"features": ["features must be either a JSON object (dict) or an array (list)."]}}, status=400
+        )
+
+    budget_ms = float(getattr(settings, "INFERENCE_ASYNC_DEADLINE_MS", 2000))
+    try:
+        budget_ms = min(budget_ms, float(request.headers.get("X-Request-Timeout-Ms", budget_ms)))
+    except ValueError:
+        pass
+    started = time.perf_counter()
+    deadline = time.time() + budget_ms / 1000.0
+
+    retry_after = str(getattr(settings, "INFERENCE_ASYNC_RETRY_AFTER", 1))
+    try:
+        pool = executor.get_executor()
+        y = await pool.run(executor.predict_fn(), body["features"], deadline=deadline)
+    except executor.Overloaded as e:
+        resp = JsonResponse({"error": "overloaded", "detail": str(e)}, status=getattr(settings, "INFERENCE_ASYNC_REJECT_STATUS", 503))
+        resp["Retry-After"] = retry_after
+        return resp
+    except executor.DeadlineExceeded as e:
+        resp = JsonResponse({"error": "deadline_exceeded", "detail": str(e)}, status=503)
+        resp["Retry-After"] = retry_after
+        return resp
+    except validation.ValidationFailed as e:
+        return JsonResponse({"error": "invalid_request", "detail": e.errors}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": "bad_input", "detail": str(e)}, status=400)
+    except FileNotFoundError as e:
+        return JsonResponse({"error": "model_not_found", "detail": str(e)}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": "inference_failed", "detail": str(e)}, status=500)
+
+    out = postprocess.run(y)
+    # process pools load the model in the workers only; the log then carries the default labels
+    handle = services.default_model() if pool.kind == "thread" else None
+    audit.record("predict_async", handle, [body["features"]], [out],
+                 (time.perf_counter() - started) * 1000.0, audit.request_id(request))
+    return JsonResponse(out, status=200)
+
+
+def _score_ndjson(lines, handle, chunk_rows: int, request_id: str = ""):
+    # pending holds (index, row, error) in input order; unparseable lines wait with their error
+    # so every output line comes out in input order
+    def flush(pending):
+        started = time.perf_counter()
+        scored = [(i, row) for i, row, error in pending if error is None]
+        rows = [row for _, row in scored]
+        try:
+            outs = {i: out if "error" in out else postprocess.run(out) for (i, _), out in zip(scored, handle.predict_batch(rows) if rows else [])}
+        except Exception as e:
+            outs = {i: {"error": "inference_failed", "detail": str(e)} for i, _ in scored}
+        results = [{"index": i, **(error or outs[i])} for i, _, error in pending]
+        if rows:
+            audit.record("predict_stream", handle, rows, [{"index": i, **outs[i]} for i, _ in scored],
+                         (time.perf_counter() - started) * 1000.0, request_id)
+        for out in results:
+            yield json.dumps(out, separators=(",", ":")) + "\n"
+
+    pending = []
+    index = 0
+    for raw in lines:
+        raw = raw.strip()
+        if not raw:
+            continue
+        i, index = index, index + 1
+        try:
+            pending.append((i, json.loads(raw), None))
+        except ValueError as e:
+            pending.append((i, None, {"error": "bad_input", "detail": f"Invalid JSON: {e}"}))
+        if len(pending) >= chunk_rows:
+            yield from flush(pending)
+            pending = []
+    if pending:
+        yield from flush(pending)
+
+
+@csrf_exempt
+@require_POST
+def predict_stream(request):
+    """
+    NDJSON in, NDJSON out: one feature row (dict or list) per input line, one
+    {"index", "label", "confidence"} or {"index", "error", "detail"} per output line.
+    The body is read line by line and scored in INFERENCE_STREAM_CHUNK_ROWS chunks,
+    so neither the upload nor the response is ever held in memory as a whole.
+    """
+    try:
+        handle = default_model()
+    except FileNotFoundError as e:
+        return JsonResponse({"error": "model_not_found", "detail": str(e)}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": "model_introspection_failed", "detail": str(e)}, status=500)
+
+    chunk_rows = max(int(getattr(settings, "INFERENCE_STREAM_CHUNK_ROWS", 1000)), 1)
+    # iterating the request reads the body stream line by line instead of request.body
+    return StreamingHttpResponse(_score_ndjson(request, handle, chunk_rows, audit.request_id(request)), content_type="application/x-ndjson")
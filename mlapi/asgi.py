@@ -2,3 +2,7 @@ import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mlapi.settings')
 application = get_asgi_application()
+
+from inference import audit  # noqa: E402
+
+audit.install_sigterm_drain()
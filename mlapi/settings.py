@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "inference.profiling.ProfilingMiddleware",
+    "inference.capture.CaptureMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",      
@@ -118,6 +120,127 @@ REST_FRAMEWORK = {
     ),
 }
 
+INFERENCE_MAX_BATCH_ROWS = int(os.getenv("INFERENCE_MAX_BATCH_ROWS", "10000"))
+INFERENCE_STREAM_CHUNK_ROWS = int(os.getenv("INFERENCE_STREAM_CHUNK_ROWS", "1000"))
+
+# opt-in micro-batching of concurrent /predict/ calls into one model call
+INFERENCE_MICROBATCH_ENABLED = os.getenv("INFERENCE_MICROBATCH_ENABLED", "False").lower() == "true"
+INFERENCE_MICROBATCH_MAX_SIZE = int(os.getenv("INFERENCE_MICROBATCH_MAX_SIZE", "32"))
+INFERENCE_MICROBATCH_MAX_WAIT_MS = float(os.getenv("INFERENCE_MICROBATCH_MAX_WAIT_MS", "2"))
+
+# prediction cache: "none", "local" (in-process LRU) or "django" (CACHES[INFERENCE_CACHE_ALIAS])
+INFERENCE_CACHE_BACKEND = os.getenv("INFERENCE_CACHE_BACKEND", "none").lower()
+INFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", "10000"))
+INFERENCE_CACHE_TTL_SECONDS = float(os.getenv("INFERENCE_CACHE_TTL_SECONDS", "300"))
+INFERENCE_CACHE_ALIAS = os.getenv("INFERENCE_CACHE_ALIAS", "default")
+
+# load + warm the model in AppConfig.ready(); /health/ returns 503 until it is done
+INFERENCE_PRELOAD = os.getenv("INFERENCE_PRELOAD", "False").lower() == "true"
+INFERENCE_PRELOAD_BLOCKING = os.getenv("INFERENCE_PRELOAD_BLOCKING", "False").lower() == "true"
+INFERENCE_WARMUP_ROWS = int(os.getenv("INFERENCE_WARMUP_ROWS", "8"))
+INFERENCE_WARMUP_ROUNDS = int(os.getenv("INFERENCE_WARMUP_ROUNDS", "3"))
+
+# multi-model registry: <dir>/<name>/<version>.joblib (or an export_mmap directory)
+INFERENCE_REGISTRY_DIR = os.getenv("INFERENCE_REGISTRY_DIR", "")
+INFERENCE_REGISTRY_MEMORY_MB = int(os.getenv("INFERENCE_REGISTRY_MEMORY_MB", "512"))
+INFERENCE_REGISTRY_POLL_SECONDS = float(os.getenv("INFERENCE_REGISTRY_POLL_SECONDS", "5"))
+# per-model engine override, "name=flat,other=native" (default: INFERENCE_ENGINE or the bundle's "engine" key)
+INFERENCE_REGISTRY_ENGINES = dict(
+    item.split("=", 1) for item in os.getenv("INFERENCE_REGISTRY_ENGINES", "").replace(" ", "").split(",") if "=" in item
+)
+
+# async /predict/async/: sized pool + bounded admission queue + per-request deadline
+INFERENCE_ASYNC_EXECUTOR = os.getenv("INFERENCE_ASYNC_EXECUTOR", "thread").lower()
+INFERENCE_ASYNC_WORKERS = int(os.getenv("INFERENCE_ASYNC_WORKERS", "0")) or None
+INFERENCE_ASYNC_QUEUE_SIZE = int(os.getenv("INFERENCE_ASYNC_QUEUE_SIZE", "64"))
+INFERENCE_ASYNC_DEADLINE_MS = float(os.getenv("INFERENCE_ASYNC_DEADLINE_MS", "2000"))
+INFERENCE_ASYNC_RETRY_AFTER = int(os.getenv("INFERENCE_ASYNC_RETRY_AFTER", "1"))
+INFERENCE_ASYNC_REJECT_STATUS = int(os.getenv("INFERENCE_ASYNC_REJECT_STATUS", "503"))
+
+# multi-process metrics: each worker flushes its snapshot here and /metrics merges them
+INFERENCE_METRICS_DIR = os.getenv("INFERENCE_METRICS_DIR", "")
+INFERENCE_METRICS_FLUSH_SECONDS = float(os.getenv("INFERENCE_METRICS_FLUSH_SECONDS", "5"))
+
+# request profiling (inference.profiling): sampled fraction, X-Inference-Profile header, slow requests
+INFERENCE_PROFILE_SAMPLE_RATE = float(os.getenv("INFERENCE_PROFILE_SAMPLE_RATE", "0"))
+INFERENCE_PROFILE_TOKEN = os.getenv("INFERENCE_PROFILE_TOKEN", "")
+INFERENCE_PROFILE_SLOW_MS = float(os.getenv("INFERENCE_PROFILE_SLOW_MS", "0"))
+INFERENCE_PROFILE_INTERVAL_MS = float(os.getenv("INFERENCE_PROFILE_INTERVAL_MS", "5"))
+INFERENCE_PROFILE_DIR = os.getenv("INFERENCE_PROFILE_DIR", str(BASE_DIR / "profiles"))
+INFERENCE_PROFILE_MAX_FILES = int(os.getenv("INFERENCE_PROFILE_MAX_FILES", "200"))
+
+# lean WSGI mount for POST predict/ and predict/batch/ (inference.lean); opt-in, it runs only
+# INFERENCE_LEAN_MIDDLEWARE on those routes (see the module docstring); ASGI keeps the full stack
+INFERENCE_LEAN_MOUNT = os.getenv("INFERENCE_LEAN_MOUNT", "False").lower() == "true"
+INFERENCE_LEAN_MIDDLEWARE = [
+    "inference.profiling.ProfilingMiddleware",
+    "inference.capture.CaptureMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+]
+
+# write-behind prediction log (inference.audit): bounded queue -> bulk_create, spill files when the DB lags;
+# opt-in (needs the inference_predictionlog migration). The writer starts on the first logged request
+INFERENCE_AUDIT_ENABLED = os.getenv("INFERENCE_AUDIT_ENABLED", "False").lower() == "true"
+INFERENCE_AUDIT_QUEUE_SIZE = int(os.getenv("INFERENCE_AUDIT_QUEUE_SIZE", "10000"))
+INFERENCE_AUDIT_BATCH_ROWS = int(os.getenv("INFERENCE_AUDIT_BATCH_ROWS", "500"))
+INFERENCE_AUDIT_FLUSH_MS = float(os.getenv("INFERENCE_AUDIT_FLUSH_MS", "1000"))
+INFERENCE_AUDIT_SLOW_MS = float(os.getenv("INFERENCE_AUDIT_SLOW_MS", "500"))
+INFERENCE_AUDIT_BACKOFF_SECONDS = float(os.getenv("INFERENCE_AUDIT_BACKOFF_SECONDS", "30"))
+INFERENCE_AUDIT_SPILL_DIR = os.getenv("INFERENCE_AUDIT_SPILL_DIR", str(BASE_DIR / "audit_spill"))
+
+# sampled traffic capture for benchmarks/replay.py (inference.capture); off unless the rate is > 0
+INFERENCE_CAPTURE_RATE = float(os.getenv("INFERENCE_CAPTURE_RATE", "0"))
+INFERENCE_CAPTURE_DIR = os.getenv("INFERENCE_CAPTURE_DIR", str(BASE_DIR / "captures"))
+INFERENCE_CAPTURE_PATHS = [p for p in os.getenv("INFERENCE_CAPTURE_PATHS", "/api/v1/predict/").split(",") if p]
+# blanked in JSON and NDJSON bodies; with any set, binary (columnar) requests are not captured
+INFERENCE_CAPTURE_REDACT = [f for f in os.getenv("INFERENCE_CAPTURE_REDACT", "").replace(" ", "").split(",") if f]
+INFERENCE_CAPTURE_MAX_BYTES = int(os.getenv("INFERENCE_CAPTURE_MAX_BYTES", str(1024 * 1024)))
+INFERENCE_CAPTURE_ROTATE_MB = float(os.getenv("INFERENCE_CAPTURE_ROTATE_MB", "64"))
+INFERENCE_CAPTURE_QUEUE_SIZE = int(os.getenv("INFERENCE_CAPTURE_QUEUE_SIZE", "1000"))
+
+# streaming input-drift monitor (inference.drift), opt-in; per-worker sketches are merged from INFERENCE_DRIFT_DIR
+INFERENCE_DRIFT_ENABLED = os.getenv("INFERENCE_DRIFT_ENABLED", "False").lower() == "true"
+INFERENCE_DRIFT_WINDOW_SECONDS = float(os.getenv("INFERENCE_DRIFT_WINDOW_SECONDS", "300"))
+INFERENCE_DRIFT_QUEUE_SIZE = int(os.getenv("INFERENCE_DRIFT_QUEUE_SIZE", "256"))
+INFERENCE_DRIFT_TOP_K = int(os.getenv("INFERENCE_DRIFT_TOP_K", "20"))
+INFERENCE_DRIFT_PSI_ALERT = float(os.getenv("INFERENCE_DRIFT_PSI_ALERT", "0.2"))
+INFERENCE_DRIFT_DIR = os.getenv("INFERENCE_DRIFT_DIR", INFERENCE_METRICS_DIR)
+INFERENCE_DRIFT_FLUSH_SECONDS = float(os.getenv("INFERENCE_DRIFT_FLUSH_SECONDS", str(INFERENCE_METRICS_FLUSH_SECONDS)))
+
+# shadow scoring (inference.shadow): candidates are registry "name[:version]" specs or artifact paths
+INFERENCE_SHADOW_MODELS = [s for s in os.getenv("INFERENCE_SHADOW_MODELS", "").replace(" ", "").split(",") if s]
+INFERENCE_SHADOW_SAMPLE_RATE = float(os.getenv("INFERENCE_SHADOW_SAMPLE_RATE", "1"))
+INFERENCE_SHADOW_QUEUE_SIZE = int(os.getenv("INFERENCE_SHADOW_QUEUE_SIZE", "1000"))
+INFERENCE_SHADOW_WORKERS = int(os.getenv("INFERENCE_SHADOW_WORKERS", "1"))
+INFERENCE_SHADOW_BATCH_ROWS = int(os.getenv("INFERENCE_SHADOW_BATCH_ROWS", "64"))
+INFERENCE_SHADOW_MAX_AGE_MS = float(os.getenv("INFERENCE_SHADOW_MAX_AGE_MS", "5000"))
+INFERENCE_SHADOW_NICE = int(os.getenv("INFERENCE_SHADOW_NICE", "10"))
+# share of /predict/ traffic served by a candidate, "candidate=0.1,other=0.05" (names as in INFERENCE_SHADOW_MODELS)
+INFERENCE_AB_WEIGHTS = {
+    name: float(w) for name, w in
+    (item.split("=", 1) for item in os.getenv("INFERENCE_AB_WEIGHTS", "").replace(" ", "").split(",") if "=" in item)
+}
+
+# what-if sweeps (inference.sweep): grid points per request and per model call
+INFERENCE_SWEEP_MAX_POINTS = int(os.getenv("INFERENCE_SWEEP_MAX_POINTS", "10000"))
+INFERENCE_SWEEP_CHUNK_ROWS = int(os.getenv("INFERENCE_SWEEP_CHUNK_ROWS", "2048"))
+
+# bulk scoring jobs (inference.jobs): uploads, checkpoints and results under INFERENCE_JOBS_DIR.
+# Off by default: the endpoints are unauthenticated, so enable them (INFERENCE_JOBS_ENABLED=True) only
+# behind a proxy that authenticates callers, with MAX_UPLOAD_MB sized for the files you expect
+INFERENCE_JOBS_ENABLED = os.getenv("INFERENCE_JOBS_ENABLED", "False").lower() == "true"
+INFERENCE_JOBS_DIR = os.getenv("INFERENCE_JOBS_DIR", str(BASE_DIR / "jobs"))
+INFERENCE_JOBS_MAX_CONCURRENT = int(os.getenv("INFERENCE_JOBS_MAX_CONCURRENT", "1"))
+INFERENCE_JOBS_MAX_QUEUED = int(os.getenv("INFERENCE_JOBS_MAX_QUEUED", "100"))
+INFERENCE_JOBS_MAX_UPLOAD_MB = float(os.getenv("INFERENCE_JOBS_MAX_UPLOAD_MB", "256"))
+INFERENCE_JOBS_CHUNK_ROWS = int(os.getenv("INFERENCE_JOBS_CHUNK_ROWS", "5000"))
+INFERENCE_JOBS_THREADS = int(os.getenv("INFERENCE_JOBS_THREADS", "1"))
+INFERENCE_JOBS_NICE = int(os.getenv("INFERENCE_JOBS_NICE", "10"))
+INFERENCE_JOBS_RETENTION_HOURS = float(os.getenv("INFERENCE_JOBS_RETENTION_HOURS", "24"))
+INFERENCE_JOBS_POLL_SECONDS = float(os.getenv("INFERENCE_JOBS_POLL_SECONDS", "2"))
+INFERENCE_JOBS_MAX_ATTEMPTS = int(os.getenv("INFERENCE_JOBS_MAX_ATTEMPTS", "3"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "ML Inference API",
     "DESCRIPTION": "Predict endpoint powered by your joblib model.",
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.views.generic import TemplateView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from inference.views import prometheus_metrics
+
 urlpatterns = [
     # صفحة ترحيب بسيطة (ديزاين لطيف)
     path("", TemplateView.as_view(template_name="home.html"), name="home"),
@@ -11,4 +13,5 @@ urlpatterns = [
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
     path("api/v1/", include("inference.urls")),
+    path("metrics", prometheus_metrics, name="prometheus_metrics"),
 ]
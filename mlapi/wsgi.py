@@ -2,3 +2,12 @@ import os
 from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mlapi.settings')
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+from inference import audit  # noqa: E402
+
+audit.install_sigterm_drain()
+
+if settings.INFERENCE_LEAN_MOUNT:
+    from inference.lean import LeanHandler  # noqa: E402
+    application = LeanHandler(fallback=application)